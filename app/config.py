@@ -6,12 +6,135 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Auth caches
+    TOKEN_CACHE_SIZE: int = 4096
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 30
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+    
+    # Startup: create missing tables/columns/indexes, and build the S3/OpenAI clients
+    # in the background instead of on the first request that needs them
+    SCHEMA_SYNC_ON_STARTUP: bool = True
+    WARM_UP_CLIENTS: bool = False
+    
+    # Minutes a reported incident keeps its station flagged in the simulator
+    ACTIVE_INCIDENT_WINDOW_MINUTES: int = 60
+    
+    # Tracing: "none", "file" (JSON lines) or "otlp" (OTLP/HTTP JSON collector)
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE_PATH: str = "traces/spans.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    
+    # Logging (JSON lines written by a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_DEBUG_SAMPLE_RATE: float = 0.1
+    LOG_QUEUE_SIZE: int = 10000
+    
+    # Response compression (brotli is used when the package is installed)
+    COMPRESSION_MIN_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 5
+    
+    # Event-loop blocking watchdog (opt-in, meant for development/staging)
+    LOOP_WATCHDOG_ENABLED: bool = False
+    LOOP_WATCHDOG_THRESHOLD_MS: int = 100
+    
     # AWS S3 Configuration
     AWS_ACCESS_KEY_ID: str
     AWS_SECRET_ACCESS_KEY: str
     AWS_REGION: str = "us-east-1"
     AWS_S3_BUCKET: str
     
+    # Object storage: "s3" or "local" (filesystem stand-in served by
+    # scripts/local_object_store.py, for development and tests)
+    OBJECT_STORE_BACKEND: str = "s3"
+    LOCAL_OBJECT_STORE_URL: str = "http://localhost:9000"
+    LOCAL_OBJECT_STORE_PATH: str = "storage/objects"
+    
+    # Pre-signed direct uploads
+    UPLOAD_URL_EXPIRE_SECONDS: int = 900
+    MAX_IMAGE_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    MAX_AUDIO_UPLOAD_BYTES: int = 25 * 1024 * 1024
+    
+    # Locally stored media (/storage/incidents): files are immutable, so they
+    # are cached for a year. With a prefix set, nginx serves the bytes through
+    # X-Accel-Redirect (internal location aliased to the storage directory).
+    MEDIA_CACHE_MAX_AGE: int = 365 * 24 * 3600
+    MEDIA_ACCEL_REDIRECT_PREFIX: str = ""
+    
+    # Fall detection image derivatives (WebP thumbnail and preview, needs Pillow).
+    # IMAGE_DERIVATIVE_WORKERS=0 sizes the process pool from the CPU count.
+    IMAGE_DERIVATIVES_ENABLED: bool = True
+    IMAGE_DERIVATIVE_WORKERS: int = 0
+    THUMBNAIL_SIZE: int = 256
+    PREVIEW_SIZE: int = 1280
+    PREVIEW_QUALITY: int = 75
+    
+    # Near-duplicate suppression of fall detection frames (needs Pillow):
+    # frames of the same station within the window whose perceptual hashes
+    # differ in at most MAX_DISTANCE of 64 bits are merged into one incident
+    NEAR_DUPLICATE_ENABLED: bool = True
+    NEAR_DUPLICATE_WINDOW_SECONDS: int = 120
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 6
+    
+    # Storage outbox: deletions of stored files are queued in the database and
+    # run by a background reconciler, which can also sweep unreferenced files.
+    # The sweep is opt-in (STORAGE_SWEEP_INTERVAL_SECONDS=0 disables it): it
+    # deletes anything under the app's bucket prefixes that this database does
+    # not reference, so only enable it when no other deployment shares them.
+    # The grace period must exceed the lifetime of pre-signed upload tokens.
+    OUTBOX_POLL_SECONDS: float = 5.0
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_RETRY_BASE_SECONDS: int = 30
+    OUTBOX_MAX_BACKOFF_SECONDS: int = 3600
+    STORAGE_SWEEP_INTERVAL_SECONDS: int = 0
+    STORAGE_SWEEP_GRACE_SECONDS: int = 24 * 3600
+    
+    # Idempotency-Key on upload endpoints: responses are replayed to retries
+    # for IDEMPOTENCY_TTL_SECONDS; a key left pending longer than the pending
+    # timeout (crashed worker) can be reused
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_CACHE_SIZE: int = 1024
+    IDEMPOTENCY_PENDING_TIMEOUT_SECONDS: int = 300
+    
+    # Concurrent identical reads (incident report list, fall detection by id)
+    # always share one query; READ_CACHE_TTL_SECONDS > 0 also reuses the result
+    # for that long (writes of this process invalidate it, other processes may
+    # serve it stale for up to the TTL)
+    READ_CACHE_TTL_SECONDS: float = 0.0
+    
+    # Write-through cache of single incident/fall detection records: an LRU per
+    # process, optionally backed by a shared tier (memory = none, file = a
+    # directory shared by the workers of one host, redis). Deletes in another
+    # process reach this process's LRU after at most the local TTL; shared
+    # entries and delete tombstones live RECORD_CACHE_SHARED_TTL_SECONDS.
+    RECORD_CACHE_SIZE: int = 2048
+    RECORD_CACHE_LOCAL_TTL_SECONDS: float = 30.0
+    RECORD_CACHE_BACKEND: str = "memory"
+    RECORD_CACHE_SHARED_TTL_SECONDS: int = 30
+    RECORD_CACHE_PATH: str = "storage/record_cache"
+    RECORD_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    
+    # Monthly range partitioning of incident_reports and fall_detections on
+    # incident_datetime (PostgreSQL only; ignored on other databases). New
+    # databases are created partitioned, existing ones are converted with
+    # scripts/partition_tables.py. PARTITION_RETENTION_MONTHS=0 keeps every
+    # partition; otherwise older ones are detached (detach) or dumped to
+    # gzipped CSV in PARTITION_ARCHIVE_PATH and dropped (archive). Their media
+    # files are kept (keep: the storage sweep skips them) or left to the sweep
+    # like any unreferenced file (delete).
+    TABLE_PARTITIONING_ENABLED: bool = True
+    PARTITION_PREMAKE_MONTHS: int = 3
+    PARTITION_RETENTION_MONTHS: int = 0
+    PARTITION_RETENTION_ACTION: str = "detach"
+    PARTITION_ARCHIVE_PATH: str = "storage/archive"
+    PARTITION_RETENTION_MEDIA: str = "keep"
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 6 * 3600
+    
     # OpenAI Configuration
     OPENAI_API_KEY: str
     
@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 from app.config import settings
+from app.utils.metrics import instrument_engine
 
 engine = create_engine(settings.DATABASE_URL)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -14,3 +17,44 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def add_missing_columns():
+    """
+    Add columns declared on the models but missing from existing tables.
+
+    `create_all` only creates new tables, so this covers additive changes
+    (e.g. `users.is_admin`) on databases created by earlier versions. New
+    columns must be nullable or define a `server_default`.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_spec = CreateColumn(column).compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_spec}"
+                conn.execute(text(ddl))
+
+def add_missing_indexes():
+    """
+    Create indexes declared on the models but missing from existing tables.
+
+    Like `add_missing_columns`, this covers databases created before an
+    index was added (e.g. `incident_datetime`, used by the list queries).
+    On PostgreSQL, an index created on a partitioned table is created on
+    every partition.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
@@ -1,4 +1,8 @@
 from app.models.user import User
 from app.models.fall_detection import FallDetection
+from app.models.incident_rollup import IncidentRollup
+from app.models.storage_outbox import StorageOutbox
+from app.models.idempotency_key import IdempotencyKey
+from app.models.confirmed_upload import ConfirmedUpload
 
-__all__ = ["User", "FallDetection"]
+__all__ = ["User", "FallDetection", "IncidentRollup", "StorageOutbox", "IdempotencyKey", "ConfirmedUpload"]
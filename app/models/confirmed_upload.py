@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ConfirmedUpload(Base):
+    """
+    Objeto subido directamente (URL pre-firmada) que ya se registró.
+    
+    La clave primaria hace que dos confirmaciones simultáneas del mismo
+    `upload_token` no creen dos registros: la segunda falla al insertar
+    en la misma transacción que su incidente y se responde 409.
+    """
+    __tablename__ = "confirmed_uploads"
+
+    object_url = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -7,7 +7,15 @@ class FallDetection(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     image_url = Column(String, nullable=False)
+    # Derivadas WebP generadas en segundo plano (NULL hasta que están listas)
+    thumbnail_url = Column(String, nullable=True)
+    preview_url = Column(String, nullable=True)
     station = Column(String, nullable=False)
     detected_object = Column(String, nullable=False)
-    incident_datetime = Column(DateTime(timezone=True), nullable=False)
+    incident_datetime = Column(DateTime(timezone=True), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Hash perceptual (dHash, 16 hex) para agrupar frames casi idénticos
+    image_hash = Column(String(16), nullable=True)
+    # Frames casi idénticos agrupados en este incidente en vez de guardarse
+    duplicate_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_duplicate_at = Column(DateTime(timezone=True), nullable=True)
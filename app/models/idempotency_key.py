@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, UniqueConstraint
+from app.database import Base
+
+class IdempotencyKey(Base):
+    """
+    Respuesta guardada de una petición con cabecera `Idempotency-Key`.
+    
+    Mientras la petición original se procesa, `status_code` es NULL (pendiente);
+    al terminar se guarda la respuesta para devolverla tal cual a los reintentos.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_scope_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # "POST /reports/incident"
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)  # UTC
@@ -25,6 +25,6 @@ class IncidentReport(Base):
     type = Column(SQLEnum(IncidentType), nullable=False)
     level = Column(SQLEnum(IncidentLevel), nullable=False)
     description = Column(Text, nullable=True)
-    incident_datetime = Column(DateTime(timezone=True), nullable=False)
+    incident_datetime = Column(DateTime(timezone=True), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
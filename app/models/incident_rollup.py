@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from app.database import Base
+
+class IncidentRollup(Base):
+    """
+    Conteos pre-agregados de incidentes por estación, línea, hora, tipo y nivel.
+    
+    Se mantienen de forma incremental al crear/eliminar reportes y detecciones
+    de caída, de modo que /reports/stats no tenga que recorrer las tablas base.
+    """
+    __tablename__ = "incident_rollups"
+    __table_args__ = (
+        UniqueConstraint("source", "station", "line", "bucket_start", "type", "level", name="uq_incident_rollup_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, nullable=False)  # "incident_report" | "fall_detection"
+    station = Column(String, nullable=False)
+    line = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False, index=True)  # Hora UTC truncada
+    type = Column(String, nullable=False)
+    level = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class StorageOutbox(Base):
+    """
+    Operaciones pendientes sobre el almacenamiento de archivos (S3 o local).
+    
+    Las rutas registran aquí el borrado de un archivo en la misma transacción
+    que modifica la base de datos; el reconciliador en segundo plano lo ejecuta
+    y reintenta con backoff hasta que lo consigue, y entonces borra la fila.
+    """
+    __tablename__ = "storage_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    operation = Column(String, nullable=False, default="delete")
+    object_url = Column(String, nullable=False)
+    reason = Column(String, nullable=False)  # "fall_detection_deleted", "incident_report_failed", "sweep"...
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
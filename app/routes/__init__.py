@@ -2,5 +2,9 @@ from app.routes.auth import router as auth_router
 from app.routes.metro import router as metro_router
 from app.routes.fall_detection import router as fall_detection_router
 from app.routes.incident_reports import router as incident_reports_router
+from app.routes.incident_stats import router as incident_stats_router
+from app.routes.profiling import router as profiling_router
+from app.routes.uploads import router as uploads_router
+from app.routes.media import router as media_router
 
-__all__ = ["auth_router", "metro_router", "fall_detection_router", "incident_reports_router"]
+__all__ = ["auth_router", "metro_router", "fall_detection_router", "incident_reports_router", "incident_stats_router", "profiling_router", "uploads_router", "media_router"]
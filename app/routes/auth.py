@@ -1,18 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from typing import Optional
 
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, LoginResponse, Token
-from app.utils.security import hash_password, verify_password
+from app.utils.security import hash_password_async, verify_and_update_password, PasswordHasherBusy
 from app.utils.jwt import create_access_token, verify_token
+from app.utils.cache import TTLCache
 from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Short-lived cache of authenticated users keyed by email
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(email: str):
+    """
+    Drop a user from the authentication cache.
+    Call it after changes that bypass the ORM (e.g. bulk `query.update()`).
+    """
+    user_cache.delete(email)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    """Keep the user cache coherent when a user is modified, deactivated or deleted"""
+    invalidate_user(target.email)
+    # If the email itself changed, the entry is still stored under the old one
+    for old_email in inspect(target).attrs.email.history.deleted:
+        invalidate_user(old_email)
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     Dependency to get the current authenticated user from JWT token
@@ -31,44 +54,95 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if email is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = user_cache.get(email)
     if user is None:
-        raise credentials_exception
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            raise credentials_exception
+        # Detach so the cached instance outlives this request's session
+        db.expunge(user)
+        user_cache.set(email, user)
     
     return user
 
+def get_current_admin_user(current_user: User = Depends(get_current_user)):
+    """
+    Dependency that only lets through authenticated users flagged as admin
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+def password_hasher_busy_exception() -> HTTPException:
+    """503 returned when the password hashing pool is saturated"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+_DUPLICATE_USER_DETAILS = {
+    "email": "Email already registered",
+    "username": "Username already taken",
+}
+
+def _duplicate_user_field(error: IntegrityError) -> Optional[str]:
+    """
+    Column ("email" or "username") of a unique violation on users, or None
+    for any other integrity error (NOT NULL, foreign key, check...)
+    """
+    orig = error.orig
+    # PostgreSQL: SQLSTATE 23505 (unique_violation) and the constraint name
+    sqlstate = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if sqlstate is not None:
+        if sqlstate != "23505":
+            return None
+        source = getattr(getattr(orig, "diag", None), "constraint_name", None) or ""
+    else:
+        # SQLite: "UNIQUE constraint failed: users.email"
+        message = str(orig)
+        if not message.startswith("UNIQUE constraint failed"):
+            return None
+        source = message.replace("users.", "users_")
+    for field in ("username", "email"):
+        if f"users_{field}" in source:
+            return field
+    return None
+
 @router.post("/register", response_model=LoginResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user
     """
-    # Check if user with email already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
+    try:
+        hashed_pwd = await hash_password_async(user_data.password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy_exception()
     
-    # Check if username already exists
-    existing_username = db.query(User).filter(User.username == user_data.username).first()
-    if existing_username:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
-        )
-    
-    # Create new user
-    hashed_pwd = hash_password(user_data.password)
-    new_user = User(
+    # Single INSERT ... RETURNING; uniqueness is enforced by the
+    # constraints on users.email / users.username, so concurrent signups
+    # cannot slip a duplicate in between a check and the insert
+    stmt = insert(User).values(
         email=user_data.email,
         username=user_data.username,
         hashed_password=hashed_pwd
-    )
+    ).returning(User.id, User.email, User.username, User.is_active, User.created_at)
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        new_user = db.execute(stmt).one()
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        field = _duplicate_user_field(e)
+        if field is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_DUPLICATE_USER_DETAILS[field]
+        )
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -99,13 +173,23 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(user_data.password, user.hashed_password):
+    try:
+        is_valid, new_hash = await verify_and_update_password(user_data.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy_exception()
+    
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Transparently rehash when the bcrypt cost parameters changed
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    
     # Check if user is active
     if not user.is_active:
         raise HTTPException(
@@ -1,20 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+import asyncio
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, UploadFile, File, Form
+from pydantic import TypeAdapter
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models.fall_detection import FallDetection
+from app.models.confirmed_upload import ConfirmedUpload
 from app.schemas.fall_detection import (
+    FallDetectionConfirm,
     FallDetectionResponse,
     FallDetectionUploadResponse
 )
 from app.utils.s3_handler import s3_handler
+from app.utils.direct_uploads import DirectUploadError, KIND_FALL_DETECTION_IMAGE, verify_upload
+from app.utils.image_derivatives import derivative_pipeline
+from app.utils.storage_outbox import enqueue_delete, storage_reconciler
+from app.utils.near_duplicates import near_duplicates, dhash, fall_detection_frames_total
+from app.utils.incident_rollups import record_fall_detection
+from app.utils.incident_index import active_incidents
+from app.utils.single_flight import fall_detection_reads
+from app.utils.record_cache import fall_detection_records
+from app.utils.partitioning import incident_window
+from app.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 router = APIRouter(prefix="/falldetection", tags=["Fall Detection"])
 
+_fall_detection_adapter = TypeAdapter(FallDetectionResponse)
+
+def _insert_fall_detection(
+    db: Session,
+    image_url: str,
+    station: str,
+    detected_object: str,
+    incident_dt: datetime,
+    image_data: Optional[bytes] = None,
+    image_hash: Optional[int] = None
+) -> FallDetectionUploadResponse:
+    """
+    Crea el registro, actualiza los agregados y el índice de incidentes activos
+    y encola la generación de la miniatura y la vista previa
+    """
+    fall_detection = FallDetection(
+        image_url=image_url,
+        station=station,
+        detected_object=detected_object,
+        incident_datetime=incident_dt,
+        image_hash=f"{image_hash:016x}" if image_hash is not None else None
+    )
+    
+    db.add(fall_detection)
+    record_fall_detection(db, fall_detection)
+    db.commit()
+    db.refresh(fall_detection)
+    active_incidents.add_fall_detection(fall_detection)
+    derivative_pipeline.schedule(fall_detection.id, image_url, image_data)
+    
+    response = FallDetectionResponse.from_orm(fall_detection)
+    fall_detection_records.put(fall_detection.id, _fall_detection_adapter.dump_json(response))
+    return FallDetectionUploadResponse(
+        message="Incidente registrado exitosamente",
+        fall_detection=response
+    )
+
+def _discard_image(db: Session, image_url: str):
+    """Encola el borrado de una imagen subida cuyo registro no se pudo crear"""
+    try:
+        db.rollback()
+        enqueue_delete(db, [image_url], reason="fall_detection_failed")
+        db.commit()
+        storage_reconciler.wake()
+    except Exception as e:
+        # El barrido periódico la encontrará como huérfana
+        db.rollback()
+        log.error("image_cleanup_enqueue_failed", image_url=image_url, error=str(e))
+
+async def _merge_duplicate(db: Session, station: str, image_hash: int, incident_dt: datetime) -> Optional[FallDetectionUploadResponse]:
+    """
+    Agrupa un frame casi idéntico a uno reciente de la misma estación en su incidente
+    
+    Returns:
+        Respuesta con el incidente existente, o None si el frame es un evento nuevo
+    """
+    while (duplicate_id := await near_duplicates.find(station, image_hash, incident_dt)) is not None:
+        updated = db.query(FallDetection)\
+            .filter(FallDetection.id == duplicate_id)\
+            .update({
+                FallDetection.duplicate_count: FallDetection.duplicate_count + 1,
+                FallDetection.last_duplicate_at: case(
+                    (FallDetection.last_duplicate_at.is_(None) | (FallDetection.last_duplicate_at < incident_dt), incident_dt),
+                    else_=FallDetection.last_duplicate_at
+                )
+            }, synchronize_session=False)
+        db.commit()
+        if not updated:
+            # El incidente se eliminó: dejar de agrupar en él
+            near_duplicates.remove(duplicate_id)
+            continue
+        fall_detection_reads.invalidate(("get", duplicate_id))
+        
+        fall_detection = db.query(FallDetection).filter(FallDetection.id == duplicate_id).first()
+        fall_detection_frames_total.labels("merged").inc()
+        response = FallDetectionResponse.from_orm(fall_detection)
+        fall_detection_records.put(duplicate_id, _fall_detection_adapter.dump_json(response))
+        return FallDetectionUploadResponse(
+            message="Imagen casi idéntica a un incidente reciente de la estación; se agrupó en el incidente existente",
+            fall_detection=response
+        )
+    return None
+
 @router.post("", response_model=FallDetectionUploadResponse, status_code=status.HTTP_201_CREATED)
 async def create_fall_detection(
+    response: Response,
     image: UploadFile = File(..., description="Imagen del incidente"),
     station: str = Form(..., description="Estación donde ocurrió el incidente"),
     detected_object: str = Form(..., description="Objeto detectado"),
@@ -31,6 +134,10 @@ async def create_fall_detection(
     - **incident_datetime**: Fecha y hora en formato ISO 8601 (ej: 2024-01-20T10:30:00)
     
     La imagen se sube a AWS S3 y la URL se guarda en la base de datos.
+    
+    Si la imagen es casi idéntica (hash perceptual) a otra de la misma estación
+    de los últimos `NEAR_DUPLICATE_WINDOW_SECONDS`, no se guarda: se agrupa en
+    ese incidente (`duplicate_count`) y se responde 200 con el incidente existente.
     """
     try:
         # Validar que sea una imagen
@@ -49,31 +156,51 @@ async def create_fall_detection(
                 detail="Formato de fecha inválido. Use formato ISO 8601 (ej: 2024-01-20T10:30:00)"
             )
         
-        # Subir imagen a S3
-        try:
-            image_url = s3_handler.upload_image(image.file, image.filename)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error al subir imagen a S3: {str(e)}"
-            )
+        # Leer la imagen una vez para el hash perceptual y las derivadas
+        image_data = None
+        if near_duplicates.enabled or derivative_pipeline.enabled:
+            image_data = await image.read()
+            await image.seek(0)
         
-        # Crear registro en base de datos
-        fall_detection = FallDetection(
-            image_url=image_url,
-            station=station,
-            detected_object=detected_object,
-            incident_datetime=incident_dt
-        )
+        # Agrupar ráfagas de frames casi idénticos antes de subir nada
+        image_hash = None
+        reservation = None
+        if near_duplicates.enabled:
+            image_hash = await asyncio.to_thread(dhash, image_data)
+            if image_hash is None:
+                fall_detection_frames_total.labels("unhashable").inc()
+            else:
+                merged = await _merge_duplicate(db, station, image_hash, incident_dt)
+                if merged is not None:
+                    response.status_code = status.HTTP_200_OK
+                    return merged
+                # Los frames concurrentes de la misma ráfaga esperan a este incidente
+                reservation = near_duplicates.reserve(station, image_hash, incident_dt)
         
-        db.add(fall_detection)
-        db.commit()
-        db.refresh(fall_detection)
+        image_url = None
+        try:
+            # Subir imagen a S3
+            try:
+                image_url = s3_handler.upload_image(image.file, image.filename)
+            except Exception as e:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error al subir imagen a S3: {str(e)}"
+                )
+            
+            # Crear registro en base de datos
+            result = _insert_fall_detection(db, image_url, station, detected_object, incident_dt, image_data, image_hash)
+        except BaseException:
+            if reservation is not None:
+                near_duplicates.resolve(reservation, None)
+            if image_url is not None:
+                _discard_image(db, image_url)
+            raise
         
-        return FallDetectionUploadResponse(
-            message="Incidente registrado exitosamente",
-            fall_detection=FallDetectionResponse.from_orm(fall_detection)
-        )
+        if reservation is not None:
+            near_duplicates.resolve(reservation, result.fall_detection.id)
+        fall_detection_frames_total.labels("stored").inc()
+        return result
         
     except HTTPException:
         raise
@@ -84,10 +211,56 @@ async def create_fall_detection(
             detail=f"Error al procesar la solicitud: {str(e)}"
         )
 
+@router.post("/confirm", response_model=FallDetectionUploadResponse, status_code=status.HTTP_201_CREATED)
+async def confirm_fall_detection(
+    confirmation: FallDetectionConfirm,
+    db: Session = Depends(get_db)
+):
+    """
+    Registra un incidente cuya imagen se subió directamente al almacenamiento
+    
+    Segundo paso de la subida directa: la imagen se sube con la URL de
+    **POST /uploads/presign** (kind `fall_detection_image`) y después se envía
+    aquí el `upload_token` junto con los datos del incidente. Solo se comprueban
+    los metadatos del objeto (existe y tiene el tamaño declarado); los bytes no
+    pasan por la API.
+    """
+    try:
+        image_url = await asyncio.to_thread(verify_upload, confirmation.upload_token, KIND_FALL_DETECTION_IMAGE)
+    except DirectUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    already_confirmed = HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Esta subida ya fue confirmada"
+    )
+    if db.query(FallDetection.id).filter(FallDetection.image_url == image_url).first():
+        raise already_confirmed
+    
+    try:
+        # Reservar la subida en la misma transacción que el incidente: con dos
+        # confirmaciones simultáneas, la segunda falla aquí en vez de duplicarlo
+        db.add(ConfirmedUpload(object_url=image_url, kind=KIND_FALL_DETECTION_IMAGE))
+        db.flush()
+        return _insert_fall_detection(
+            db, image_url, confirmation.station, confirmation.detected_object, confirmation.incident_datetime
+        )
+    except IntegrityError:
+        db.rollback()
+        raise already_confirmed
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al procesar la solicitud: {str(e)}"
+        )
+
 @router.get("", response_model=List[FallDetectionResponse])
 async def get_all_fall_detections(
     skip: int = 0,
     limit: int = 100,
+    since: Optional[datetime] = Query(None, description="Solo incidentes desde esta fecha (incluida)"),
+    until: Optional[datetime] = Query(None, description="Solo incidentes anteriores a esta fecha"),
     db: Session = Depends(get_db)
 ):
     """
@@ -96,8 +269,11 @@ async def get_all_fall_detections(
     Parámetros:
     - **skip**: Número de registros a saltar (para paginación)
     - **limit**: Número máximo de registros a retornar
+    - **since** / **until**: Ventana de tiempo opcional; en PostgreSQL solo se
+      leen las particiones mensuales que la cubren
     """
-    fall_detections = db.query(FallDetection)\
+    query = incident_window(db.query(FallDetection), FallDetection.incident_datetime, since, until)
+    fall_detections = query\
         .order_by(FallDetection.incident_datetime.desc())\
         .offset(skip)\
         .limit(limit)\
@@ -105,23 +281,37 @@ async def get_all_fall_detections(
     
     return [FallDetectionResponse.from_orm(fd) for fd in fall_detections]
 
+def _load_fall_detection(fall_detection_id: int) -> bytes:
+    """Consulta un incidente y lo serializa (se ejecuta en un hilo)"""
+    db = SessionLocal()
+    try:
+        fall_detection = db.query(FallDetection).filter(FallDetection.id == fall_detection_id).first()
+        
+        if not fall_detection:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Incidente no encontrado"
+            )
+        
+        return _fall_detection_adapter.dump_json(FallDetectionResponse.from_orm(fall_detection))
+    finally:
+        db.close()
+
 @router.get("/{fall_detection_id}", response_model=FallDetectionResponse)
 async def get_fall_detection(
-    fall_detection_id: int,
-    db: Session = Depends(get_db)
+    fall_detection_id: int
 ):
     """
     Obtiene los detalles de un incidente específico por ID
-    """
-    fall_detection = db.query(FallDetection).filter(FallDetection.id == fall_detection_id).first()
     
-    if not fall_detection:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Incidente no encontrado"
-        )
-    
-    return FallDetectionResponse.from_orm(fall_detection)
+    Se sirve desde la caché de registros; las peticiones simultáneas de un
+    incidente que no está en ella comparten una sola consulta.
+    """
+    body = await fall_detection_records.get_or_load(
+        fall_detection_id,
+        partial(fall_detection_reads.do, ("get", fall_detection_id), partial(_load_fall_detection, fall_detection_id))
+    )
+    return Response(content=body, media_type="application/json")
 
 @router.delete("/{fall_detection_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_fall_detection(
@@ -130,6 +320,8 @@ async def delete_fall_detection(
 ):
     """
     Elimina un incidente y su imagen asociada de S3
+    
+    La imagen (y sus derivadas) se borran en segundo plano después del commit.
     """
     fall_detection = db.query(FallDetection).filter(FallDetection.id == fall_detection_id).first()
     
@@ -139,15 +331,20 @@ async def delete_fall_detection(
             detail="Incidente no encontrado"
         )
     
-    # Eliminar imagen de S3
-    try:
-        s3_handler.delete_image(fall_detection.image_url)
-    except Exception as e:
-        # Log error pero continuar con eliminación de DB
-        print(f"Error al eliminar imagen de S3: {str(e)}")
-    
-    # Eliminar de base de datos
+    # Eliminar de base de datos; la imagen y sus derivadas las borra de S3
+    # el reconciliador del outbox (en la misma transacción)
+    enqueue_delete(
+        db,
+        [fall_detection.image_url, fall_detection.thumbnail_url, fall_detection.preview_url],
+        reason="fall_detection_deleted"
+    )
     db.delete(fall_detection)
+    record_fall_detection(db, fall_detection, delta=-1)
     db.commit()
+    storage_reconciler.wake()
+    active_incidents.remove_fall_detection(fall_detection_id)
+    near_duplicates.remove(fall_detection_id)
+    fall_detection_reads.invalidate(("get", fall_detection_id))
+    fall_detection_records.delete(fall_detection_id)
     
     return None
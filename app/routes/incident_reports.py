@@ -1,20 +1,52 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends
+import asyncio
+from functools import partial
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends, Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from dateutil import parser
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models.incident_report import IncidentReport, IncidentType, IncidentLevel
+from app.models.confirmed_upload import ConfirmedUpload
 from app.schemas.incident_report import (
     IncidentReportResponse,
     IncidentReportAutomaticResponse,
-    IncidentReportManualCreate
+    IncidentReportManualCreate,
+    IncidentReportConfirm
 )
 from app.utils.audio_handler import audio_handler
+from app.utils.direct_uploads import DirectUploadError, KIND_INCIDENT_AUDIO, verify_upload
+from app.utils.storage_outbox import enqueue_delete, storage_reconciler
 from app.utils.openai_service import openai_service
+from app.utils.incident_rollups import record_incident_report
+from app.utils.incident_index import active_incidents
+from app.utils.single_flight import incident_report_reads
+from app.utils.record_cache import incident_report_records
+from app.utils.partitioning import incident_window
+from app.utils.tracing import tracer
+from app.utils.logger import get_logger
 
 router = APIRouter(prefix="/reports/incident", tags=["Incident Reports"])
+log = get_logger(__name__)
+
+_incident_report_adapter = TypeAdapter(IncidentReportResponse)
+_incident_reports_adapter = TypeAdapter(List[IncidentReportResponse])
+
+
+def _incident_report_response(incident: IncidentReport) -> IncidentReportResponse:
+    """Representación de un reporte guardado en las consultas"""
+    return IncidentReportResponse(
+        audio_url=incident.audio_url,
+        station=incident.station,
+        type=incident.type.value,
+        level=incident.level.value,
+        description=incident.description if incident.description else "",
+        incident_datetime=incident.incident_datetime,
+        message=None
+    )
 
 
 @router.post("", response_model=IncidentReportResponse)
@@ -63,158 +95,273 @@ async def create_incident_report(
     - `message`: Mensaje de confirmación
     """
     
-    # Validate audio file - be flexible with content type detection
-    # Allow audio/* or common extensions if content type is missing/wrong
-    allowed_extensions = ['.aac', '.mp3', '.wav', '.m4a', '.ogg', '.flac', '.wma', '.opus']
-    file_extension = audio.filename.lower()[audio.filename.rfind('.'):] if '.' in audio.filename else ''
-    
-    is_valid_audio = (
-        (audio.content_type and audio.content_type.startswith('audio/')) or
-        file_extension in allowed_extensions
-    )
-    
-    if not is_valid_audio:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Only audio files are accepted. Received: {audio.content_type}, file: {audio.filename}"
-        )
-    
-    try:
-        # Save audio file first
-        audio_url = await audio_handler.save_audio(audio)
+    with tracer.span("incident_report.create", audio_filename=audio.filename) as request_span:
+        request_span.set_attribute("request_id", request_span.trace_id)
         
-        # Detectar el flujo: ¿Vienen los campos del formulario?
-        is_manual = station is not None and type is not None and level is not None
-        
-        if is_manual:
-            # FLUJO B: FORMULARIO MANUAL
-            # Usuario llenó el formulario, solo guardamos los datos
+        # Validate audio file - be flexible with content type detection
+        # Allow audio/* or common extensions if content type is missing/wrong
+        with tracer.span("incident_report.validate", content_type=audio.content_type, audio_bytes=audio.size):
+            allowed_extensions = ['.aac', '.mp3', '.wav', '.m4a', '.ogg', '.flac', '.wma', '.opus']
+            file_extension = audio.filename.lower()[audio.filename.rfind('.'):] if '.' in audio.filename else ''
+            
+            is_valid_audio = (
+                (audio.content_type and audio.content_type.startswith('audio/')) or
+                file_extension in allowed_extensions
+            )
             
-            # Validate enum values
-            try:
-                incident_type = IncidentType(type)
-                incident_level = IncidentLevel(level)
-            except ValueError as e:
-                audio_handler.delete_audio(audio_url)
+            if not is_valid_audio:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Invalid type or level value: {str(e)}"
+                    detail=f"Invalid file type. Only audio files are accepted. Received: {audio.content_type}, file: {audio.filename}"
                 )
+        
+        try:
+            # Save audio file first
+            with tracer.span("incident_report.save_audio", audio_bytes=audio.size) as stage:
+                audio_url = await audio_handler.save_audio(audio)
+                stage.set_attribute("audio_url", audio_url)
+            
+            # Detectar el flujo: ¿Vienen los campos del formulario?
+            is_manual = station is not None and type is not None and level is not None
+            request_span.set_attribute("flow", "manual" if is_manual else "ai")
             
-            # Parse incident_datetime or use current time
-            if incident_datetime:
+            if is_manual:
+                # FLUJO B: FORMULARIO MANUAL
+                # Usuario llenó el formulario, solo guardamos los datos
+                
+                # Validate enum values
                 try:
-                    incident_dt = parser.isoparse(incident_datetime)
-                except ValueError:
-                    audio_handler.delete_audio(audio_url)
+                    incident_type = IncidentType(type)
+                    incident_level = IncidentLevel(level)
+                except ValueError as e:
+                    _cleanup_audio(db, audio_url)
                     raise HTTPException(
                         status_code=400,
-                        detail="Invalid datetime format. Use ISO 8601 format."
+                        detail=f"Invalid type or level value: {str(e)}"
                     )
-            else:
-                incident_dt = datetime.now()
-            
-            # Save to database
-            db_incident = IncidentReport(
-                audio_url=audio_url,
-                station=station,
-                type=incident_type,
-                level=incident_level,
-                description=description if description else None,
-                incident_datetime=incident_dt
-            )
-            
-            db.add(db_incident)
-            db.commit()
-            db.refresh(db_incident)
-            
-            return IncidentReportResponse(
-                audio_url=audio_url,
-                station=station,
-                type=type,
-                level=level,
-                description=description if description else "",
-                incident_datetime=incident_dt,
-                message="Reporte manual guardado exitosamente"
-            )
-        
-        else:
-            # FLUJO A: TRANSCRIPCIÓN AUTOMÁTICA CON IA
-            # Usuario solo envió audio, usamos OpenAI para extraer datos
-            
-            try:
-                print("🤖 === INICIANDO PROCESAMIENTO CON IA ===")
-                print(f"📁 Audio file: {audio.filename}")
-                print(f"📋 Content type: {audio.content_type}")
-                print(f"🔗 Audio saved at: {audio_url}")
-                
-                # Reset file pointer before transcription
-                await audio.seek(0)
-                print("🔄 File pointer reset to beginning")
                 
-                # 1. Transcribe audio using Whisper
-                print("🎯 Step 1/3: Transcribing audio with Whisper...")
-                transcription = await openai_service.transcribe_audio(audio)
-                print(f"✅ Transcription completed: '{transcription[:150]}...'")
+                # Parse incident_datetime or use current time
+                if incident_datetime:
+                    try:
+                        incident_dt = parser.isoparse(incident_datetime)
+                    except ValueError:
+                        _cleanup_audio(db, audio_url)
+                        raise HTTPException(
+                            status_code=400,
+                            detail="Invalid datetime format. Use ISO 8601 format."
+                        )
+                else:
+                    incident_dt = datetime.now()
                 
-                # 2. Extract structured data using GPT
-                print("🎯 Step 2/3: Extracting structured data with GPT...")
-                extracted_data = await openai_service.extract_incident_data(transcription)
-                print(f"✅ Data extracted: {extracted_data}")
-                
-                # 3. Parse incident_datetime
-                print("🎯 Step 3/3: Saving to database...")
-                incident_dt = parser.isoparse(extracted_data["incident_datetime"])
-                
-                # 4. Save to database
-                db_incident = IncidentReport(
-                    audio_url=audio_url,
-                    station=extracted_data["station"],
-                    type=IncidentType(extracted_data["type"]),
-                    level=IncidentLevel(extracted_data["level"]),
-                    description=extracted_data.get("description") or "",
-                    incident_datetime=incident_dt
+                # Save to database
+                _insert_incident_report(
+                    db, audio_url, station, incident_type, incident_level,
+                    description if description else None, incident_dt
                 )
                 
-                db.add(db_incident)
-                db.commit()
-                db.refresh(db_incident)
-                
-                print("✅ === PROCESAMIENTO COMPLETADO EXITOSAMENTE ===")
-                
-                # 5. Return response
                 return IncidentReportResponse(
                     audio_url=audio_url,
-                    station=extracted_data["station"],
-                    type=extracted_data["type"],
-                    level=extracted_data["level"],
-                    description=extracted_data.get("description") or "",
+                    station=station,
+                    type=type,
+                    level=level,
+                    description=description if description else "",
                     incident_datetime=incident_dt,
-                    message=f"Reporte procesado automáticamente con IA. Transcripción: '{transcription[:100]}...'"
-                )
-            except Exception as ai_error:
-                # Si falla el procesamiento con IA, eliminar el audio y reportar error específico
-                print(f"❌ === ERROR EN PROCESAMIENTO CON IA ===")
-                print(f"❌ Error details: {str(ai_error)}")
-                import traceback
-                print(f"📋 Full traceback:\n{traceback.format_exc()}")
-                audio_handler.delete_audio(audio_url)
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Error en procesamiento con IA: {str(ai_error)}"
+                    message="Reporte manual guardado exitosamente"
                 )
+            
+            else:
+                # FLUJO A: TRANSCRIPCIÓN AUTOMÁTICA CON IA
+                # Usuario solo envió audio, usamos OpenAI para extraer datos
+                
+                try:
+                    log.info(
+                        "ai_processing_started",
+                        filename=audio.filename,
+                        content_type=audio.content_type,
+                        audio_url=audio_url
+                    )
+                    
+                    # Reset file pointer before transcription
+                    await audio.seek(0)
+                    
+                    # 1. Transcribe audio using Whisper
+                    with tracer.span("incident_report.transcribe_audio", audio_bytes=audio.size) as stage:
+                        transcription = await openai_service.transcribe_audio(audio)
+                        stage.set_attribute("transcription_chars", len(transcription))
+                    log.debug("transcription_received", transcription_preview=transcription[:150])
+                    
+                    # 2. Extract structured data using GPT
+                    with tracer.span("incident_report.extract_incident_data", transcription_chars=len(transcription)) as stage:
+                        extracted_data = await openai_service.extract_incident_data(transcription)
+                        stage.set_attribute("incident_type", extracted_data["type"])
+                        stage.set_attribute("incident_level", extracted_data["level"])
+                    log.debug("incident_data_extracted", extracted=extracted_data)
+                    
+                    # 3. Parse incident_datetime
+                    incident_dt = parser.isoparse(extracted_data["incident_datetime"])
+                    
+                    # 4. Save to database
+                    db_incident = _insert_incident_report(
+                        db,
+                        audio_url,
+                        extracted_data["station"],
+                        IncidentType(extracted_data["type"]),
+                        IncidentLevel(extracted_data["level"]),
+                        extracted_data.get("description") or "",
+                        incident_dt
+                    )
+                    
+                    log.info("ai_processing_completed", incident_id=db_incident.id)
+                    
+                    # 5. Return response
+                    return IncidentReportResponse(
+                        audio_url=audio_url,
+                        station=extracted_data["station"],
+                        type=extracted_data["type"],
+                        level=extracted_data["level"],
+                        description=extracted_data.get("description") or "",
+                        incident_datetime=incident_dt,
+                        message=f"Reporte procesado automáticamente con IA. Transcripción: '{transcription[:100]}...'"
+                    )
+                except Exception as ai_error:
+                    # Si falla el procesamiento con IA, eliminar el audio y reportar error específico
+                    log.exception("ai_processing_failed", audio_url=audio_url, error=str(ai_error))
+                    _cleanup_audio(db, audio_url)
+                    raise HTTPException(
+                        status_code=500,
+                        detail=f"Error en procesamiento con IA: {str(ai_error)}"
+                    )
+            
+        except HTTPException:
+            # Re-raise HTTP exceptions
+            raise
+        except Exception as e:
+            # Cleanup: delete audio if something fails
+            if 'audio_url' in locals():
+                _cleanup_audio(db, audio_url)
+            
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error processing incident report: {str(e)}"
+            )
+
+
+def _insert_incident_report(
+    db: Session,
+    audio_url: str,
+    station: str,
+    incident_type: IncidentType,
+    incident_level: IncidentLevel,
+    description: Optional[str],
+    incident_dt: datetime
+) -> IncidentReport:
+    """Guarda el reporte, actualiza los agregados y el índice de incidentes activos"""
+    with tracer.span("incident_report.db_insert") as stage:
+        db_incident = IncidentReport(
+            audio_url=audio_url,
+            station=station,
+            type=incident_type,
+            level=incident_level,
+            description=description,
+            incident_datetime=incident_dt
+        )
         
-    except HTTPException:
-        # Re-raise HTTP exceptions
-        raise
-    except Exception as e:
-        # Cleanup: delete audio if something fails
-        if 'audio_url' in locals():
-            audio_handler.delete_audio(audio_url)
+        db.add(db_incident)
+        record_incident_report(db, db_incident)
+        db.commit()
+        db.refresh(db_incident)
+        stage.set_attribute("incident_id", db_incident.id)
+    active_incidents.add_incident_report(db_incident)
+    incident_report_reads.invalidate()
+    incident_report_records.put(db_incident.id, _incident_report_adapter.dump_json(_incident_report_response(db_incident)))
+    return db_incident
+
+
+def _cleanup_audio(db: Session, audio_url: str):
+    """
+    Encola el borrado del audio de un reporte fallido (registrado como etapa de la traza)
+    
+    El reconciliador lo elimina en segundo plano; si ni siquiera se puede encolar,
+    el barrido periódico lo encontrará como huérfano.
+    """
+    with tracer.span("incident_report.cleanup", audio_url=audio_url) as stage:
+        try:
+            db.rollback()
+            enqueue_delete(db, [audio_url], reason="incident_report_failed")
+            db.commit()
+            storage_reconciler.wake()
+            stage.set_attribute("queued", True)
+        except Exception as e:
+            db.rollback()
+            stage.set_attribute("queued", False)
+            log.error("audio_cleanup_enqueue_failed", audio_url=audio_url, error=str(e))
+
+
+@router.post("/confirm", response_model=IncidentReportResponse, status_code=201)
+async def confirm_incident_report(
+    confirmation: IncidentReportConfirm,
+    db: Session = Depends(get_db)
+):
+    """
+    ## ⬆️ Confirmar un audio subido directamente al almacenamiento
+    
+    Segundo paso de la subida directa (solo flujo manual):
+    1. `POST /uploads/presign` con `kind=incident_audio` devuelve una URL pre-firmada
+    2. El cliente sube el audio con esa URL (PUT)
+    3. Este endpoint recibe el `upload_token` y los campos del formulario
+    
+    El audio no pasa por la API: solo se comprueba que existe y que su tamaño
+    coincide con el declarado. La transcripción con IA necesita el audio, así
+    que sigue requiriendo `POST /reports/incident`.
+    """
+    with tracer.span("incident_report.confirm", station=confirmation.station) as request_span:
+        request_span.set_attribute("flow", "direct_upload")
         
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing incident report: {str(e)}"
+        try:
+            audio_url = await asyncio.to_thread(verify_upload, confirmation.upload_token, KIND_INCIDENT_AUDIO)
+        except DirectUploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        
+        try:
+            incident_type = IncidentType(confirmation.type)
+            incident_level = IncidentLevel(confirmation.level)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid type or level value: {str(e)}"
+            )
+        
+        if db.query(IncidentReport.id).filter(IncidentReport.audio_url == audio_url).first():
+            raise HTTPException(status_code=409, detail="This upload was already confirmed")
+        
+        incident_dt = confirmation.incident_datetime or datetime.now()
+        try:
+            # Reservar la subida en la misma transacción que el reporte: con dos
+            # confirmaciones simultáneas, la segunda falla aquí en vez de duplicarlo
+            db.add(ConfirmedUpload(object_url=audio_url, kind=KIND_INCIDENT_AUDIO))
+            db.flush()
+            _insert_incident_report(
+                db, audio_url, confirmation.station, incident_type, incident_level,
+                confirmation.description or None, incident_dt
+            )
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="This upload was already confirmed")
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error processing incident report: {str(e)}"
+            )
+        
+        return IncidentReportResponse(
+            audio_url=audio_url,
+            station=confirmation.station,
+            type=confirmation.type,
+            level=confirmation.level,
+            description=confirmation.description or "",
+            incident_datetime=incident_dt,
+            message="Reporte manual guardado exitosamente"
         )
 
 
@@ -232,12 +379,10 @@ async def create_incident_report_automatic_deprecated(
     
     Este endpoint redirige al nuevo endpoint principal.
     """
-    print("📌 /automatic endpoint called (deprecated)")
-    print(f"📁 Received audio: {audio.filename}, type: {audio.content_type}")
+    log.info("deprecated_endpoint_called", endpoint="/reports/incident/automatic", filename=audio.filename)
     
     # Reset file pointer in case it was read before
     await audio.seek(0)
-    print("🔄 File pointer reset to beginning")
     
     return await create_incident_report(
         audio=audio,
@@ -281,59 +426,74 @@ async def create_incident_report_manual_deprecated(
 # ============================================================================
 
 
+def _load_incident_reports(skip: int, limit: int, since: Optional[datetime], until: Optional[datetime]) -> bytes:
+    """Consulta una página de reportes y la serializa (se ejecuta en un hilo)"""
+    db = SessionLocal()
+    try:
+        query = incident_window(db.query(IncidentReport), IncidentReport.incident_datetime, since, until)
+        incidents = query\
+            .order_by(IncidentReport.incident_datetime.desc())\
+            .offset(skip)\
+            .limit(limit)\
+            .all()
+        
+        return _incident_reports_adapter.dump_json([_incident_report_response(incident) for incident in incidents])
+    finally:
+        db.close()
+
+
 @router.get("", response_model=list[IncidentReportResponse])
 async def list_incident_reports(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    since: Optional[datetime] = Query(None, description="Solo incidentes desde esta fecha (incluida)"),
+    until: Optional[datetime] = Query(None, description="Solo incidentes anteriores a esta fecha")
 ):
     """
     ## 📋 Listar todos los reportes de incidentes
     
     Retorna una lista paginada de reportes ordenados por fecha del incidente (más reciente primero).
-    """
-    incidents = db.query(IncidentReport)\
-        .order_by(IncidentReport.incident_datetime.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    Las peticiones idénticas simultáneas comparten una sola consulta.
     
-    return [
-        IncidentReportResponse(
-            audio_url=incident.audio_url,
-            station=incident.station,
-            type=incident.type.value,
-            level=incident.level.value,
-            description=incident.description if incident.description else "",
-            incident_datetime=incident.incident_datetime,
-            message=None
-        )
-        for incident in incidents
-    ]
+    `since`/`until` acotan la ventana de tiempo; en PostgreSQL solo se leen
+    las particiones mensuales que la cubren.
+    """
+    body = await incident_report_reads.do(
+        ("list", skip, limit, since, until),
+        partial(_load_incident_reports, skip, limit, since, until)
+    )
+    return Response(content=body, media_type="application/json")
+
+
+def _load_incident_report(incident_id: int) -> bytes:
+    """Consulta un reporte y lo serializa (se ejecuta en un hilo)"""
+    db = SessionLocal()
+    try:
+        incident = db.query(IncidentReport).filter(IncidentReport.id == incident_id).first()
+        
+        if not incident:
+            raise HTTPException(status_code=404, detail="Incident report not found")
+        
+        return _incident_report_adapter.dump_json(_incident_report_response(incident))
+    finally:
+        db.close()
 
 
 @router.get("/{incident_id}", response_model=IncidentReportResponse)
 async def get_incident_report(
-    incident_id: int,
-    db: Session = Depends(get_db)
+    incident_id: int
 ):
     """
     ## 🔍 Obtener un reporte específico por ID
-    """
-    incident = db.query(IncidentReport).filter(IncidentReport.id == incident_id).first()
     
-    if not incident:
-        raise HTTPException(status_code=404, detail="Incident report not found")
-    
-    return IncidentReportResponse(
-        audio_url=incident.audio_url,
-        station=incident.station,
-        type=incident.type.value,
-        level=incident.level.value,
-        description=incident.description if incident.description else "",
-        incident_datetime=incident.incident_datetime,
-        message=None
+    Se sirve desde la caché de registros; solo consulta la base de datos si
+    el reporte no está en ella.
+    """
+    body = await incident_report_records.get_or_load(
+        incident_id,
+        partial(incident_report_reads.do, ("get", incident_id), partial(_load_incident_report, incident_id))
     )
+    return Response(content=body, media_type="application/json")
 
 
 @router.delete("/{incident_id}")
@@ -344,18 +504,22 @@ async def delete_incident_report(
     """
     ## 🗑️ Eliminar un reporte de incidente
     
-    Elimina el reporte de la base de datos y el archivo de audio del storage.
+    Elimina el reporte de la base de datos; el archivo de audio se borra del
+    storage en segundo plano después del commit.
     """
     incident = db.query(IncidentReport).filter(IncidentReport.id == incident_id).first()
     
     if not incident:
         raise HTTPException(status_code=404, detail="Incident report not found")
     
-    # Delete audio file
-    audio_handler.delete_audio(incident.audio_url)
-    
-    # Delete from database
+    # Delete from database; the audio file is deleted by the storage reconciler
+    enqueue_delete(db, [incident.audio_url], reason="incident_report_deleted")
     db.delete(incident)
+    record_incident_report(db, incident, delta=-1)
     db.commit()
+    storage_reconciler.wake()
+    active_incidents.remove_incident_report(incident_id)
+    incident_report_reads.invalidate()
+    incident_report_records.delete(incident_id)
     
     return {"message": "Incident report deleted successfully"}
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+
+from app.database import get_db
+from app.schemas.incident_stats import IncidentStatsResponse
+from app.utils.incident_rollups import get_stats
+
+router = APIRouter(prefix="/reports", tags=["Incident Stats"])
+
+
+@router.get("/stats", response_model=IncidentStatsResponse)
+async def get_incident_stats(
+    hours: int = Query(24, ge=1, le=24 * 90, description="Ventana de tiempo hacia atrás (horas)"),
+    bucket: Literal["hour", "day"] = Query("hour", description="Tamaño del intervalo de tiempo"),
+    source: Optional[Literal["incident_report", "fall_detection"]] = Query(None, description="Filtrar por origen"),
+    line: Optional[str] = Query(None, description="Filtrar por línea (line1, line2, unknown)"),
+    db: Session = Depends(get_db)
+):
+    """
+    ## 📊 Estadísticas agregadas de incidentes
+    
+    Conteos y distribución por severidad por estación, línea e intervalo de tiempo,
+    combinando reportes de incidentes y detecciones de caída.
+    
+    Se calcula a partir de rollups por hora que se mantienen al crear/eliminar
+    registros, por lo que no recorre las tablas de reportes.
+    """
+    return get_stats(db, hours=hours, bucket=bucket, source=source, line=line)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.config import settings
+from app.utils.audio_handler import audio_handler
+from app.utils.media import MediaFileResponse, resolve_media_path
+
+router = APIRouter(tags=["Media"])
+
+
+@router.api_route("/storage/incidents/{filename}", methods=["GET", "HEAD"], response_class=MediaFileResponse)
+async def get_incident_audio(filename: str):
+    """
+    ## 🔊 Audio de un reporte guardado en almacenamiento local
+
+    Los audios son inmutables (`audio_{timestamp}_{uuid}`), así que se sirven con
+    ETag fuerte y `Cache-Control: immutable`. Soporta `Range` (206) para que los
+    reproductores puedan saltar a cualquier punto sin descargar el archivo completo.
+    """
+    path = resolve_media_path(audio_handler.storage_path, filename)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audio not found")
+
+    accel_path = None
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        relative = path.relative_to(audio_handler.storage_path).as_posix()
+        accel_path = f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')}/incidents/{relative}"
+    return MediaFileResponse(path, accel_path=accel_path)
@@ -1,14 +1,23 @@
-from fastapi import APIRouter
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from typing import List, Literal, Optional
 from app.schemas.metro import LineStatus, Station, SimulationReset
-from app.utils.metro_simulator import metro_simulator, metro_simulator_line2
+from app.utils.metro_simulator import metro_simulator, metro_simulator_line2, LINE_SIMULATORS
+from app.utils.metro_payloads import metro_response, batch_response, parse_projection, SECTIONS
 
 router = APIRouter(prefix="/metro", tags=["Metro"])
 
+# Parámetro documentado en OpenAPI; metro_response lo lee del request
+ResponseFormat = Optional[Literal["json", "columnar", "msgpack"]]
+FORMAT_QUERY = Query(
+    None,
+    alias="format",
+    description="Representación: json (por defecto), columnar (arreglos por columna) o msgpack. También vía Accept"
+)
+
 # ==================== LÍNEA 1 ====================
 
 @router.get("/line1/status", response_model=LineStatus)
-async def get_line1_status():
+async def get_line1_status(request: Request, response_format: ResponseFormat = FORMAT_QUERY):
     """
     Obtiene el estado en tiempo real de la Línea 1 del Metro
     
@@ -16,11 +25,14 @@ async def get_line1_status():
     - Estado general de la línea (saturación, incidentes)
     - Posición y datos de todos los trenes activos
     - Ocupación de vagones
+    
+    Se calcula una vez por tick de la simulación: soporta `?format=columnar|msgpack`,
+    compresión gzip/brotli y ETag (304 si no hubo tick nuevo).
     """
-    return metro_simulator.get_line_status()
+    return metro_response(request, metro_simulator, "status")
 
 @router.get("/line1/stations", response_model=List[Station])
-async def get_line1_stations():
+async def get_line1_stations(request: Request, response_format: ResponseFormat = FORMAT_QUERY):
     """
     Obtiene el estado de todas las estaciones de la Línea 1
     
@@ -30,13 +42,16 @@ async def get_line1_stations():
     - Tiempo de espera estimado
     - Personas esperando
     - Tiempo hasta próximo tren
+    
+    Se calcula una vez por tick de la simulación: soporta `?format=columnar|msgpack`,
+    compresión gzip/brotli y ETag (304 si no hubo tick nuevo).
     """
-    return metro_simulator.get_stations()
+    return metro_response(request, metro_simulator, "stations")
 
 # ==================== LÍNEA 2 ====================
 
 @router.get("/line2/status", response_model=LineStatus)
-async def get_line2_status():
+async def get_line2_status(request: Request, response_format: ResponseFormat = FORMAT_QUERY):
     """
     Obtiene el estado en tiempo real de la Línea 2 del Metro (Azul)
     
@@ -44,11 +59,14 @@ async def get_line2_status():
     - Estado general de la línea (saturación, incidentes)
     - Posición y datos de todos los trenes activos
     - Ocupación de vagones
+    
+    Se calcula una vez por tick de la simulación: soporta `?format=columnar|msgpack`,
+    compresión gzip/brotli y ETag (304 si no hubo tick nuevo).
     """
-    return metro_simulator_line2.get_line_status()
+    return metro_response(request, metro_simulator_line2, "status")
 
 @router.get("/line2/stations", response_model=List[Station])
-async def get_line2_stations():
+async def get_line2_stations(request: Request, response_format: ResponseFormat = FORMAT_QUERY):
     """
     Obtiene el estado de todas las estaciones de la Línea 2 (Azul)
     
@@ -58,8 +76,76 @@ async def get_line2_stations():
     - Tiempo de espera estimado
     - Personas esperando
     - Tiempo hasta próximo tren
+    
+    Se calcula una vez por tick de la simulación: soporta `?format=columnar|msgpack`,
+    compresión gzip/brotli y ETag (304 si no hubo tick nuevo).
+    """
+    return metro_response(request, metro_simulator_line2, "stations")
+
+# ==================== CONSULTA AGRUPADA ====================
+
+def _split_values(values: Optional[List[str]]) -> List[str]:
+    """Acepta tanto `?lines=line1&lines=line2` como `?lines=line1,line2`"""
+    result = []
+    for value in values or []:
+        for item in value.split(","):
+            item = item.strip()
+            if item and item not in result:
+                result.append(item)
+    return result
+
+@router.get("/snapshot")
+async def get_metro_snapshot(
+    request: Request,
+    lines: Optional[List[str]] = Query(None, description="Líneas a incluir (line1, line2). Por defecto todas"),
+    sections: Optional[List[str]] = Query(None, description="Secciones a incluir (status, stations). Por defecto ambas"),
+    fields: Optional[List[str]] = Query(
+        None,
+        description="Proyección de campos, p. ej. saturation,people_waiting. Prefijos opcionales: status., stations., trains."
+    ),
+    response_format: ResponseFormat = FORMAT_QUERY
+):
+    """
+    Estado de varias líneas y secciones en una sola respuesta
+    
+    Sustituye las llamadas separadas a `/metro/lineN/status` y `/metro/lineN/stations`:
+    
+    ```
+    GET /metro/snapshot?lines=line1,line2&sections=stations&fields=saturation,people_waiting
+    ```
+    
+    Respuesta: `{"line1": {"tick": 42, "status": {...}, "stations": [...]}, ...}`.
+    Con `fields`, las estaciones conservan siempre `id` y los trenes `train_id`.
+    
+    Se arma con los snapshots por tick (mismos datos que los endpoints individuales)
+    y admite los mismos formatos, compresión y ETag.
     """
-    return metro_simulator_line2.get_stations()
+    line_list = _split_values(lines) or list(LINE_SIMULATORS)
+    section_list = _split_values(sections) or list(SECTIONS)
+    field_list = _split_values(fields) or None
+    
+    unknown_lines = [line for line in line_list if line not in LINE_SIMULATORS]
+    if unknown_lines:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Líneas no válidas: {', '.join(unknown_lines)}. Opciones: {', '.join(LINE_SIMULATORS)}"
+        )
+    unknown_sections = [section for section in section_list if section not in SECTIONS]
+    if unknown_sections:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Secciones no válidas: {', '.join(unknown_sections)}. Opciones: {', '.join(SECTIONS)}"
+        )
+    if field_list:
+        try:
+            parse_projection(field_list)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campo no válido: {e}"
+            )
+    
+    return batch_response(request, line_list, section_list, field_list)
 
 # ==================== RESET ====================
 
@@ -0,0 +1,127 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.routes.auth import get_current_admin_user
+from app.utils.profiling import cpu_profiler, memory_snapshots, loop_lag_monitor, loop_watchdog
+
+router = APIRouter(
+    prefix="/admin/profiling",
+    tags=["Admin Profiling"],
+    dependencies=[Depends(get_current_admin_user)]
+)
+
+
+# ==================== CPU ====================
+
+@router.post("/cpu/start")
+async def start_cpu_profile(
+    seconds: float = Query(30, gt=0, le=300, description="Duración del muestreo (segundos)"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Intervalo entre muestras (ms)")
+):
+    """
+    ## 🔥 Iniciar el profiler de CPU por muestreo
+
+    Captura las pilas de todos los hilos (incluido el del event loop) cada
+    `interval_ms` durante `seconds`. Se detiene solo; descargar el resultado con
+    `GET /admin/profiling/cpu/collapsed`.
+    """
+    if not cpu_profiler.start(seconds, interval_ms / 1000):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A CPU profile is already running"
+        )
+    return cpu_profiler.status()
+
+
+@router.post("/cpu/stop")
+async def stop_cpu_profile():
+    """Detener el profiler antes de tiempo (se conservan las muestras)"""
+    # stop() espera a que termine el hilo de muestreo: fuera del event loop
+    await asyncio.to_thread(cpu_profiler.stop)
+    return cpu_profiler.status()
+
+
+@router.get("/cpu")
+async def get_cpu_profile_status():
+    """Estado del último muestreo de CPU"""
+    return cpu_profiler.status()
+
+
+@router.get("/cpu/collapsed", response_class=PlainTextResponse)
+async def download_cpu_profile():
+    """
+    ## 📄 Pilas colapsadas del último muestreo
+
+    Formato `hilo;externa;...;interna muestras`, compatible con
+    `flamegraph.pl` y speedscope.
+    """
+    if cpu_profiler.running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="CPU profile still running; stop it or wait for it to finish"
+        )
+    return PlainTextResponse(
+        cpu_profiler.collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="cpu-profile.collapsed"'}
+    )
+
+
+# ==================== MEMORY ====================
+
+@router.post("/memory/snapshot")
+async def memory_snapshot(
+    limit: int = Query(25, ge=1, le=500, description="Número de ubicaciones a devolver")
+):
+    """
+    ## 🧠 Diferencia de snapshots de tracemalloc
+
+    La primera llamada activa `tracemalloc` y guarda una línea base; las
+    siguientes devuelven las ubicaciones cuyo uso de memoria más cambió
+    desde la llamada anterior.
+    """
+    # Tomar y comparar snapshots recorre todas las trazas: fuera del event loop
+    return await asyncio.to_thread(memory_snapshots.snapshot_diff, limit=limit)
+
+
+@router.post("/memory/stop")
+async def stop_memory_tracing():
+    """Desactivar `tracemalloc` (tiene coste en cada asignación)"""
+    # Espera el lock de un snapshot en curso y libera todas las trazas
+    await asyncio.to_thread(memory_snapshots.stop)
+    return {"tracing": False}
+
+
+# ==================== EVENT LOOP ====================
+
+@router.get("/loop-lag")
+async def get_loop_lag(
+    seconds: float = Query(60, gt=0, le=600, description="Ventana de tiempo hacia atrás (segundos)")
+):
+    """
+    ## ⏱️ Retraso del event loop
+
+    Cuánto tarde despiertan los `asyncio.sleep` del monitor. Valores altos
+    indican llamadas bloqueantes en el loop (boto3, bcrypt, consultas síncronas).
+    """
+    return loop_lag_monitor.stats(seconds)
+
+
+@router.get("/loop-blocking")
+async def get_loop_blocking_report():
+    """
+    ## 🚧 Bloqueos del event loop agrupados por punto de llamada
+
+    Requiere `LOOP_WATCHDOG_ENABLED=true`. Cada entrada indica la línea del
+    código de la app que bloqueó el loop más de `LOOP_WATCHDOG_THRESHOLD_MS`,
+    la llamada bloqueante más interna y la pila capturada.
+    """
+    return loop_watchdog.report()
+
+
+@router.delete("/loop-blocking")
+async def reset_loop_blocking_report():
+    """Vaciar el reporte de bloqueos"""
+    loop_watchdog.reset()
+    return loop_watchdog.report()
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException
+
+from app.schemas.upload import PresignedUploadRequest, PresignedUploadResponse
+from app.utils.direct_uploads import DirectUploadError, create_upload
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+
+
+@router.post("/presign", response_model=PresignedUploadResponse)
+async def presign_upload(upload: PresignedUploadRequest):
+    """
+    ## ⬆️ Obtener una URL pre-firmada para subir un archivo directamente
+
+    Primer paso de la subida directa al almacenamiento (los bytes no pasan por la API):
+    1. Este endpoint reserva la clave del objeto y firma un `PUT` válido `UPLOAD_URL_EXPIRE_SECONDS`
+    2. El cliente sube el archivo a `upload_url` con los `headers` indicados
+    3. El cliente confirma con el `upload_token`:
+       - `fall_detection_image` → `POST /falldetection/confirm`
+       - `incident_audio` → `POST /reports/incident/confirm`
+
+    El tamaño declarado (`size`) debe coincidir con el del archivo subido.
+    """
+    try:
+        return create_upload(upload.kind, upload.content_type, upload.size, upload.filename)
+    except DirectUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -7,13 +7,21 @@ class FallDetectionCreate(BaseModel):
     detected_object: str = Field(..., description="Objeto detectado (ej: persona, bicicleta, etc)")
     incident_datetime: datetime = Field(..., description="Fecha y hora del incidente")
 
+class FallDetectionConfirm(FallDetectionCreate):
+    """Confirmación de una imagen subida directamente con una URL pre-firmada"""
+    upload_token: str = Field(..., description="Token devuelto por POST /uploads/presign")
+
 class FallDetectionResponse(BaseModel):
     id: int
     image_url: str
+    thumbnail_url: Optional[str] = Field(None, description="Miniatura WebP (null mientras se genera)")
+    preview_url: Optional[str] = Field(None, description="Vista previa WebP comprimida (null mientras se genera)")
     station: str
     detected_object: str
     incident_datetime: datetime
     created_at: datetime
+    duplicate_count: int = Field(0, description="Frames casi idénticos agrupados en este incidente")
+    last_duplicate_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
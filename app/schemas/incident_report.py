@@ -13,6 +13,15 @@ class IncidentReportManualCreate(IncidentReportBase):
     """Schema para endpoint manual - recibe todos los campos del formulario"""
     pass
 
+class IncidentReportConfirm(BaseModel):
+    """Confirmación de un audio subido directamente con una URL pre-firmada (flujo manual)"""
+    upload_token: str
+    station: str
+    type: str
+    level: str
+    description: Optional[str] = None
+    incident_datetime: Optional[datetime] = None
+
 class IncidentReportResponse(BaseModel):
     audio_url: str
     station: str
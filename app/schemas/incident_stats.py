@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Dict, List, Literal
+
+class StatsGroup(BaseModel):
+    total: int
+    by_type: Dict[str, int] = Field(default_factory=dict, description="Conteo por tipo")
+    by_level: Dict[str, int] = Field(default_factory=dict, description="Distribución por nivel de severidad")
+
+class StationStats(StatsGroup):
+    station: str
+    line: str
+
+class LineStats(StatsGroup):
+    line: str
+
+class BucketStats(StatsGroup):
+    bucket_start: datetime
+
+class IncidentStatsResponse(StatsGroup):
+    since: datetime
+    until: datetime
+    bucket: Literal["hour", "day"]
+    stations: List[StationStats]
+    lines: List[LineStats]
+    buckets: List[BucketStats]
@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Dict, Literal, Optional
+
+class PresignedUploadRequest(BaseModel):
+    kind: Literal["fall_detection_image", "incident_audio"] = Field(..., description="Tipo de archivo a subir")
+    content_type: str = Field(..., description="Content-Type del archivo (ej: image/jpeg, audio/mp4)")
+    size: int = Field(..., gt=0, description="Tamaño exacto del archivo en bytes")
+    filename: Optional[str] = Field(None, description="Nombre original (se usa su extensión para audios)")
+
+class PresignedUploadResponse(BaseModel):
+    upload_url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = Field(default_factory=dict, description="Headers que deben enviarse en la subida")
+    object_key: str
+    object_url: str
+    upload_token: str = Field(..., description="Token para confirmar la subida")
+    expires_at: datetime
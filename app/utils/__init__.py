@@ -1,9 +1,18 @@
-from app.utils.security import hash_password, verify_password
+from app.utils.security import (
+    hash_password,
+    verify_password,
+    hash_password_async,
+    verify_and_update_password,
+    PasswordHasherBusy
+)
 from app.utils.jwt import create_access_token, verify_token
 
 __all__ = [
     "hash_password",
     "verify_password",
+    "hash_password_async",
+    "verify_and_update_password",
+    "PasswordHasherBusy",
     "create_access_token",
     "verify_token"
 ]
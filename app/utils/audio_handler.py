@@ -3,9 +3,13 @@ import uuid
 from datetime import datetime
 from pathlib import Path
 from fastapi import UploadFile
-import boto3
-from botocore.exceptions import ClientError
 from app.config import settings
+from app.utils.clients import get_s3_client, object_url, object_key_from_url
+from app.utils.metrics import track_external_call
+from app.utils.media import resolve_media_path, sharded_path
+from app.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 class AudioHandler:
     """
@@ -23,25 +27,35 @@ class AudioHandler:
         """
         self.storage_path = storage_path
         self.use_s3 = use_s3 and hasattr(settings, 'AWS_ACCESS_KEY_ID') and settings.AWS_ACCESS_KEY_ID
+        # El cliente de boto3 se crea en el primer uso (ver app.utils.clients)
+        self._s3_client = None
         
         if self.use_s3:
+            self.bucket_name = settings.AWS_S3_BUCKET
+            log.info("audio_handler_initialized", storage="s3", bucket=self.bucket_name)
+        else:
+            # Create local storage directory if it doesn't exist
+            Path(storage_path).mkdir(parents=True, exist_ok=True)
+            log.info("audio_handler_initialized", storage="local", path=storage_path)
+    
+    @property
+    def s3_client(self):
+        """
+        S3 client, created on first use. If it cannot be created, the handler
+        falls back to local storage and this returns None.
+        """
+        if self._s3_client is None and self.use_s3:
             try:
-                self.s3_client = boto3.client(
-                    's3',
-                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                    region_name=settings.AWS_REGION
-                )
-                self.bucket_name = settings.AWS_S3_BUCKET
-                print(f"✅ AudioHandler initialized with S3 storage (bucket: {self.bucket_name})")
+                self._s3_client = get_s3_client()
             except Exception as e:
-                print(f"⚠️ Failed to initialize S3, falling back to local storage: {e}")
+                log.warning("s3_init_failed_using_local_storage", error=str(e))
                 self.use_s3 = False
-        
-        if not self.use_s3:
-            # Create local storage directory if it doesn't exist
-            Path(storage_path).mkdir(parents=True, exist_ok=True)
-            print(f"✅ AudioHandler initialized with local storage (path: {storage_path})")
+                Path(self.storage_path).mkdir(parents=True, exist_ok=True)
+        return self._s3_client
+    
+    @s3_client.setter
+    def s3_client(self, client):
+        self._s3_client = client
     
     async def save_audio(self, audio_file: UploadFile, base_url: str = "http://localhost:8000") -> str:
         """
@@ -67,43 +81,45 @@ class AudioHandler:
         # Read file content
         content = await audio_file.read()
         
-        if self.use_s3:
+        if self.s3_client is not None and self.use_s3:
+            from botocore.exceptions import ClientError
+            
             # Upload to S3
             try:
                 s3_key = f"incidents/{filename}"
                 
-                self.s3_client.put_object(
-                    Bucket=self.bucket_name,
-                    Key=s3_key,
-                    Body=content,
-                    ContentType=audio_file.content_type or "audio/wav"
-                )
+                with track_external_call("s3", "put_audio"):
+                    self.s3_client.put_object(
+                        Bucket=self.bucket_name,
+                        Key=s3_key,
+                        Body=content,
+                        ContentType=audio_file.content_type or "audio/wav"
+                    )
                 
                 # Return S3 URL
-                audio_url = f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{s3_key}"
-                print(f"✅ Audio uploaded to S3: {audio_url}")
+                audio_url = object_url(s3_key)
+                log.info("audio_saved", storage="s3", audio_url=audio_url, audio_bytes=len(content))
                 return audio_url
                 
             except ClientError as e:
-                print(f"❌ S3 upload failed: {e}, falling back to local storage")
+                log.error("s3_upload_failed_using_local_storage", error=str(e))
                 # Fall back to local storage on error
                 self.use_s3 = False
         
-        # Local storage (fallback or default)
-        file_path = os.path.join(self.storage_path, filename)
-        with open(file_path, "wb") as f:
-            f.write(content)
-        # Local storage (fallback or default)
-        file_path = os.path.join(self.storage_path, filename)
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Local storage (fallback or default), sharded so no directory grows unbounded.
+        # The URL stays flat: the shard is recomputed from the filename when serving.
+        file_path = sharded_path(self.storage_path, filename)
+        with track_external_call("local_storage", "write_audio"):
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(file_path, "wb") as f:
+                f.write(content)
         
         # Reset file pointer for potential reuse
         await audio_file.seek(0)
         
         # Return public URL
         audio_url = f"{base_url}/storage/{self.storage_path.split('/')[-1]}/{filename}"
-        print(f"✅ Audio saved locally: {audio_url}")
+        log.info("audio_saved", storage="local", audio_url=audio_url, audio_bytes=len(content))
         return audio_url
     
     def delete_audio(self, audio_url: str) -> bool:
@@ -117,29 +133,28 @@ class AudioHandler:
             bool: True if deletion was successful, False otherwise
         """
         try:
-            if self.use_s3 and "s3.amazonaws.com" in audio_url:
-                # Delete from S3
-                # Extract key from URL: https://bucket.s3.region.amazonaws.com/key
-                s3_key = audio_url.split(".amazonaws.com/")[1]
-                
-                self.s3_client.delete_object(
-                    Bucket=self.bucket_name,
-                    Key=s3_key
-                )
-                print(f"✅ Deleted from S3: {s3_key}")
+            s3_key = object_key_from_url(audio_url)
+            if s3_key is not None and self.s3_client is not None:
+                # Delete from S3 (key from URL: https://bucket.s3.region.amazonaws.com/key)
+                with track_external_call("s3", "delete_audio"):
+                    self.s3_client.delete_object(
+                        Bucket=self.bucket_name,
+                        Key=s3_key
+                    )
+                log.info("audio_deleted", storage="s3", key=s3_key)
                 return True
             else:
                 # Delete from local storage
                 filename = audio_url.split("/")[-1]
-                file_path = os.path.join(self.storage_path, filename)
+                file_path = resolve_media_path(self.storage_path, filename)
                 
-                if os.path.exists(file_path):
+                if file_path is not None:
                     os.remove(file_path)
-                    print(f"✅ Deleted locally: {filename}")
+                    log.info("audio_deleted", storage="local", filename=filename)
                     return True
                 return False
         except Exception as e:
-            print(f"❌ Error deleting audio file: {e}")
+            log.error("audio_delete_failed", audio_url=audio_url, error=str(e))
             return False
 
 # Global instance
@@ -0,0 +1,84 @@
+import threading
+from typing import Optional
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# boto3 and openai are imported and their clients built on first use (or by
+# warm_up()), so importing the app stays fast and a misconfigured service only
+# fails the requests that need it instead of the whole startup.
+_lock = threading.Lock()
+_s3_client = None
+_openai_client = None
+
+
+def get_s3_client():
+    """
+    Shared S3 client (boto3 clients are thread-safe).
+
+    With `OBJECT_STORE_BACKEND=local` it is the filesystem-backed stand-in
+    from `app.utils.local_object_store` instead.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _lock:
+            if _s3_client is None and settings.OBJECT_STORE_BACKEND == "local":
+                from app.utils.local_object_store import LocalObjectStoreClient
+
+                _s3_client = LocalObjectStoreClient(settings.LOCAL_OBJECT_STORE_PATH, settings.LOCAL_OBJECT_STORE_URL)
+                log.info("s3_client_initialized", backend="local", path=settings.LOCAL_OBJECT_STORE_PATH)
+            elif _s3_client is None:
+                import boto3
+
+                _s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_REGION
+                )
+                log.info("s3_client_initialized", backend="s3", region=settings.AWS_REGION)
+    return _s3_client
+
+
+def object_url(key: str) -> str:
+    """Public URL of an object in the configured bucket"""
+    if settings.OBJECT_STORE_BACKEND == "local":
+        return f"{settings.LOCAL_OBJECT_STORE_URL.rstrip('/')}/{settings.AWS_S3_BUCKET}/{key}"
+    return f"https://{settings.AWS_S3_BUCKET}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
+
+
+def object_key_from_url(url: str) -> Optional[str]:
+    """Object key of a URL built by `object_url`, or None for URLs outside the bucket"""
+    prefix = object_url("")
+    if url.startswith(prefix) and len(url) > len(prefix):
+        return url[len(prefix):]
+    return None
+
+
+def get_openai_client():
+    """Shared OpenAI client"""
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+                log.info("openai_client_initialized")
+    return _openai_client
+
+
+def warm_up():
+    """
+    Build every external client ahead of the first request.
+
+    Blocking (imports and client construction); run it in a thread. Failures
+    are logged and left for the first real use to surface.
+    """
+    for name, factory in (("s3", get_s3_client), ("openai", get_openai_client)):
+        try:
+            factory()
+        except Exception as e:
+            log.warning("client_warm_up_failed", client=name, error=str(e))
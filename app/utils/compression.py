@@ -0,0 +1,132 @@
+import gzip
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/vnd.", "application/msgpack", "application/javascript", "application/xml")
+
+
+def available_encodings():
+    """Content codings supported by this process, preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Pick the content coding for a response from the `Accept-Encoding` header.
+
+    Returns "br", "gzip" or "identity". Brotli wins over gzip at equal weight.
+    """
+    if not accept_encoding:
+        return "identity"
+    weights = _parse_accept_encoding(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for coding in available_encodings():
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.GZIP_LEVEL, mtime=0)
+    return body
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+
+    Only complete (non-streaming) bodies of textual/JSON/msgpack content of at
+    least `COMPRESSION_MIN_SIZE` bytes are compressed. Responses that already
+    carry a `Content-Encoding` (e.g. the per-tick cached metro payloads),
+    streamed files and media are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 206, 304)
+                    or not is_compressible(headers.get("content-type", ""))
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Hold the headers until the body shows whether it is worth compressing
+                    start_message = message
+                return
+
+            if passthrough or start_message is None:
+                await send(message)
+                return
+
+            pending_start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=pending_start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(pending_start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            await send(pending_start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,159 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from app.config import settings
+from app.utils.clients import get_s3_client, object_url
+from app.utils.jwt import create_access_token, verify_token
+from app.utils.metrics import track_external_call
+
+KIND_FALL_DETECTION_IMAGE = "fall_detection_image"
+KIND_INCIDENT_AUDIO = "incident_audio"
+
+AUDIO_EXTENSIONS = ['.aac', '.mp3', '.wav', '.m4a', '.ogg', '.flac', '.wma', '.opus']
+
+# Tipos de imagen aceptados y la extensión de su clave (nunca el subtipo MIME tal cual)
+IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+    "image/heic": "heic",
+    "image/heif": "heif",
+}
+
+# Extensión del audio cuando el nombre del archivo no trae una válida
+AUDIO_CONTENT_TYPE_EXTENSIONS = {
+    "audio/aac": ".aac",
+    "audio/mpeg": ".mp3",
+    "audio/mp3": ".mp3",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/mp4": ".m4a",
+    "audio/x-m4a": ".m4a",
+    "audio/ogg": ".ogg",
+    "audio/flac": ".flac",
+    "audio/opus": ".opus",
+}
+
+
+class DirectUploadError(Exception):
+    """Invalid pre-sign request or upload confirmation (carries the HTTP status to return)"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def _max_bytes(kind: str) -> int:
+    return settings.MAX_IMAGE_UPLOAD_BYTES if kind == KIND_FALL_DETECTION_IMAGE else settings.MAX_AUDIO_UPLOAD_BYTES
+
+
+def _media_type(content_type: str) -> str:
+    return content_type.split(";")[0].strip().lower()
+
+
+def _object_key(kind: str, content_type: str, filename: Optional[str]) -> str:
+    """Same naming scheme as S3Handler.upload_image / AudioHandler.save_audio"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    unique_id = str(uuid.uuid4())[:8]
+    if kind == KIND_FALL_DETECTION_IMAGE:
+        extension = IMAGE_EXTENSIONS[_media_type(content_type)]
+        return f"fall-detections/{timestamp}_{unique_id}.{extension}"
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in AUDIO_EXTENSIONS:
+        extension = AUDIO_CONTENT_TYPE_EXTENSIONS.get(_media_type(content_type), ".wav")
+    return f"incidents/audio_{timestamp}_{unique_id}{extension}"
+
+
+def _validate(kind: str, content_type: str, size: int, filename: Optional[str]):
+    if kind == KIND_FALL_DETECTION_IMAGE:
+        if not content_type.startswith("image/"):
+            raise DirectUploadError("El archivo debe ser una imagen")
+        if _media_type(content_type) not in IMAGE_EXTENSIONS:
+            raise DirectUploadError(f"Tipo de imagen no soportado: {content_type}. Formatos aceptados: {', '.join(sorted(IMAGE_EXTENSIONS))}")
+    else:
+        extension = os.path.splitext(filename or "")[1].lower()
+        if not (content_type.startswith("audio/") or extension in AUDIO_EXTENSIONS):
+            raise DirectUploadError(f"Invalid file type. Only audio files are accepted. Received: {content_type}, file: {filename}")
+    if size > _max_bytes(kind):
+        raise DirectUploadError(f"El archivo excede el tamaño máximo de {_max_bytes(kind)} bytes", status_code=413)
+
+
+def create_upload(kind: str, content_type: str, size: int, filename: Optional[str] = None) -> Dict:
+    """
+    Reserve an object key and pre-sign a PUT for it.
+
+    The returned `upload_token` binds the key, kind, declared size and content
+    type; it must be sent back to the confirm endpoint once the client has
+    uploaded the bytes to `upload_url`.
+    """
+    _validate(kind, content_type, size, filename)
+    key = _object_key(kind, content_type, filename)
+    expires_in = settings.UPLOAD_URL_EXPIRE_SECONDS
+
+    params = {"Bucket": settings.AWS_S3_BUCKET, "Key": key, "ContentType": content_type}
+    headers = {"Content-Type": content_type}
+    if kind == KIND_FALL_DETECTION_IMAGE:
+        # Igual que upload_image: las imágenes son públicas (botocore lo firma en la query)
+        params["ACL"] = "public-read"
+
+    with track_external_call("s3", "presign_put"):
+        upload_url = get_s3_client().generate_presigned_url("put_object", Params=params, ExpiresIn=expires_in)
+
+    # El token de confirmación vive un poco más que la URL para cubrir subidas lentas
+    token_ttl = timedelta(seconds=expires_in * 2)
+    upload_token = create_access_token(
+        {"typ": "upload", "key": key, "kind": kind, "size": size, "content_type": content_type},
+        expires_delta=token_ttl
+    )
+    return {
+        "upload_url": upload_url,
+        "method": "PUT",
+        "headers": headers,
+        "object_key": key,
+        "object_url": object_url(key),
+        "upload_token": upload_token,
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+    }
+
+
+def verify_upload(upload_token: str, kind: str) -> str:
+    """
+    Check that a pre-signed upload was completed as declared.
+
+    Only metadata is fetched (HEAD): the object must exist and its size must
+    match the size declared when pre-signing. Oversized objects are deleted.
+
+    Returns:
+        Public URL of the uploaded object
+
+    Raises:
+        DirectUploadError: Invalid/expired token, missing object or size mismatch
+    """
+    from botocore.exceptions import ClientError
+
+    claims = verify_token(upload_token)
+    if not claims or claims.get("typ") != "upload" or claims.get("kind") != kind:
+        raise DirectUploadError("Token de subida inválido o expirado")
+
+    key = claims["key"]
+    client = get_s3_client()
+    try:
+        with track_external_call("s3", "head_object"):
+            head = client.head_object(Bucket=settings.AWS_S3_BUCKET, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            raise DirectUploadError("El archivo no se ha subido todavía", status_code=409)
+        raise
+
+    size = head.get("ContentLength", 0)
+    if size != claims["size"] or size > _max_bytes(kind):
+        if size > _max_bytes(kind):
+            with track_external_call("s3", "delete_object"):
+                client.delete_object(Bucket=settings.AWS_S3_BUCKET, Key=key)
+        raise DirectUploadError(f"Tamaño del archivo subido ({size} bytes) distinto del declarado ({claims['size']} bytes)")
+    return object_url(key)
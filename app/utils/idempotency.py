@@ -0,0 +1,404 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+from app.utils.logger import get_logger
+from app.utils.metrics import registry
+
+log = get_logger(__name__)
+
+idempotency_requests_total = registry.counter(
+    "idempotency_requests_total", "Requests carrying an Idempotency-Key, by outcome", ("route", "result")
+)
+
+# Margen para los campos del formulario y las cabeceras multipart
+_FORM_OVERHEAD_BYTES = 64 * 1024
+
+# Rutas que aceptan Idempotency-Key (las que suben archivos y crean registros),
+# con el tamaño máximo de cuerpo que se lee antes de responder 413
+IDEMPOTENT_ROUTES: Dict[Tuple[str, str], Callable[[], int]] = {
+    ("POST", "/reports/incident"): lambda: settings.MAX_AUDIO_UPLOAD_BYTES + _FORM_OVERHEAD_BYTES,
+    ("POST", "/reports/incident/automatic"): lambda: settings.MAX_AUDIO_UPLOAD_BYTES + _FORM_OVERHEAD_BYTES,
+    ("POST", "/reports/incident/manual"): lambda: settings.MAX_AUDIO_UPLOAD_BYTES + _FORM_OVERHEAD_BYTES,
+    ("POST", "/reports/incident/confirm"): lambda: _FORM_OVERHEAD_BYTES,
+    ("POST", "/falldetection"): lambda: settings.MAX_IMAGE_UPLOAD_BYTES + _FORM_OVERHEAD_BYTES,
+    ("POST", "/falldetection/confirm"): lambda: _FORM_OVERHEAD_BYTES,
+}
+
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+    created_at: datetime
+
+
+# Fila de otra réplica que aún está procesando la misma clave
+PENDING = "pending"
+
+
+class RequestFingerprint:
+    """
+    Hash identifying a request, to reject a key reused for a different one,
+    computed chunk by chunk as the body arrives.
+
+    The multipart boundary is random per attempt in most HTTP clients, so it
+    is removed before hashing; otherwise every retry would look different.
+    The last `len(boundary) - 1` bytes are held back between chunks, so a
+    boundary split across two chunks is removed too.
+    """
+
+    def __init__(self, method: str, path: str, content_type: str):
+        self._digest = hashlib.sha256(f"{method} {path}\n".encode())
+        boundary = content_type.partition("boundary=")[2].split(";")[0].strip('"') if "multipart/" in content_type else ""
+        self._boundary = boundary.encode()
+        self._tail = b""
+
+    def update(self, chunk: bytes):
+        if not self._boundary:
+            self._digest.update(chunk)
+            return
+        *parts, tail = (self._tail + chunk).split(self._boundary)
+        for part in parts:
+            self._digest.update(part)
+        keep = len(self._boundary) - 1
+        if len(tail) > keep:
+            self._digest.update(tail[:len(tail) - keep])
+            tail = tail[len(tail) - keep:]
+        self._tail = tail
+
+    def hexdigest(self) -> str:
+        digest = self._digest.copy()
+        digest.update(self._tail)
+        return digest.hexdigest()
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class IdempotencyStore:
+    """
+    Completed responses per (scope, key): a bounded in-process LRU in front
+    of the `idempotency_keys` table, which also holds the pending marker that
+    makes other processes answer 409 while the first attempt runs.
+
+    Database methods are blocking; call them from a thread.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], StoredResponse]" = OrderedDict()
+        self._last_purge = 0.0
+
+    @property
+    def ttl(self) -> timedelta:
+        return timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+
+    def get_local(self, scope: str, key: str) -> Optional[StoredResponse]:
+        stored = self._entries.get((scope, key))
+        if stored is None:
+            return None
+        if stored.created_at < datetime.utcnow() - self.ttl:
+            del self._entries[(scope, key)]
+            return None
+        self._entries.move_to_end((scope, key))
+        return stored
+
+    def put_local(self, scope: str, key: str, stored: StoredResponse):
+        self._entries[(scope, key)] = stored
+        self._entries.move_to_end((scope, key))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def begin(self, scope: str, key: str, request_hash: str) -> Union[None, str, StoredResponse]:
+        """
+        Claim a key for a new request.
+
+        Returns:
+            None if the caller now owns the key and must process the request,
+            the stored response if it already completed, or PENDING if another
+            process is still working on it
+        """
+        self._maybe_purge()
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.add(IdempotencyKey(scope=scope, key=key, request_hash=request_hash, created_at=now))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            row = db.query(IdempotencyKey).filter(IdempotencyKey.scope == scope, IdempotencyKey.key == key).first()
+            if row is None:
+                # Se purgó entre el INSERT y la consulta: reintentar una vez
+                db.add(IdempotencyKey(scope=scope, key=key, request_hash=request_hash, created_at=now))
+                db.commit()
+                return None
+            expired = row.created_at < now - self.ttl
+            stale = row.status_code is None and row.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_PENDING_TIMEOUT_SECONDS)
+            if expired or stale:
+                # Clave caducada, o pendiente de un proceso que murió: se reutiliza
+                row.request_hash = request_hash
+                row.status_code = None
+                row.content_type = None
+                row.body = None
+                row.created_at = now
+                db.commit()
+                return None
+            if row.status_code is None:
+                return PENDING
+            return StoredResponse(row.request_hash, row.status_code, row.content_type, row.body or b"", row.created_at)
+        finally:
+            db.close()
+
+    def complete(self, scope: str, key: str, stored: StoredResponse):
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey)\
+                .filter(IdempotencyKey.scope == scope, IdempotencyKey.key == key)\
+                .update({
+                    IdempotencyKey.status_code: stored.status_code,
+                    IdempotencyKey.content_type: stored.content_type,
+                    IdempotencyKey.body: stored.body,
+                }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self.put_local(scope, key, stored)
+
+    def abandon(self, scope: str, key: str):
+        """Release a key whose request failed, so a retry runs it again"""
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey)\
+                .filter(IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))\
+                .delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _maybe_purge(self):
+        if time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        db = SessionLocal()
+        try:
+            deleted = db.query(IdempotencyKey)\
+                .filter(IdempotencyKey.created_at < datetime.utcnow() - self.ttl)\
+                .delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                log.info("idempotency_keys_purged", deleted=deleted)
+        finally:
+            db.close()
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware implementing `Idempotency-Key` for `IDEMPOTENT_ROUTES`.
+
+    - The first request with a key runs normally; its response (below 500)
+      is stored and replayed for `IDEMPOTENCY_TTL_SECONDS` to any retry with
+      the same key, marked with `Idempotent-Replayed: true`
+    - Retries arriving while the first attempt is still running in this
+      process wait for it and share its response instead of uploading and
+      processing again; in another process they get 409 with `Retry-After`
+    - Reusing a key with a different request body answers 422
+    - 5xx responses are not stored: the key is released so a retry can succeed
+    - A body cut short by a client disconnect never claims the key, and one
+      above the route's upload limit answers 413 without being buffered whole
+    """
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or IdempotencyStore(maxsize=settings.IDEMPOTENCY_CACHE_SIZE)
+        # (scope, key) -> (request_hash, future con la respuesta)
+        self._inflight: Dict[Tuple[str, str], Tuple[str, asyncio.Future]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        path = scope["path"].rstrip("/") or "/"
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        max_body = IDEMPOTENT_ROUTES.get((method, path))
+        if key is None or max_body is None:
+            await self.app(scope, receive, send)
+            return
+
+        route = f"{method} {path}"
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await JSONResponse(
+                {"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"}, status_code=400
+            )(scope, receive, send)
+            return
+
+        fingerprint = RequestFingerprint(method, path, headers.get("content-type", ""))
+        try:
+            body = await self._read_body(receive, fingerprint, max_body(), headers.get("content-length"))
+        except _BodyTooLarge:
+            idempotency_requests_total.labels(route, "too_large").inc()
+            await JSONResponse(
+                {"detail": f"El cuerpo excede el tamaño máximo de {max_body()} bytes"}, status_code=413
+            )(scope, receive, send)
+            return
+        if body is None:
+            # El cliente se desconectó a mitad de la subida: la clave queda libre para el reintento
+            idempotency_requests_total.labels(route, "disconnected").inc()
+            return
+        await self._handle(scope, receive, send, route, key, fingerprint.hexdigest(), body)
+
+    @staticmethod
+    async def _read_body(receive, fingerprint: RequestFingerprint, max_bytes: int, content_length: Optional[str]) -> Optional[List[bytes]]:
+        """
+        Buffer the request body (as received chunks) while fingerprinting it.
+
+        Returns:
+            The chunks, or None if the client disconnected before sending it all
+
+        Raises:
+            _BodyTooLarge: If the body (or its declared Content-Length) exceeds `max_bytes`
+        """
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            raise _BodyTooLarge()
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > max_bytes:
+                raise _BodyTooLarge()
+            chunks.append(chunk)
+            fingerprint.update(chunk)
+            if not message.get("more_body", False):
+                return chunks
+
+    async def _handle(self, scope, receive, send, route: str, key: str, request_hash: str, body: List[bytes]):
+        cache_key = (route, key)
+
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            if inflight[0] != request_hash:
+                await self._mismatch(scope, receive, send, route)
+                return
+            stored = await asyncio.shield(inflight[1])
+            if stored is None:
+                # El intento original falló sin respuesta: procesar este
+                await self._handle(scope, receive, send, route, key, request_hash, body)
+                return
+            idempotency_requests_total.labels(route, "coalesced").inc()
+            await self._replay(scope, receive, send, stored)
+            return
+
+        stored = self.store.get_local(route, key)
+        if stored is not None:
+            await self._replay_checked(scope, receive, send, route, request_hash, stored)
+            return
+
+        # Registrar el intento antes de esperar a la base de datos, para que los
+        # duplicados que lleguen mientras tanto se unan a él
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = (request_hash, future)
+        result: Optional[StoredResponse] = None
+        owned = False
+        try:
+            claim = await asyncio.to_thread(self.store.begin, route, key, request_hash)
+            if claim == PENDING:
+                idempotency_requests_total.labels(route, "conflict").inc()
+                await JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is still being processed"},
+                    status_code=409,
+                    headers={"Retry-After": "1"}
+                )(scope, receive, send)
+                return
+            if claim is not None:
+                result = claim
+                self.store.put_local(route, key, claim)
+                await self._replay_checked(scope, receive, send, route, request_hash, claim)
+                return
+
+            owned = True
+            idempotency_requests_total.labels(route, "new").inc()
+            result = await self._run(scope, receive, send, request_hash, body)
+            if result is not None and result.status_code < 500:
+                await asyncio.to_thread(self.store.complete, route, key, result)
+            else:
+                await asyncio.to_thread(self.store.abandon, route, key)
+        except BaseException:
+            if owned:
+                await asyncio.shield(asyncio.to_thread(self.store.abandon, route, key))
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+            if not future.done():
+                future.set_result(result)
+
+    async def _run(self, scope, receive, send, request_hash: str, body: List[bytes]) -> Optional[StoredResponse]:
+        """Run the request (replaying the buffered body) while capturing its response"""
+        pending = list(body)
+
+        async def replay_receive():
+            if pending:
+                chunk = pending.pop(0)
+                return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+            return await receive()
+
+        status_code = None
+        content_type = None
+        chunks = []
+
+        async def capture_send(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = Headers(raw=message.get("headers", [])).get("content-type")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, replay_receive, capture_send)
+        if status_code is None:
+            return None
+        return StoredResponse(request_hash, status_code, content_type, b"".join(chunks), datetime.utcnow())
+
+    async def _replay_checked(self, scope, receive, send, route: str, request_hash: str, stored: StoredResponse):
+        if stored.request_hash != request_hash:
+            await self._mismatch(scope, receive, send, route)
+            return
+        idempotency_requests_total.labels(route, "replayed").inc()
+        await self._replay(scope, receive, send, stored)
+
+    @staticmethod
+    async def _replay(scope, receive, send, stored: StoredResponse):
+        response = Response(content=stored.body, status_code=stored.status_code, headers={"Idempotent-Replayed": "true"})
+        if stored.content_type:
+            response.headers["content-type"] = stored.content_type
+        await response(scope, receive, send)
+
+    @staticmethod
+    async def _mismatch(scope, receive, send, route: str):
+        idempotency_requests_total.labels(route, "mismatch").inc()
+        await JSONResponse(
+            {"detail": "Idempotency-Key was already used with a different request"}, status_code=422
+        )(scope, receive, send)
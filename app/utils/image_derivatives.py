@@ -0,0 +1,173 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Set
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.fall_detection import FallDetection
+from app.utils.logger import get_logger
+from app.utils.s3_handler import s3_handler
+from app.utils.single_flight import fall_detection_reads
+from app.utils.record_cache import fall_detection_records
+from app.utils.storage_outbox import enqueue_delete
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Optional: without Pillow no derivatives are generated
+    Image = None
+
+log = get_logger(__name__)
+
+THUMBNAIL = "thumbnail"
+PREVIEW = "preview"
+
+
+def render_derivatives(data: bytes, thumbnail_size: int, preview_size: int, quality: int) -> Dict[str, bytes]:
+    """
+    Render the WebP thumbnail and preview of an image.
+
+    Runs in a worker process (CPU bound): takes and returns plain bytes so
+    nothing but the image crosses the process boundary.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        derivatives = {}
+        for name, size in ((PREVIEW, preview_size), (THUMBNAIL, thumbnail_size)):
+            # thumbnail() conserva la proporción y nunca agranda la imagen
+            image.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=quality, method=4)
+            derivatives[name] = buffer.getvalue()
+        return derivatives
+
+
+class DerivativePipeline:
+    """
+    Background generation of the thumbnail and preview of fall detection images.
+
+    `schedule()` returns immediately: resizing and encoding run in a process
+    pool (so they neither block the event loop nor compete for the GIL), the
+    results are uploaded next to the original and their URLs are stored on
+    the `FallDetection` row. Until then the row only has `image_url`.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.IMAGE_DERIVATIVES_ENABLED and Image is not None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            workers = settings.IMAGE_DERIVATIVE_WORKERS or min(4, os.cpu_count() or 1)
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Drop a pool whose worker died (e.g. OOM-killed), so the next call starts a new one"""
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            log.warning("image_derivative_pool_restarted")
+
+    async def _render(self, data: bytes) -> Dict[str, bytes]:
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(
+                    executor,
+                    render_derivatives,
+                    data,
+                    settings.THUMBNAIL_SIZE,
+                    settings.PREVIEW_SIZE,
+                    settings.PREVIEW_QUALITY
+                )
+            except BrokenProcessPool:
+                # Un proceso murió: todo lo pendiente en el pool falla. Se reintenta
+                # una vez en un pool nuevo (si la imagen era la culpable, vuelve a fallar)
+                self._discard_executor(executor)
+                if attempt:
+                    raise
+
+    def schedule(self, fall_detection_id: int, image_url: str, data: Optional[bytes] = None) -> bool:
+        """
+        Queue derivative generation for a stored image.
+
+        Args:
+            fall_detection_id: Row to update with the derivative URLs
+            image_url: URL of the original image
+            data: Original bytes when already in memory (fetched from storage otherwise)
+
+        Returns:
+            False if the pipeline is disabled (Pillow missing or turned off)
+        """
+        if not self.enabled:
+            return False
+        task = asyncio.create_task(self._process(fall_detection_id, image_url, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _process(self, fall_detection_id: int, image_url: str, data: Optional[bytes]):
+        try:
+            if data is None:
+                data = await asyncio.to_thread(s3_handler.download_image, image_url)
+            derivatives = await self._render(data)
+            urls = {}
+            for name, body in derivatives.items():
+                urls[name] = await asyncio.to_thread(s3_handler.upload_derivative, image_url, name, body)
+            await asyncio.to_thread(self._store_urls, fall_detection_id, urls)
+            fall_detection_reads.invalidate(("get", fall_detection_id))
+            fall_detection_records.delete(fall_detection_id)
+            log.info(
+                "image_derivatives_created",
+                fall_detection_id=fall_detection_id,
+                original_bytes=len(data),
+                thumbnail_bytes=len(derivatives[THUMBNAIL]),
+                preview_bytes=len(derivatives[PREVIEW])
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("image_derivatives_failed", fall_detection_id=fall_detection_id, image_url=image_url, error=str(e))
+
+    @staticmethod
+    def _store_urls(fall_detection_id: int, urls: Dict[str, str]):
+        db = SessionLocal()
+        try:
+            fall_detection = db.query(FallDetection).filter(FallDetection.id == fall_detection_id).first()
+            if fall_detection is None:
+                # El incidente se borró mientras se generaban
+                enqueue_delete(db, urls.values(), reason="fall_detection_deleted")
+            else:
+                fall_detection.thumbnail_url = urls[THUMBNAIL]
+                fall_detection.preview_url = urls[PREVIEW]
+            db.commit()
+        finally:
+            db.close()
+
+    async def drain(self):
+        """Wait for the queued derivatives (used by tests and benchmarks)"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def shutdown(self):
+        """Cancel pending work and stop the worker processes"""
+        for task in list(self._tasks):
+            task.cancel()
+        await self.drain()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Instancia global del pipeline de derivados
+derivative_pipeline = DerivativePipeline()
@@ -0,0 +1,109 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.incident_report import IncidentReport
+from app.models.fall_detection import FallDetection
+from app.utils.incident_rollups import SOURCE_INCIDENT_REPORT, SOURCE_FALL_DETECTION, to_utc_naive
+from app.utils.stations import match_station
+
+class ActiveIncidentIndex:
+    """
+    Índice en memoria de incidentes activos por estación del simulador.
+    
+    Un incidente está activo mientras su `incident_datetime` esté dentro de la
+    ventana configurada. Se carga una vez al arrancar y luego se actualiza
+    de forma incremental al crear/eliminar reportes, así el simulador puede
+    marcar estaciones en cada tick sin consultar la base de datos.
+    """
+    
+    def __init__(self, window_minutes: int = 60):
+        """
+        Args:
+            window_minutes: Minutos que un incidente permanece activo
+        """
+        self.window = timedelta(minutes=window_minutes)
+        # station_id -> {(source, id): (incident_datetime, message)}
+        self._by_station: Dict[str, Dict[Tuple[str, int], Tuple[datetime, str]]] = {}
+        # (source, id) -> station_id, para eliminar sin recorrer el índice
+        self._stations: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+    
+    def _add(self, source: str, record_id: int, station: str, incident_datetime: datetime, message: str):
+        match = match_station(station)
+        if match is None:
+            return
+        
+        incident_dt = to_utc_naive(incident_datetime)
+        if incident_dt < datetime.utcnow() - self.window:
+            return
+        
+        station_id = match[1]
+        key = (source, record_id)
+        with self._lock:
+            self._by_station.setdefault(station_id, {})[key] = (incident_dt, message)
+            self._stations[key] = station_id
+    
+    def _remove(self, source: str, record_id: int):
+        key = (source, record_id)
+        with self._lock:
+            station_id = self._stations.pop(key, None)
+            if station_id is not None:
+                self._by_station.get(station_id, {}).pop(key, None)
+    
+    def add_incident_report(self, incident: IncidentReport):
+        """Registra un reporte de incidente recién creado"""
+        message = incident.description or f"Reporte de incidente ({incident.type.value}, {incident.level.value})"
+        self._add(SOURCE_INCIDENT_REPORT, incident.id, incident.station, incident.incident_datetime, message)
+    
+    def add_fall_detection(self, fall_detection: FallDetection):
+        """Registra una detección de caída recién creada"""
+        message = f"Detección de caída: {fall_detection.detected_object}"
+        self._add(SOURCE_FALL_DETECTION, fall_detection.id, fall_detection.station, fall_detection.incident_datetime, message)
+    
+    def remove_incident_report(self, incident_id: int):
+        """Quita un reporte de incidente eliminado"""
+        self._remove(SOURCE_INCIDENT_REPORT, incident_id)
+    
+    def remove_fall_detection(self, fall_detection_id: int):
+        """Quita una detección de caída eliminada"""
+        self._remove(SOURCE_FALL_DETECTION, fall_detection_id)
+    
+    def get_station_incident(self, station_id: str) -> Optional[str]:
+        """
+        Mensaje del incidente activo más reciente de una estación
+        
+        Returns:
+            Mensaje del incidente o None si la estación no tiene incidentes activos
+        """
+        entries = self._by_station.get(station_id)
+        if not entries:
+            return None
+        
+        cutoff = datetime.utcnow() - self.window
+        with self._lock:
+            # Descartar incidentes que salieron de la ventana
+            for key in [key for key, (incident_dt, _) in entries.items() if incident_dt < cutoff]:
+                del entries[key]
+                self._stations.pop(key, None)
+            if not entries:
+                return None
+            return max(entries.values())[1]
+    
+    def load(self, db: Session):
+        """Carga los incidentes dentro de la ventana desde la base de datos"""
+        cutoff = datetime.utcnow() - self.window
+        
+        with self._lock:
+            self._by_station.clear()
+            self._stations.clear()
+        
+        for incident in db.query(IncidentReport).filter(IncidentReport.incident_datetime >= cutoff):
+            self.add_incident_report(incident)
+        for fall_detection in db.query(FallDetection).filter(FallDetection.incident_datetime >= cutoff):
+            self.add_fall_detection(fall_detection)
+
+# Instancia global compartida por las rutas y los simuladores
+active_incidents = ActiveIncidentIndex(window_minutes=settings.ACTIVE_INCIDENT_WINDOW_MINUTES)
@@ -0,0 +1,221 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.models.incident_rollup import IncidentRollup
+from app.models.incident_report import IncidentReport
+from app.models.fall_detection import FallDetection
+from app.utils.stations import resolve_line
+
+SOURCE_INCIDENT_REPORT = "incident_report"
+SOURCE_FALL_DETECTION = "fall_detection"
+
+# Las detecciones de caída no tienen nivel de severidad
+FALL_DETECTION_LEVEL = "unrated"
+
+_ROLLUP_KEY = ["source", "station", "line", "bucket_start", "type", "level"]
+
+# Clave del advisory lock que serializa la reconstrucción entre workers
+_REBUILD_LOCK_KEY = 0x726f6c6c
+
+def to_utc_naive(dt: datetime) -> datetime:
+    """Convierte a UTC sin zona horaria (las fechas sin zona se asumen UTC)"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def bucket_start(dt: datetime) -> datetime:
+    """Trunca una fecha a la hora (UTC, sin zona horaria)"""
+    return to_utc_naive(dt).replace(minute=0, second=0, microsecond=0)
+
+def _upsert_statement(db: Session, values: dict, delta: int):
+    """INSERT ... ON CONFLICT DO UPDATE para los dialectos que lo soportan"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    
+    return insert(IncidentRollup).values(count=delta, **values).on_conflict_do_update(
+        index_elements=_ROLLUP_KEY,
+        set_={"count": IncidentRollup.count + delta}
+    )
+
+def apply_rollup(
+    db: Session,
+    source: str,
+    station: str,
+    type: str,
+    level: str,
+    incident_datetime: datetime,
+    delta: int = 1
+):
+    """
+    Suma `delta` al conteo agregado correspondiente.
+    
+    Se ejecuta dentro de la transacción del request, así el rollup se
+    confirma (o se revierte) junto con el registro original.
+    """
+    values = {
+        "source": source,
+        "station": station,
+        "line": resolve_line(station),
+        "bucket_start": bucket_start(incident_datetime),
+        "type": type,
+        "level": level
+    }
+    
+    stmt = _upsert_statement(db, values, delta)
+    if stmt is not None:
+        db.execute(stmt)
+        return
+    
+    # Dialectos sin ON CONFLICT: actualizar y, si no existe, insertar
+    updated = db.query(IncidentRollup)\
+        .filter_by(**values)\
+        .update({IncidentRollup.count: IncidentRollup.count + delta}, synchronize_session=False)
+    if not updated:
+        db.add(IncidentRollup(count=delta, **values))
+
+def record_incident_report(db: Session, incident: IncidentReport, delta: int = 1):
+    """Actualiza los rollups para un reporte de incidente creado (+1) o eliminado (-1)"""
+    apply_rollup(
+        db,
+        SOURCE_INCIDENT_REPORT,
+        incident.station,
+        incident.type.value,
+        incident.level.value,
+        incident.incident_datetime,
+        delta
+    )
+
+def record_fall_detection(db: Session, fall_detection: FallDetection, delta: int = 1):
+    """Actualiza los rollups para una detección de caída creada (+1) o eliminada (-1)"""
+    apply_rollup(
+        db,
+        SOURCE_FALL_DETECTION,
+        fall_detection.station,
+        fall_detection.detected_object,
+        FALL_DETECTION_LEVEL,
+        fall_detection.incident_datetime,
+        delta
+    )
+
+def rebuild_rollups(db: Session):
+    """
+    Recalcula todos los rollups desde las tablas base.
+    
+    Solo se usa una vez al arrancar sobre una base de datos que ya tenía
+    registros antes de existir la tabla de rollups.
+    """
+    db.query(IncidentRollup).delete(synchronize_session=False)
+    for incident in db.query(IncidentReport).yield_per(1000):
+        record_incident_report(db, incident)
+    for fall_detection in db.query(FallDetection).yield_per(1000):
+        record_fall_detection(db, fall_detection)
+    db.commit()
+
+def ensure_rollups(db: Session):
+    """
+    Reconstruye los rollups si la tabla está vacía pero ya hay registros.
+    
+    Cada worker lo llama al arrancar. En PostgreSQL, dos workers que vieran
+    la tabla vacía sumarían sus upserts y duplicarían los conteos: el
+    advisory lock los serializa y el segundo vuelve a comprobar tras esperar.
+    """
+    if db.query(IncidentRollup.id).first() is not None:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        # Se libera con el commit (o rollback) de rebuild_rollups
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _REBUILD_LOCK_KEY})
+        if db.query(IncidentRollup.id).first() is not None:
+            db.rollback()
+            return
+    if db.query(IncidentReport.id).first() is None and db.query(FallDetection.id).first() is None:
+        db.rollback()
+        return
+    rebuild_rollups(db)
+
+def _add(distribution: Dict[str, int], key: str, count: int):
+    distribution[key] = distribution.get(key, 0) + count
+
+def get_stats(
+    db: Session,
+    hours: int = 24,
+    bucket: str = "hour",
+    source: Optional[str] = None,
+    line: Optional[str] = None
+) -> dict:
+    """
+    Agrega los rollups de las últimas `hours` horas.
+    
+    El costo depende del número de combinaciones estación/hora/tipo/nivel
+    en la ventana, no del número de reportes almacenados.
+    """
+    until = datetime.utcnow()
+    since = bucket_start(until - timedelta(hours=hours))
+    
+    query = db.query(
+        IncidentRollup.station,
+        IncidentRollup.line,
+        IncidentRollup.bucket_start,
+        IncidentRollup.type,
+        IncidentRollup.level,
+        func.sum(IncidentRollup.count)
+    ).filter(
+        IncidentRollup.bucket_start >= since,
+        IncidentRollup.count > 0
+    )
+    if source:
+        query = query.filter(IncidentRollup.source == source)
+    if line:
+        query = query.filter(IncidentRollup.line == line)
+    
+    rows = query.group_by(
+        IncidentRollup.station,
+        IncidentRollup.line,
+        IncidentRollup.bucket_start,
+        IncidentRollup.type,
+        IncidentRollup.level
+    ).all()
+    
+    total = 0
+    by_type: Dict[str, int] = {}
+    by_level: Dict[str, int] = {}
+    stations: Dict[tuple, dict] = {}
+    lines: Dict[str, dict] = {}
+    buckets: Dict[datetime, dict] = {}
+    
+    for station, row_line, row_bucket, row_type, level, count in rows:
+        count = int(count)
+        if bucket == "day":
+            row_bucket = row_bucket.replace(hour=0)
+        
+        total += count
+        _add(by_type, row_type, count)
+        _add(by_level, level, count)
+        
+        groups = (
+            stations.setdefault((station, row_line), {"station": station, "line": row_line, "total": 0, "by_type": {}, "by_level": {}}),
+            lines.setdefault(row_line, {"line": row_line, "total": 0, "by_type": {}, "by_level": {}}),
+            buckets.setdefault(row_bucket, {"bucket_start": row_bucket, "total": 0, "by_type": {}, "by_level": {}})
+        )
+        for group in groups:
+            group["total"] += count
+            _add(group["by_type"], row_type, count)
+            _add(group["by_level"], level, count)
+    
+    return {
+        "since": since,
+        "until": until,
+        "bucket": bucket,
+        "total": total,
+        "by_type": by_type,
+        "by_level": by_level,
+        "stations": sorted(stations.values(), key=lambda s: s["total"], reverse=True),
+        "lines": sorted(lines.values(), key=lambda l: l["line"]),
+        "buckets": [buckets[key] for key in sorted(buckets)]
+    }
@@ -1,7 +1,12 @@
+import hashlib
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from app.config import settings
+from app.utils.cache import TTLCache
+
+# Claims of already-verified tokens, keyed by token digest and expiring at `exp`
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -36,8 +41,18 @@ def verify_token(token: str) -> Optional[dict]:
     Returns:
         Decoded token payload or None if invalid
     """
+    token_digest = hashlib.sha256(token.encode()).hexdigest()
+    payload = token_cache.get(token_digest)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    exp = payload.get("exp")
+    if exp is not None:
+        token_cache.set(token_digest, payload, expires_at=float(exp))
+    
+    return payload
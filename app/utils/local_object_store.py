@@ -0,0 +1,159 @@
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+from urllib.parse import quote, urlencode
+
+from app.config import settings
+
+
+def sign(method: str, bucket: str, key: str, content_type: str, expires: int) -> str:
+    """HMAC signature of a pre-signed request (shared by client and server)"""
+    message = f"{method}\n{bucket}/{key}\n{content_type}\n{expires}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _not_found(operation: str):
+    from botocore.exceptions import ClientError
+
+    return ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, operation)
+
+
+class LocalObjectStoreClient:
+    """
+    Filesystem-backed stand-in for the subset of the boto3 S3 client the app uses.
+
+    Objects live under `root/<bucket>/<key>` with the content type in a
+    `.meta` sidecar. Pre-signed PUT URLs point at the server started by
+    `scripts/local_object_store.py`, which shares the same directory. Missing
+    objects raise the same `ClientError` (code 404) as boto3.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, bucket: str, key: str) -> Path:
+        path = (self.root / bucket / key).resolve()
+        if not str(path).startswith(str(self.root.resolve()) + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def _write_meta(self, path: Path, content_type: Optional[str]):
+        path.with_name(path.name + ".meta").write_text(json.dumps({"ContentType": content_type or "binary/octet-stream"}))
+
+    def put_object(self, Bucket: str, Key: str, Body, ContentType: Optional[str] = None, **kwargs):
+        path = self._path(Bucket, Key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = Body if isinstance(Body, (bytes, bytearray)) else Body.read()
+        path.write_bytes(data)
+        self._write_meta(path, ContentType)
+        return {}
+
+    def upload_fileobj(self, Fileobj: BinaryIO, Bucket: str, Key: str, ExtraArgs: Optional[Dict] = None, **kwargs):
+        path = self._path(Bucket, Key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(Fileobj, f)
+        self._write_meta(path, (ExtraArgs or {}).get("ContentType"))
+
+    def head_object(self, Bucket: str, Key: str, **kwargs):
+        path = self._path(Bucket, Key)
+        if not path.is_file():
+            raise _not_found("HeadObject")
+        meta_path = path.with_name(path.name + ".meta")
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        return {"ContentLength": path.stat().st_size, "ContentType": meta.get("ContentType", "binary/octet-stream")}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs):
+        head = self.head_object(Bucket, Key)
+        return {**head, "Body": open(self._path(Bucket, Key), "rb")}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", **kwargs):
+        bucket_root = self.root / Bucket
+        contents = []
+        if bucket_root.is_dir():
+            for path in sorted(bucket_root.rglob("*")):
+                key = path.relative_to(bucket_root).as_posix()
+                if path.is_file() and not key.endswith(".meta") and key.startswith(Prefix):
+                    stat = path.stat()
+                    contents.append({
+                        "Key": key,
+                        "Size": stat.st_size,
+                        "LastModified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+                    })
+        return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": False}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs):
+        path = self._path(Bucket, Key)
+        for candidate in (path, path.with_name(path.name + ".meta")):
+            if candidate.exists():
+                candidate.unlink()
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict, ExpiresIn: int = 3600, **kwargs) -> str:
+        if ClientMethod != "put_object":
+            raise ValueError(f"Unsupported method for the local object store: {ClientMethod}")
+        expires = int(time.time()) + ExpiresIn
+        content_type = Params.get("ContentType", "")
+        query = urlencode({
+            "expires": expires,
+            "signature": sign("PUT", Params["Bucket"], Params["Key"], content_type, expires)
+        })
+        return f"{self.base_url}/{Params['Bucket']}/{quote(Params['Key'])}?{query}"
+
+
+def create_app(root: str, max_bytes: Optional[int] = None):
+    """
+    ASGI app serving the local object store over HTTP.
+
+    - `PUT /<bucket>/<key>?expires=..&signature=..`: pre-signed upload
+    - `GET|HEAD /<bucket>/<key>`: public read
+    """
+    from starlette.applications import Starlette
+    from starlette.responses import FileResponse, Response
+    from starlette.routing import Route
+
+    client = LocalObjectStoreClient(root, base_url="")
+
+    async def put_object(request):
+        bucket, key = request.path_params["bucket"], request.path_params["key"]
+        content_type = request.headers.get("content-type", "")
+        try:
+            expires = int(request.query_params.get("expires", "0"))
+        except ValueError:
+            expires = 0
+        expected = sign("PUT", bucket, key, content_type, expires)
+        if expires < time.time() or not hmac.compare_digest(expected, request.query_params.get("signature", "")):
+            return Response("SignatureDoesNotMatch", status_code=403)
+
+        path = client._path(bucket, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = 0
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    f.close()
+                    path.unlink()
+                    return Response("EntityTooLarge", status_code=400)
+                f.write(chunk)
+        client._write_meta(path, content_type)
+        return Response(status_code=200, headers={"ETag": f'"{size}"'})
+
+    async def get_object(request):
+        try:
+            head = client.head_object(request.path_params["bucket"], request.path_params["key"])
+        except Exception:
+            return Response("NoSuchKey", status_code=404)
+        return FileResponse(client._path(request.path_params["bucket"], request.path_params["key"]), media_type=head["ContentType"])
+
+    return Starlette(routes=[
+        Route("/{bucket}/{key:path}", put_object, methods=["PUT"]),
+        Route("/{bucket}/{key:path}", get_object, methods=["GET", "HEAD"]),
+    ])
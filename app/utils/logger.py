@@ -0,0 +1,148 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from app.config import settings
+from app.utils.tracing import tracer
+
+ROOT_LOGGER_NAME = "app"
+
+_configure_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the background writer without ever blocking the caller.
+
+    Formatting (including tracebacks) happens on the writer thread; when the
+    queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue, debug_sample_rate: float = 1.0):
+        super().__init__(log_queue)
+        self.debug_sample_rate = debug_sample_rate
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord):
+        # Sampling of high-volume debug lines
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1.0:
+            if random.random() >= self.debug_sample_rate:
+                return
+        try:
+            self.enqueue(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put_nowait(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve the trace id here; formatting is deferred to the writer
+        record.trace_id = tracer.current_span().trace_id
+        return record
+
+
+class StructuredLogger:
+    """
+    Thin wrapper that accepts structured fields as keyword arguments
+
+    Usage:
+        log = get_logger(__name__)
+        log.info("audio_saved", audio_url=url, audio_bytes=len(content))
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def _log(self, level: int, event: str, exc_info: Any = None, **fields):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, **fields)
+
+    def exception(self, event: str, **fields):
+        """Log at ERROR level including the current exception's traceback"""
+        self._log(logging.ERROR, event, exc_info=True, **fields)
+
+
+def configure_logging():
+    """
+    Route every `app.*` logger through a bounded queue to a background
+    writer thread that prints JSON lines to stdout. Safe to call repeatedly.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JSONFormatter())
+
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        root.addHandler(NonBlockingQueueHandler(log_queue, settings.LOG_DEBUG_SAMPLE_RATE))
+        root.propagate = False
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush pending records and stop the writer thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        for handler in list(root.handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                root.removeHandler(handler)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Structured logger for a module (configures logging on first use)"""
+    configure_logging()
+    if not name.startswith(ROOT_LOGGER_NAME):
+        name = f"{ROOT_LOGGER_NAME}.{name}"
+    return StructuredLogger(logging.getLogger(name))
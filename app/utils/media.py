@@ -0,0 +1,204 @@
+import hashlib
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+
+CHUNK_SIZE = 256 * 1024
+
+# mimetypes does not know several of the audio extensions accepted on upload
+_MEDIA_TYPES = {
+    ".aac": "audio/aac",
+    ".m4a": "audio/mp4",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".flac": "audio/flac",
+    ".wma": "audio/x-ms-wma",
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+}
+
+
+def shard_dir(filename: str) -> str:
+    """
+    Two-level shard directory of a stored file ("ab/cd").
+
+    Derived from a hash of the name, so the location can be recomputed from
+    the URL alone and 65536 directories spread millions of files evenly.
+    """
+    digest = hashlib.md5(filename.encode()).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}"
+
+
+def sharded_path(root: str, filename: str) -> Path:
+    return Path(root) / shard_dir(filename) / filename
+
+
+def resolve_media_path(root: str, filename: str) -> Optional[Path]:
+    """
+    Path of a stored file: the sharded location, or the flat one used
+    before sharding. None if the name is invalid or the file does not exist.
+    """
+    if not filename or filename != os.path.basename(filename) or filename.startswith("."):
+        return None
+    for path in (sharded_path(root, filename), Path(root) / filename):
+        if path.is_file():
+            return path
+    return None
+
+
+def media_type_for(filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    return _MEDIA_TYPES.get(extension) or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def _opaque_tag(tag: str) -> str:
+    """Entity tag without its weak prefix (RFC 9110 weak comparison)"""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (other units, several
+    ranges, malformed), which means sending the full file.
+
+    Raises:
+        ValueError: If the range cannot be satisfied for a file of `size` bytes
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, sep, end_text = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        start = int(start_text) if start_text else None
+        end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # Sufijo: los últimos `end` bytes
+        if end is None or end <= 0 or size == 0:
+            raise ValueError(header)
+        return max(size - end, 0), size - 1
+    if start >= size or (end is not None and start > end):
+        raise ValueError(header)
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+class MediaFileResponse(Response):
+    """
+    Response for immutable stored media.
+
+    - Strong ETag and Last-Modified from the file metadata, `304` on a
+      matching `If-None-Match` (weak comparison, so `W/` tags added by
+      compressing proxies still match; `If-Range` stays strong)
+    - `Cache-Control: public, max-age=..., immutable` (names are never reused)
+    - Single `Range` requests (`206`/`416`), honouring `If-Range`
+    - Zero-copy delivery when possible: `X-Accel-Redirect` to nginx when
+      `MEDIA_ACCEL_REDIRECT_PREFIX` is set, the ASGI `http.response.zerocopy`
+      extension when the server offers it, chunked reads in a thread otherwise
+    """
+
+    def __init__(self, path: Path, accel_path: Optional[str] = None):
+        self.path = path
+        self.accel_path = accel_path
+        self.status_code = 200
+        self.background = None
+        self.media_type = media_type_for(path.name)
+        self.raw_headers = []
+
+    def _base_headers(self, stat: os.stat_result) -> dict:
+        return {
+            "etag": f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+            "cache-control": f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable",
+            "accept-ranges": "bytes",
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            stat = await anyio.to_thread.run_sync(os.stat, self.path)
+        except FileNotFoundError:
+            await Response("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        size = stat.st_size
+        headers = self._base_headers(stat)
+        etag = headers["etag"]
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [_opaque_tag(tag) for tag in if_none_match.split(",")]):
+            await self._send_headers(send, 304, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status_code, start, end = 200, 0, size - 1
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range.strip() == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                headers["content-range"] = f"bytes */{size}"
+                await self._send_headers(send, 416, headers)
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if byte_range is not None:
+                status_code, (start, end) = 206, byte_range
+                headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+        count = end - start + 1 if size else 0
+        headers["content-type"] = self.media_type
+        headers["content-length"] = str(count)
+
+        if self.accel_path is not None:
+            # nginx sirve el fichero (sendfile) aplicando él mismo el Range
+            headers.pop("content-length")
+            headers["x-accel-redirect"] = self.accel_path
+            await self._send_headers(send, 200, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await self._send_headers(send, status_code, headers)
+        if scope["method"].upper() == "HEAD" or count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if "http.response.zerocopy" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopy", "file": f.fileno(), "offset": start, "count": count, "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(start)
+            remaining = count
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # El fichero se truncó mientras se enviaba
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_headers(self, send: Send, status_code: int, headers: dict):
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()],
+        })
@@ -0,0 +1,286 @@
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Request, Response, status
+from pydantic import TypeAdapter
+
+from app.config import settings
+from app.schemas.metro import LineStatus, Station, Train
+from app.utils.compression import compress, negotiate_encoding
+from app.utils.metro_simulator import MetroSimulator, LINE_SIMULATORS
+
+try:
+    import msgpack
+except ImportError:  # Optional: without it the msgpack format is not offered
+    msgpack = None
+
+FORMAT_JSON = "json"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_MSGPACK = "msgpack"
+
+MEDIA_TYPES = {
+    FORMAT_JSON: "application/json",
+    FORMAT_COLUMNAR: "application/vnd.aihack.columnar+json",
+    FORMAT_MSGPACK: "application/msgpack",
+}
+_ACCEPT_FORMATS = {
+    "application/vnd.aihack.columnar+json": FORMAT_COLUMNAR,
+    "application/msgpack": FORMAT_MSGPACK,
+    "application/x-msgpack": FORMAT_MSGPACK,
+}
+
+# Distinguishes ticks of this process from those of a previous run in ETags
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+_line_status_adapter = TypeAdapter(LineStatus)
+_stations_adapter = TypeAdapter(List[Station])
+
+RESOURCES = {
+    "status": (MetroSimulator.snapshot_line_status, _line_status_adapter),
+    "stations": (MetroSimulator.snapshot_stations, _stations_adapter),
+}
+
+
+def available_formats():
+    return (FORMAT_JSON, FORMAT_COLUMNAR, FORMAT_MSGPACK) if msgpack is not None else (FORMAT_JSON, FORMAT_COLUMNAR)
+
+
+def negotiate_format(request: Request) -> str:
+    """
+    Representation requested by the client: `?format=` wins over `Accept`.
+
+    Raises:
+        HTTPException 406: If `?format=` names an unsupported format
+    """
+    requested = request.query_params.get("format")
+    if requested:
+        if requested not in available_formats():
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail=f"Formato no soportado. Opciones: {', '.join(available_formats())}"
+            )
+        return requested
+
+    accept = request.headers.get("accept", "")
+    for media_type in accept.split(","):
+        fmt = _ACCEPT_FORMATS.get(media_type.split(";")[0].strip().lower())
+        if fmt in available_formats():
+            return fmt
+    return FORMAT_JSON
+
+
+def to_columnar(data: Any) -> Any:
+    """
+    Turn lists of objects into `{"columns": [...], "rows": [[...], ...]}`
+    tables (recursively), so repeated keys are sent once per list.
+    """
+    if isinstance(data, list) and data and all(isinstance(item, dict) for item in data):
+        columns = list(data[0].keys())
+        return {
+            "columns": columns,
+            "rows": [[to_columnar(item.get(column)) for column in columns] for item in data]
+        }
+    if isinstance(data, dict):
+        return {key: to_columnar(value) for key, value in data.items()}
+    return data
+
+
+def encode(content: Any, fmt: str) -> bytes:
+    """Encode JSON-compatible content in the given format"""
+    if fmt == FORMAT_COLUMNAR:
+        return orjson.dumps(to_columnar(content))
+    if fmt == FORMAT_MSGPACK:
+        return msgpack.packb(content, use_bin_type=True)
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class TickPayloadCache:
+    """
+    Encoded (and compressed) payloads valid for one simulator tick.
+
+    Each (key, format, encoding) variant is built at most once per version,
+    so serialization and compression cost is paid once per tick instead of
+    once per request. The least recently used variants are evicted beyond
+    `maxsize` (batch queries make the key space open-ended).
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[Any, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: Any, fmt: str, encoding: str, build: Callable[[], Any]) -> bytes:
+        cache_key = (key, fmt, encoding)
+        cached = self._entries.get(cache_key)
+        if cached is not None and cached[0] == version:
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        if encoding == "identity":
+            body = encode(build(), fmt)
+        else:
+            # Reuse the uncompressed variant of this tick when present
+            body = compress(self.get(key, version, fmt, "identity", build), encoding)
+        self._entries[cache_key] = (version, body)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return body
+
+
+payload_cache = TickPayloadCache()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """`If-None-Match` check (weak comparison: a `W/` prefix is ignored)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return if_none_match.strip() == "*" or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+def cached_response(request: Request, key: str, version: Any, build: Callable[[], Any]) -> Response:
+    """
+    Negotiated response whose content only changes with `version`.
+
+    Content is encoded (JSON, columnar JSON, MessagePack) and compressed
+    (brotli/gzip above `COMPRESSION_MIN_SIZE`) once per version. A
+    version-based ETag lets polling clients get a 304 when nothing changed.
+
+    Each content-coding of a version is a different representation, so the
+    ETag includes the encoding actually sent (identity, gzip or br).
+    """
+    fmt = negotiate_format(request)
+    body = payload_cache.get(key, version, fmt, "identity", build)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if len(body) < settings.COMPRESSION_MIN_SIZE:
+        encoding = "identity"
+
+    tag = f"{zlib.crc32(key.encode()):08x}-{zlib.crc32(repr(version).encode()):08x}"
+    etag = f'"{_BOOT_ID}-{tag}-{fmt}-{encoding}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if encoding != "identity":
+        body = payload_cache.get(key, version, fmt, encoding, build)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+# ==================== SNAPSHOTS ====================
+
+_snapshot_contents: Dict[Tuple[int, str], Tuple[int, Any]] = {}
+
+
+def snapshot_content(simulator: MetroSimulator, resource: str) -> Any:
+    """JSON-compatible content of a resource ("status" or "stations"), built once per tick"""
+    cache_key = (simulator.line_number, resource)
+    cached = _snapshot_contents.get(cache_key)
+    if cached is not None and cached[0] == simulator.tick:
+        return cached[1]
+    snapshot, adapter = RESOURCES[resource]
+    content = adapter.dump_python(snapshot(simulator), mode="json")
+    _snapshot_contents[cache_key] = (simulator.tick, content)
+    return content
+
+
+def metro_response(request: Request, simulator: MetroSimulator, resource: str) -> Response:
+    """Response for a metro resource ("status" or "stations") of one line, cached per tick"""
+    return cached_response(
+        request,
+        key=f"line{simulator.line_number}:{resource}",
+        version=simulator.tick,
+        build=lambda: snapshot_content(simulator, resource)
+    )
+
+
+# ==================== BATCH ====================
+
+SECTIONS = ("status", "stations")
+# Campos que siempre se conservan para identificar cada elemento
+_ID_FIELDS = {"stations": "id", "trains": "train_id"}
+_SECTION_FIELDS = {
+    "status": set(LineStatus.model_fields),
+    "stations": set(Station.model_fields),
+    "trains": set(Train.model_fields),
+}
+
+
+def parse_projection(fields: Iterable[str]) -> Dict[str, Optional[set]]:
+    """
+    Split a field projection into per-section field sets.
+
+    Unprefixed names apply to every section having that field; `status.`,
+    `stations.` and `trains.` prefixes restrict a name to one section. A
+    section maps to None when it should be returned in full.
+
+    Raises:
+        ValueError: If a name matches no field of any section
+    """
+    projection: Dict[str, Optional[set]] = {"status": set(), "stations": set(), "trains": None}
+    for name in fields:
+        section, _, field = name.rpartition(".")
+        targets = [section] if section else ["status", "stations"]
+        matched = False
+        for target in targets:
+            if target in _SECTION_FIELDS and field in _SECTION_FIELDS[target]:
+                if projection[target] is None:
+                    projection[target] = set()
+                projection[target].add(field)
+                matched = True
+        if not matched:
+            raise ValueError(name)
+    if projection["trains"] is not None:
+        # Pedir campos de los trenes implica incluir la lista de trenes
+        projection["status"].add("active_trains")
+    return projection
+
+
+def _project(item: dict, fields: Optional[set], id_field: Optional[str] = None) -> dict:
+    if fields is None:
+        return item
+    return {key: value for key, value in item.items() if key in fields or key == id_field}
+
+
+def build_batch(lines: List[str], sections: List[str], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Payload of the batch endpoint, assembled from the per-tick snapshots"""
+    projection = parse_projection(fields) if fields else None
+    payload = {}
+    for line in lines:
+        simulator = LINE_SIMULATORS[line]
+        entry: Dict[str, Any] = {"tick": simulator.tick}
+        if "status" in sections:
+            status_content = snapshot_content(simulator, "status")
+            if projection is not None:
+                status_content = _project(status_content, projection["status"])
+                if "active_trains" in status_content:
+                    status_content["active_trains"] = [
+                        _project(train, projection["trains"], _ID_FIELDS["trains"])
+                        for train in status_content["active_trains"]
+                    ]
+            entry["status"] = status_content
+        if "stations" in sections:
+            stations_content = snapshot_content(simulator, "stations")
+            if projection is not None:
+                stations_content = [
+                    _project(station, projection["stations"], _ID_FIELDS["stations"])
+                    for station in stations_content
+                ]
+            entry["stations"] = stations_content
+        payload[line] = entry
+    return payload
+
+
+def batch_response(request: Request, lines: List[str], sections: List[str], fields: Optional[List[str]]) -> Response:
+    """Cached, negotiated response of the batch endpoint (one version per combination of ticks)"""
+    key = f"batch:{','.join(lines)}:{','.join(sections)}:{','.join(fields or [])}"
+    version = tuple(LINE_SIMULATORS[line].tick for line in lines)
+    return cached_response(request, key, version, lambda: build_batch(lines, sections, fields))
@@ -1,8 +1,10 @@
 import random
 import asyncio
+import time
 from datetime import datetime
 from typing import List, Dict, Literal
 from app.schemas.metro import Train, Station, LineStatus
+from app.utils.metrics import simulator_tick_seconds, simulator_tick_drift_seconds
 
 # Configuración de estaciones de la Línea 1
 STATIONS_LINE1 = [
@@ -79,7 +81,8 @@ INCIDENT_MESSAGES = {
 
 class MetroSimulator:
     def __init__(self, line_number=1, stations_config=None, line_name="Línea 1", route="Observatorio ↔ Pantitlán", 
-                 direction_a="Pantitlán", direction_b="Observatorio", train_prefix="T10"):
+                 direction_a="Pantitlán", direction_b="Observatorio", train_prefix="T10", incident_index=None,
+                 num_trains=7):
         """
         Inicializa el simulador de metro
         
@@ -91,6 +94,9 @@ class MetroSimulator:
             direction_a: Primera dirección de viaje
             direction_b: Segunda dirección de viaje
             train_prefix: Prefijo para IDs de trenes (ej: "T10" para T101, T102...)
+            incident_index: Índice de incidentes reales por estación (ActiveIncidentIndex).
+                Se asigna al arrancar la app; si es None no se marcan incidentes.
+            num_trains: Número de trenes en circulación
         """
         self.line_number = line_number
         self.stations_config = stations_config or STATIONS_LINE1
@@ -99,6 +105,8 @@ class MetroSimulator:
         self.direction_a = direction_a
         self.direction_b = direction_b
         self.train_prefix = train_prefix
+        self.incident_index = incident_index
+        self.num_trains = num_trains
         
         self.trains: List[Dict] = []
         self.stations_data: List[Dict] = []
@@ -106,12 +114,15 @@ class MetroSimulator:
         self.incident_message: str = None
         self.last_updated = datetime.now()
         self.is_running = False
+        # Contador de ticks: identifica el estado actual para los snapshots por tick
+        self.tick = 0
+        self._snapshots: Dict[str, tuple] = {}
         self._initialize_simulation()
     
     def _initialize_simulation(self):
         """Inicializa la simulación con trenes y estaciones"""
-        # Crear 7 trenes iniciales
-        num_trains = 7
+        # Crear trenes iniciales
+        num_trains = self.num_trains
         for i in range(num_trains):
             # Distribuir trenes uniformemente en la línea
             station_index = int((len(self.stations_config) - 1) * i / num_trains)
@@ -231,6 +242,11 @@ class MetroSimulator:
             # Personas esperando (más en horas pico simuladas)
             people_waiting = random.randint(20, 100)
             
+            # Incidentes reales reportados en esta estación
+            incident_message = None
+            if self.incident_index is not None:
+                incident_message = self.incident_index.get_station_incident(station_info["id"])
+            
             station_data = {
                 "id": station_info["id"],
                 "name": station_info["name"],
@@ -238,8 +254,8 @@ class MetroSimulator:
                 "longitude": station_info["lng"],
                 "saturation": self._calculate_saturation(people_waiting),
                 "estimated_wait_time": random.randint(2, 5),
-                "has_incident": False,
-                "incident_message": None,
+                "has_incident": incident_message is not None,
+                "incident_message": incident_message,
                 "people_waiting": people_waiting,
                 "next_train_arrival": next_train_arrival
             }
@@ -249,10 +265,19 @@ class MetroSimulator:
     async def update_loop(self):
         """Loop principal de actualización (ejecutar en background)"""
         self.is_running = True
+        line_label = f"line{self.line_number}"
+        tick_seconds = simulator_tick_seconds.labels(line_label)
+        drift_seconds = simulator_tick_drift_seconds.labels(line_label)
         while self.is_running:
+            expected_wakeup = time.perf_counter() + 3
             await asyncio.sleep(3)
+            tick_start = time.perf_counter()
+            # Retraso del despertar: indica que el event loop estuvo bloqueado
+            drift_seconds.observe(max(0.0, tick_start - expected_wakeup))
             self._update_trains()
             self._update_stations_data()
+            self.tick += 1
+            tick_seconds.observe(time.perf_counter() - tick_start)
     
     def get_line_status(self) -> LineStatus:
         """Obtiene el estado actual de la línea"""
@@ -301,12 +326,29 @@ class MetroSimulator:
         """Obtiene el estado de todas las estaciones"""
         return [Station(**station) for station in self.stations_data]
     
+    def _snapshot(self, name: str, build):
+        cached = self._snapshots.get(name)
+        if cached is not None and cached[0] == self.tick:
+            return cached[1]
+        value = build()
+        self._snapshots[name] = (self.tick, value)
+        return value
+    
+    def snapshot_line_status(self) -> LineStatus:
+        """Estado de la línea calculado una sola vez por tick (igual para todas las peticiones del tick)"""
+        return self._snapshot("line_status", self.get_line_status)
+    
+    def snapshot_stations(self) -> List[Station]:
+        """Estaciones calculadas una sola vez por tick"""
+        return self._snapshot("stations", self.get_stations)
+    
     def reset(self):
         """Reinicia la simulación"""
         self.trains.clear()
         self.stations_data.clear()
         self._clear_incident()
         self._initialize_simulation()
+        self.tick += 1
         return {"message": "Simulación reiniciada exitosamente", "timestamp": datetime.now()}
     
     def stop(self):
@@ -335,3 +377,9 @@ metro_simulator_line2 = MetroSimulator(
     direction_b="Cuatro Caminos",
     train_prefix="T20"
 )
+
+# Simuladores por identificador de línea (mismas claves que app.utils.stations.LINE_STATIONS)
+LINE_SIMULATORS = {
+    "line1": metro_simulator,
+    "line2": metro_simulator_line2
+}
@@ -0,0 +1,271 @@
+import asyncio
+import io
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.fall_detection import FallDetection
+from app.utils.incident_rollups import to_utc_naive
+from app.utils.metrics import registry
+from app.utils.stations import match_station
+
+try:
+    from PIL import Image
+except ImportError:  # Optional: without Pillow images cannot be hashed and nothing is suppressed
+    Image = None
+
+fall_detection_frames_total = registry.counter(
+    "fall_detection_frames_total", "Fall detection images received, by near-duplicate check result", ("result",)
+)
+
+
+def dhash(data: bytes) -> Optional[int]:
+    """
+    64-bit difference hash of an image (None if it cannot be decoded).
+
+    Compares each pixel of a 9x8 grayscale thumbnail with its right
+    neighbour, so it survives recompression, small shifts and exposure
+    changes between frames. JPEGs are decoded at reduced scale (`draft`),
+    which keeps this to a few milliseconds even for large frames.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.draft("L", (64, 64))
+            pixels = list(image.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes with the Hamming distance.
+
+    By the triangle inequality, a search within `max_distance` only descends
+    into children whose edge distance is within `max_distance` of the
+    query's distance to the node, instead of comparing every hash.
+    """
+
+    def __init__(self):
+        # Nodo: [hash, valor, {distancia: hijo}]
+        self._root: Optional[list] = None
+        self.size = 0
+
+    def add(self, key: int, value):
+        node = [key, value, {}]
+        self.size += 1
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming(key, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def values(self):
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            yield node[1]
+            stack.extend(node[2].values())
+
+    def search(self, key: int, max_distance: int) -> List[Tuple[int, object]]:
+        """(distance, value) of every stored hash within `max_distance` of `key`"""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(key, node[0])
+            if distance <= max_distance:
+                found.append((distance, node[1]))
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return found
+
+
+class _Entry:
+    """An indexed frame; `record` resolves to its FallDetection id while it is being stored"""
+
+    __slots__ = ("timestamp", "fall_detection_id", "record", "removed", "indexed")
+
+    def __init__(self, timestamp: float, fall_detection_id: Optional[int] = None):
+        self.timestamp = timestamp
+        self.fall_detection_id = fall_detection_id
+        self.removed = False
+        self.indexed = False
+        self.record: Optional[asyncio.Future] = None
+        if fall_detection_id is None:
+            self.record = asyncio.get_running_loop().create_future()
+
+    def resolve(self, fall_detection_id: Optional[int]):
+        """Set the stored id, or None if the frame was not stored / its incident was deleted"""
+        self.fall_detection_id = fall_detection_id
+        self.removed = fall_detection_id is None
+        if self.record is not None and not self.record.done():
+            self.record.set_result(fall_detection_id)
+
+
+class NearDuplicateIndex:
+    """
+    Recent fall detection image hashes per station, for suppressing bursts.
+
+    Cameras post many nearly identical frames of the same fall; a frame whose
+    hash is within `max_distance` bits of a frame of the same station taken
+    less than `window` apart is merged into that frame's incident instead of
+    being stored again.
+
+    Hashes are kept in one BK-tree per station and time bucket of `window`
+    length: a lookup searches the bucket of the frame and its two neighbours,
+    and buckets older than two windows before the current time are dropped
+    whole, so memory follows the event rate of the last few windows.
+
+    Only frames whose incident time is within `window` of the server clock
+    are checked and indexed: a camera with a wrong clock gets its frames
+    stored as they come instead of pushing the index out of range.
+
+    A frame being stored is indexed immediately as pending, so concurrent
+    frames of the same burst wait for its id instead of racing to create
+    their own incident.
+    """
+
+    def __init__(self, window_seconds: int = 120, max_distance: int = 6):
+        self.window = window_seconds
+        self.max_distance = max_distance
+        # station -> {bucket: BKTree}
+        self._trees: Dict[str, Dict[int, BKTree]] = {}
+        # fall_detection_id -> entry, para olvidar incidentes eliminados
+        self._entries: Dict[int, _Entry] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.NEAR_DUPLICATE_ENABLED and Image is not None
+
+    @staticmethod
+    def _station_key(station: str) -> str:
+        match = match_station(station)
+        return match[1] if match is not None else station.strip().lower()
+
+    def _timestamp(self, incident_datetime: datetime) -> float:
+        return (to_utc_naive(incident_datetime) - datetime(1970, 1, 1)).total_seconds()
+
+    def _is_recent(self, timestamp: float) -> bool:
+        return abs(timestamp - time.time()) <= self.window
+
+    def _search(self, station: str, image_hash: int, timestamp: float) -> Optional[_Entry]:
+        buckets = self._trees.get(station)
+        if not buckets or not self._is_recent(timestamp):
+            return None
+        bucket = int(timestamp // self.window)
+        best: Optional[Tuple[int, float, _Entry]] = None
+        for candidate_bucket in (bucket - 1, bucket, bucket + 1):
+            tree = buckets.get(candidate_bucket)
+            if tree is None:
+                continue
+            for distance, entry in tree.search(image_hash, self.max_distance):
+                gap = abs(entry.timestamp - timestamp)
+                if entry.removed or gap > self.window:
+                    continue
+                if best is None or (distance, gap) < best[:2]:
+                    best = (distance, gap, entry)
+        return best[2] if best is not None else None
+
+    def _insert(self, station: str, image_hash: int, entry: _Entry):
+        if not self._is_recent(entry.timestamp):
+            return
+        buckets = self._trees.setdefault(station, {})
+        bucket = int(entry.timestamp // self.window)
+        buckets.setdefault(bucket, BKTree()).add(image_hash, entry)
+        entry.indexed = True
+        # Olvidar los buckets que ya no pueden coincidir con frames nuevos
+        # (según el reloj del servidor, no el de las cámaras)
+        cutoff = time.time() - 2 * self.window
+        for old_bucket in [b for b in buckets if (b + 1) * self.window < cutoff]:
+            for old_entry in buckets.pop(old_bucket).values():
+                if old_entry.fall_detection_id is not None:
+                    self._entries.pop(old_entry.fall_detection_id, None)
+
+    async def find(self, station: str, image_hash: int, incident_datetime: datetime) -> Optional[int]:
+        """
+        Id of the incident a frame duplicates, or None if it is a new event.
+
+        Waits for a matching frame that is still being stored.
+        """
+        station_key = self._station_key(station)
+        timestamp = self._timestamp(incident_datetime)
+        while True:
+            entry = self._search(station_key, image_hash, timestamp)
+            if entry is None:
+                return None
+            if entry.fall_detection_id is not None:
+                return entry.fall_detection_id
+            fall_detection_id = await asyncio.shield(entry.record)
+            if fall_detection_id is not None:
+                return fall_detection_id
+            # El frame pendiente no llegó a guardarse: buscar otro candidato
+
+    def reserve(self, station: str, image_hash: int, incident_datetime: datetime) -> _Entry:
+        """
+        Index a frame that is about to be stored.
+
+        Must be followed by `entry.resolve(fall_detection_id)` once stored,
+        or `entry.resolve(None)` if storing fails.
+        """
+        entry = _Entry(self._timestamp(incident_datetime))
+        self._insert(self._station_key(station), image_hash, entry)
+        return entry
+
+    def add(self, fall_detection: FallDetection):
+        """Index a stored frame (from the database)"""
+        if not fall_detection.image_hash:
+            return
+        entry = _Entry(self._timestamp(fall_detection.incident_datetime), fall_detection.id)
+        self._insert(self._station_key(fall_detection.station), int(fall_detection.image_hash, 16), entry)
+        if entry.indexed:
+            self._entries[fall_detection.id] = entry
+
+    def resolve(self, entry: _Entry, fall_detection_id: Optional[int]):
+        entry.resolve(fall_detection_id)
+        if fall_detection_id is not None and entry.indexed:
+            self._entries[fall_detection_id] = entry
+
+    def remove(self, fall_detection_id: int):
+        """Forget a deleted incident (its frames stop matching)"""
+        entry = self._entries.pop(fall_detection_id, None)
+        if entry is not None:
+            entry.resolve(None)
+
+    def load(self, db: Session):
+        """Index the hashed frames of the last window from the database"""
+        self._trees.clear()
+        self._entries.clear()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.window)
+        query = db.query(FallDetection)\
+            .filter(FallDetection.incident_datetime >= cutoff, FallDetection.image_hash.isnot(None))\
+            .order_by(FallDetection.incident_datetime)
+        for fall_detection in query:
+            self.add(fall_detection)
+
+
+# Instancia global compartida por las rutas
+near_duplicates = NearDuplicateIndex(
+    window_seconds=settings.NEAR_DUPLICATE_WINDOW_SECONDS,
+    max_distance=settings.NEAR_DUPLICATE_MAX_DISTANCE
+)
@@ -1,9 +1,12 @@
 import json
 import io
 from typing import Dict, Any
-from openai import OpenAI
 from fastapi import UploadFile
-from app.config import settings
+from app.utils.clients import get_openai_client
+from app.utils.metrics import track_external_call
+from app.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 class OpenAIService:
     """
@@ -11,7 +14,18 @@ class OpenAIService:
     """
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # El cliente se crea en el primer uso (ver app.utils.clients)
+        self._client = None
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_openai_client()
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
     
     async def transcribe_audio(self, audio_file: UploadFile) -> str:
         """
@@ -27,31 +41,32 @@ class OpenAIService:
             Exception: If transcription fails
         """
         try:
-            print(f"🎤 Starting transcription for file: {audio_file.filename}")
-            print(f"📋 Content type: {audio_file.content_type}")
-            
             # Read file content
             audio_content = await audio_file.read()
-            print(f"📦 Audio content size: {len(audio_content)} bytes")
+            log.debug(
+                "transcription_started",
+                filename=audio_file.filename,
+                content_type=audio_file.content_type,
+                audio_bytes=len(audio_content)
+            )
             
             # Create a file-like object
             audio_file_obj = io.BytesIO(audio_content)
             audio_file_obj.name = audio_file.filename
             
-            print(f"🔊 Sending to Whisper API with filename: {audio_file_obj.name}")
-            
             # Transcribe using Whisper
-            response = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file_obj,
-                language="es"
-            )
+            with track_external_call("openai", "transcribe_audio"):
+                response = self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file_obj,
+                    language="es"
+                )
             
-            print(f"✅ Transcription successful: {response.text[:100]}...")
+            log.info("transcription_completed", filename=audio_file.filename, transcription_chars=len(response.text))
             return response.text
             
         except Exception as e:
-            print(f"❌ Transcription error: {str(e)}")
+            log.error("transcription_failed", filename=audio_file.filename, error=str(e))
             raise Exception(f"Error transcribing audio: {str(e)}")
     
     async def extract_incident_data(self, transcription: str) -> Dict[str, Any]:
@@ -104,21 +119,22 @@ Formato esperado:
 }}
 """
         
-        completion = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Eres un asistente experto en analizar reportes de incidentes del Sistema de Transporte Colectivo Metro de la Ciudad de México. Extraes información estructurada de forma precisa y concisa."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,
-            max_tokens=500
-        )
+        with track_external_call("openai", "extract_incident_data"):
+            completion = self.client.chat.completions.create(
+                model="gpt-4",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "Eres un asistente experto en analizar reportes de incidentes del Sistema de Transporte Colectivo Metro de la Ciudad de México. Extraes información estructurada de forma precisa y concisa."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=500
+            )
         
         # Parse JSON response
         response_text = completion.choices[0].message.content
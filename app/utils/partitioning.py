@@ -0,0 +1,334 @@
+import asyncio
+import gzip
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Column, MetaData, PrimaryKeyConstraint, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine as default_engine
+from app.models.fall_detection import FallDetection
+from app.models.incident_report import IncidentReport
+from app.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+PARTITIONED_MODELS = (IncidentReport, FallDetection)
+PARTITION_KEY = "incident_datetime"
+
+# Clave del advisory lock que serializa el mantenimiento entre procesos
+_ADVISORY_LOCK_KEY = 0x70617274
+
+
+def partitioning_enabled(engine: Engine) -> bool:
+    """Monthly partitioning is PostgreSQL declarative partitioning; other databases keep plain tables"""
+    return settings.TABLE_PARTITIONING_ENABLED and engine.dialect.name == "postgresql"
+
+
+def month_start(dt: datetime) -> datetime:
+    """First instant of the UTC month of `dt` (naive dates are taken as UTC)"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def incident_window(query, column, since: Optional[datetime], until: Optional[datetime]):
+    """
+    Restrict a query to `since <= column < until` (naive dates are UTC).
+
+    Constant bounds on the partition key let PostgreSQL skip the partitions
+    outside the window at plan time.
+    """
+    if since is not None:
+        query = query.filter(column >= (since if since.tzinfo else since.replace(tzinfo=timezone.utc)))
+    if until is not None:
+        query = query.filter(column < (until if until.tzinfo else until.replace(tzinfo=timezone.utc)))
+    return query
+
+
+def partition_name(table_name: str, month: datetime) -> str:
+    return f"{table_name}_p{month:%Y%m}"
+
+
+def default_partition_name(table_name: str) -> str:
+    return f"{table_name}_default"
+
+
+def partitioned_table(table: Table, metadata: MetaData, name: Optional[str] = None) -> Table:
+    """
+    Copy of a model table declared as `PARTITION BY RANGE (incident_datetime)`.
+
+    PostgreSQL requires the partition key in every unique constraint, so the
+    primary key becomes (id, incident_datetime); the ORM keeps mapping `id`
+    alone, which stays unique through its sequence.
+    """
+    copy = table.to_metadata(metadata, name=name or table.name)
+    copy.c.id.autoincrement = True
+    copy.c[PARTITION_KEY].primary_key = True
+    copy.append_constraint(PrimaryKeyConstraint("id", PARTITION_KEY, name=f"{copy.name}_pkey"))
+    copy.dialect_options["postgresql"]["partition_by"] = f"RANGE ({PARTITION_KEY})"
+    return copy
+
+
+def is_partitioned(conn: Connection, table_name: str) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"),
+        {"name": table_name}
+    ).first() is not None
+
+
+def monthly_partitions(conn: Connection, table_name: str) -> Dict[datetime, str]:
+    """Attached monthly partitions of a table, by month"""
+    pattern = re.compile(rf"^{re.escape(table_name)}_p(\d{{4}})(\d{{2}})$")
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:name)"
+    ), {"name": table_name})
+    partitions = {}
+    for (relname,) in rows:
+        match = pattern.match(relname)
+        if match:
+            partitions[datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)] = relname
+    return partitions
+
+
+def create_partitioned(conn: Connection, table: Table):
+    """Create the partitioned version of a model table and its default partition"""
+    # checkfirst: los tipos ENUM ya existen si se convierte una tabla previa
+    partitioned_table(table, MetaData()).create(conn, checkfirst=True)
+    conn.execute(text(f'CREATE TABLE "{default_partition_name(table.name)}" PARTITION OF "{table.name}" DEFAULT'))
+    log.info("partitioned_table_created", table=table.name)
+
+
+def create_partitioned_tables(engine: Engine):
+    """
+    Create the partitioned tables that do not exist yet, with their default
+    partition and the partitions from the current month onwards.
+
+    Runs before `create_all`, which then skips them. Existing plain tables
+    are left alone (see `scripts/partition_tables.py`).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for model in PARTITIONED_MODELS:
+            if not inspector.has_table(model.__table__.name):
+                create_partitioned(conn, model.__table__)
+    ensure_partitions(engine)
+
+
+def create_month_partition(conn: Connection, table_name: str, month: datetime) -> str:
+    """
+    Create and attach the partition of one month.
+
+    Rows of that month already in the default partition (e.g. incidents
+    reported with an old date) are moved into it first, which ATTACH
+    requires. Attaching instead of `CREATE TABLE ... PARTITION OF` only takes
+    a SHARE UPDATE EXCLUSIVE lock on the parent, so reads and inserts go on.
+    """
+    name = partition_name(table_name, month)
+    default = default_partition_name(table_name)
+    bounds = {"lower": month, "upper": add_months(month, 1)}
+    conn.execute(text(f'CREATE TABLE "{name}" (LIKE "{table_name}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    conn.execute(text(
+        f'WITH moved AS (DELETE FROM "{default}" WHERE {PARTITION_KEY} >= :lower AND {PARTITION_KEY} < :upper RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved'
+    ), bounds)
+    conn.execute(text(
+        f'ALTER TABLE "{table_name}" ATTACH PARTITION "{name}" '
+        f"FOR VALUES FROM ('{bounds['lower'].isoformat()}') TO ('{bounds['upper'].isoformat()}')"
+    ))
+    return name
+
+
+def ensure_partitions(engine: Engine, first_month: Optional[datetime] = None, last_month: Optional[datetime] = None) -> List[str]:
+    """
+    Create the missing monthly partitions between `first_month` (default:
+    the current month) and `last_month` (default: `PARTITION_PREMAKE_MONTHS`
+    ahead), so inserts never have to wait for one.
+
+    Returns:
+        Names of the partitions created
+    """
+    current = month_start(datetime.now(timezone.utc))
+    first_month = month_start(first_month) if first_month else current
+    last_month = month_start(last_month) if last_month else add_months(current, settings.PARTITION_PREMAKE_MONTHS)
+    created = []
+    for model in PARTITIONED_MODELS:
+        table_name = model.__table__.name
+        with engine.begin() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}).scalar():
+                continue
+            if not is_partitioned(conn, table_name):
+                continue
+            existing = monthly_partitions(conn, table_name)
+            month = first_month
+            while month <= last_month:
+                if month not in existing:
+                    created.append(create_month_partition(conn, table_name, month))
+                month = add_months(month, 1)
+    if created:
+        log.info("partitions_created", partitions=created)
+    return created
+
+
+def archive_partition(engine: Engine, name: str, directory: str) -> Path:
+    """
+    Dump a detached partition to `<directory>/<name>.csv.gz` (COPY, with header).
+
+    Written to a temporary file and renamed, so an archive that exists is complete.
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    path = Path(directory) / f"{name}.csv.gz"
+    tmp = path.with_name(path.name + ".tmp")
+    raw = engine.raw_connection()
+    try:
+        with gzip.open(tmp, "wb") as f:
+            raw.cursor().copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', f)
+        raw.commit()
+    finally:
+        raw.close()
+    os.replace(tmp, path)
+    return path
+
+
+def detached_partitions(conn: Connection, table_name: str) -> Dict[datetime, str]:
+    """Monthly partitions of a table detached by retention (standalone tables), by month"""
+    pattern = re.compile(rf"^{re.escape(table_name)}_p(\d{{4}})(\d{{2}})$")
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_class c "
+        "WHERE c.relkind = 'r' AND pg_table_is_visible(c.oid) AND c.relname LIKE :prefix "
+        "AND NOT c.relispartition"
+    ), {"prefix": f"{table_name}\\_p%"})
+    partitions = {}
+    for (relname,) in rows:
+        match = pattern.match(relname)
+        if match:
+            partitions[datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)] = relname
+    return partitions
+
+
+def retention_cutoff() -> Optional[datetime]:
+    """Start of the oldest month kept attached (None without retention)"""
+    if settings.PARTITION_RETENTION_MONTHS <= 0:
+        return None
+    return add_months(month_start(datetime.now(timezone.utc)), -settings.PARTITION_RETENTION_MONTHS)
+
+
+def retained_media_urls(db: Session, columns: Iterable[Column], urls: List[str]) -> Set[str]:
+    """
+    URLs among `urls` still referenced by rows of detached partitions.
+
+    The storage sweep only sees the attached tables; with
+    `PARTITION_RETENTION_MEDIA=keep` it must not delete the files of the
+    rows retention kept aside.
+    """
+    if settings.PARTITION_RETENTION_MEDIA != "keep" or db.get_bind().dialect.name != "postgresql":
+        return set()
+    conn = db.connection()
+    referenced = set()
+    partitioned = {model.__table__.name for model in PARTITIONED_MODELS}
+    detached = {}
+    for column in columns:
+        table_name = column.table.name
+        if table_name not in partitioned:
+            continue
+        if table_name not in detached:
+            detached[table_name] = list(detached_partitions(conn, table_name).values())
+        for name in detached[table_name]:
+            referenced.update(conn.execute(
+                text(f'SELECT "{column.name}" FROM "{name}" WHERE "{column.name}" = ANY(:urls)'), {"urls": urls}
+            ).scalars())
+    return referenced
+
+
+def apply_retention(engine: Engine) -> List[str]:
+    """
+    Detach the monthly partitions older than `PARTITION_RETENTION_MONTHS`.
+
+    With `PARTITION_RETENTION_ACTION=archive` detached partitions are also
+    dumped to a compressed CSV in `PARTITION_ARCHIVE_PATH` and dropped (one
+    whose archive fails stays detached and is retried on the next run); with
+    `detach` they stay as standalone tables, out of every query.
+
+    Returns:
+        Names of the partitions detached or archived
+    """
+    cutoff = retention_cutoff()
+    if cutoff is None:
+        return []
+    processed = []
+    for model in PARTITIONED_MODELS:
+        table_name = model.__table__.name
+        with engine.begin() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}).scalar():
+                continue
+            for month, name in sorted(monthly_partitions(conn, table_name).items()):
+                if add_months(month, 1) <= cutoff:
+                    conn.execute(text(f'ALTER TABLE "{table_name}" DETACH PARTITION "{name}"'))
+                    log.info("partition_detached", partition=name)
+                    processed.append(name)
+            to_archive = [
+                name for month, name in sorted(detached_partitions(conn, table_name).items())
+                if add_months(month, 1) <= cutoff
+            ] if settings.PARTITION_RETENTION_ACTION == "archive" else []
+
+        for name in to_archive:
+            try:
+                path = archive_partition(engine, name, settings.PARTITION_ARCHIVE_PATH)
+            except Exception as e:
+                # Se queda como tabla suelta y se reintenta en la próxima pasada
+                log.error("partition_archive_failed", partition=name, error=str(e))
+                continue
+            with engine.begin() as conn:
+                conn.execute(text(f'DROP TABLE "{name}"'))
+            log.info("partition_archived", partition=name, path=str(path), bytes=path.stat().st_size)
+            if name not in processed:
+                processed.append(name)
+    return processed
+
+
+class PartitionMaintainer:
+    """
+    Background job keeping the monthly partitions ahead of time and applying
+    retention, every `PARTITION_MAINTENANCE_INTERVAL_SECONDS`.
+
+    Every worker runs it; a PostgreSQL advisory lock lets only one of them
+    change the schema at a time.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._running = False
+
+    def run_once(self):
+        """Create upcoming partitions and apply retention (blocking)"""
+        ensure_partitions(self.engine)
+        apply_retention(self.engine)
+
+    async def run(self):
+        self._running = True
+        while self._running:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("partition_maintenance_failed", error=str(e))
+            await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+
+    def stop(self):
+        self._running = False
+
+
+# Instancia global (solo se arranca con PostgreSQL y el particionado activado)
+partition_maintainer = PartitionMaintainer(default_engine)
@@ -0,0 +1,353 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import registry
+
+log = get_logger(__name__)
+
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds", "How late asyncio.sleep wake-ups are (event loop blocked)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+_SITE_MARKERS = ("site-packages" + os.sep, "dist-packages" + os.sep)
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+
+
+def _short_filename(filename: str) -> str:
+    for marker in _SITE_MARKERS:
+        index = filename.find(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    if filename.startswith(_REPO_ROOT):
+        return filename[len(_REPO_ROOT):]
+    return os.path.basename(filename)
+
+
+def _is_app_frame(frame) -> bool:
+    filename = frame.f_code.co_filename
+    return filename.startswith(_REPO_ROOT) and not any(marker in filename for marker in _SITE_MARKERS)
+
+
+def format_stack(frame) -> List[str]:
+    """Frames of a stack as `file:function` strings, outermost first"""
+    frames = []
+    while frame is not None:
+        frames.append(f"{_short_filename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+# ==================== CPU ====================
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every thread in the process.
+
+    A background thread captures `sys._current_frames()` every `interval`
+    seconds and aggregates the stacks, so the profiled code runs unmodified.
+    Output is in the collapsed-stack format understood by flamegraph.pl and
+    speedscope (`thread;outer;...;inner count`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.interval = 0.005
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.005) -> bool:
+        """Start sampling for `seconds`; returns False if a session is already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(seconds,), name="cpu-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop the current session early (results are kept)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self, seconds: float):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        thread_names: Dict[int, str] = {}
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            if len(thread_names) != threading.active_count():
+                thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = thread_names.get(thread_id, str(thread_id))
+                self.stacks[";".join([name] + format_stack(frame))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+        self.stopped_at = time.time()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "interval_seconds": self.interval,
+            "distinct_stacks": len(self.stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+
+# ==================== MEMORY ====================
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    """tracemalloc snapshot without tracemalloc's and the import machinery's own allocations"""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+class MemorySnapshots:
+    """tracemalloc snapshots diffed against the previous call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def snapshot_diff(self, limit: int = 25, frames: int = 1) -> dict:
+        """
+        Take a snapshot and diff it against the previous one.
+
+        The first call only starts tracemalloc and stores a baseline.
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing() or self._previous is None:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(frames)
+                self._previous = _take_snapshot()
+                return {"tracing": True, "message": "tracemalloc started; call again to get a diff", "top": []}
+
+            snapshot = _take_snapshot()
+            stats = snapshot.compare_to(self._previous, "lineno")
+            self._previous = snapshot
+            current, peak = tracemalloc.get_traced_memory()
+            return {
+                "tracing": True,
+                "traced_current_bytes": current,
+                "traced_peak_bytes": peak,
+                "top": [
+                    {
+                        "location": f"{_short_filename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                        "size_diff_bytes": stat.size_diff,
+                        "size_bytes": stat.size,
+                        "count_diff": stat.count_diff,
+                        "count": stat.count,
+                    }
+                    for stat in stats[:limit]
+                ],
+            }
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+
+# ==================== EVENT LOOP LAG ====================
+
+class LoopLagMonitor:
+    """
+    Measures how late `asyncio.sleep` wake-ups are.
+
+    Any lag well above zero means something blocked the event loop (sync DB,
+    boto3, bcrypt...). Recent samples are kept for the admin endpoint and
+    every sample is recorded in the `event_loop_lag_seconds` histogram.
+    """
+
+    def __init__(self, interval: float = 0.25, history: int = 2400):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=history)
+        self.is_running = False
+
+    async def run(self):
+        self.is_running = True
+        loop = asyncio.get_running_loop()
+        while self.is_running:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.samples.append((time.time(), lag))
+            event_loop_lag_seconds.observe(lag)
+
+    def stop(self):
+        self.is_running = False
+
+    def stats(self, seconds: Optional[float] = None) -> dict:
+        since = time.time() - seconds if seconds else 0
+        lags = sorted(lag for ts, lag in list(self.samples) if ts >= since)
+        if not lags:
+            return {"samples": 0}
+
+        def pct(p):
+            return lags[min(len(lags) - 1, int(p / 100 * len(lags)))]
+
+        return {
+            "samples": len(lags),
+            "interval_seconds": self.interval,
+            "mean_ms": round(sum(lags) / len(lags) * 1000, 3),
+            "p50_ms": round(pct(50) * 1000, 3),
+            "p99_ms": round(pct(99) * 1000, 3),
+            "max_ms": round(lags[-1] * 1000, 3),
+        }
+
+
+class LoopBlockingWatchdog:
+    """
+    Detects event-loop stalls and records what was blocking the loop.
+
+    A heartbeat coroutine stamps the time every few milliseconds; a watchdog
+    thread notices when the stamp is older than `threshold` and captures the
+    loop thread's stack while it is still stuck. Stalls are grouped by call
+    site: the innermost frame in this repository's code (e.g. the line in a
+    route calling boto3 or bcrypt), with the innermost frame overall kept as
+    the blocking call.
+    """
+
+    def __init__(self, threshold: float = 0.1, max_sites: int = 200):
+        self.threshold = threshold
+        self.max_sites = max_sites
+        self.beat_interval = max(0.005, threshold / 5)
+        self.sites: Dict[str, dict] = {}
+        self.stalls = 0
+        self.is_running = False
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def run(self):
+        """Heartbeat on the event loop; also starts the watchdog thread"""
+        self.is_running = True
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        while self.is_running:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.beat_interval)
+
+    def stop(self):
+        self.is_running = False
+
+    def _watch(self):
+        stall_beat = None
+        stall_site = None
+        stall_blocked = 0.0
+        while self.is_running:
+            time.sleep(self.beat_interval)
+            beat = self._last_beat
+            blocked = time.monotonic() - beat - self.beat_interval
+            if stall_beat is not None and beat != stall_beat:
+                # The loop came back: the stall is over
+                self._finish_stall(stall_site, stall_blocked)
+                stall_beat = None
+            if blocked >= self.threshold:
+                if stall_beat is None:
+                    frame = sys._current_frames().get(self._loop_thread_id)
+                    stall_site = self._start_stall(frame)
+                    stall_beat = beat
+                stall_blocked = blocked
+
+    def _start_stall(self, frame) -> str:
+        if frame is None:
+            return "<unknown>"
+        innermost = frame
+        call_site = None
+        while frame is not None:
+            if call_site is None and _is_app_frame(frame):
+                call_site = frame
+            frame = frame.f_back
+        site_frame = call_site or innermost
+        site = f"{_short_filename(site_frame.f_code.co_filename)}:{site_frame.f_lineno} in {site_frame.f_code.co_name}"
+        blocking_call = f"{_short_filename(innermost.f_code.co_filename)}:{innermost.f_lineno} in {innermost.f_code.co_name}"
+        with self._lock:
+            self.stalls += 1
+            entry = self.sites.get(site)
+            if entry is None:
+                if len(self.sites) >= self.max_sites:
+                    site = "<other>"
+                    entry = self.sites.setdefault(site, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "blocking_call": None, "stack": []})
+                else:
+                    entry = self.sites[site] = {
+                        "count": 0,
+                        "total_ms": 0.0,
+                        "max_ms": 0.0,
+                        "blocking_call": blocking_call,
+                        "stack": format_stack(innermost),
+                    }
+            entry["count"] += 1
+        return site
+
+    def _finish_stall(self, site: str, blocked: float):
+        blocked_ms = blocked * 1000
+        with self._lock:
+            entry = self.sites.get(site)
+            if entry is not None:
+                entry["total_ms"] += blocked_ms
+                entry["max_ms"] = max(entry["max_ms"], blocked_ms)
+        log.warning("event_loop_blocked", call_site=site, blocked_ms=round(blocked_ms, 1))
+
+    def report(self) -> dict:
+        """Stalls grouped by call site, worst total blocking time first"""
+        with self._lock:
+            sites = [
+                {"call_site": site, **entry, "total_ms": round(entry["total_ms"], 1), "max_ms": round(entry["max_ms"], 1)}
+                for site, entry in self.sites.items()
+            ]
+            stalls = self.stalls
+        sites.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return {
+            "enabled": self.is_running,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": stalls,
+            "sites": sites,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.sites = {}
+            self.stalls = 0
+
+
+# Instancias globales usadas por las rutas de administración
+cpu_profiler = SamplingProfiler()
+memory_snapshots = MemorySnapshots()
+loop_lag_monitor = LoopLagMonitor()
+loop_watchdog = LoopBlockingWatchdog(threshold=settings.LOOP_WATCHDOG_THRESHOLD_MS / 1000)
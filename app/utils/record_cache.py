@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.logger import get_logger
+from app.utils.metrics import registry
+
+try:
+    import redis
+except ImportError:  # Optional: only needed for RECORD_CACHE_BACKEND=redis
+    redis = None
+
+log = get_logger(__name__)
+
+record_cache_requests_total = registry.counter(
+    "record_cache_requests_total", "Record cache lookups, by tier that answered (local, shared, miss)", ("cache", "result")
+)
+record_cache_hit_ratio = registry.gauge(
+    "record_cache_hit_ratio", "Fraction of record cache lookups answered from the local or shared tier", ("cache",)
+)
+
+# Valor compartido de un registro borrado o modificado: los bytes JSON nunca empiezan por NUL
+TOMBSTONE = b"\x00tombstone"
+
+
+class FileCacheBackend:
+    """
+    Shared-cache stand-in backed by a directory.
+
+    Shared by every worker process of one host, so it exercises the same
+    paths as Redis without running one. Each file's mtime holds its expiry
+    time; expired entries are ignored.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def _file(self, key: str) -> Path:
+        return self.path / hashlib.sha1(key.encode()).hexdigest()
+
+    def _expired(self, path: Path) -> bool:
+        return path.stat().st_mtime < time.time()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._file(key)
+        try:
+            if self._expired(path):
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, value: bytes, exclusive: bool) -> bool:
+        # Escritura atómica: los lectores nunca ven un fichero a medias
+        fd, tmp = tempfile.mkstemp(dir=self.path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            expires_at = time.time() + self.ttl
+            os.utime(tmp, (expires_at, expires_at))
+            if not exclusive:
+                os.replace(tmp, self._file(key))
+                return True
+            target = self._file(key)
+            for _ in range(2):
+                try:
+                    # link() falla si el destino existe: no pisa una lápida ni un valor más reciente
+                    os.link(tmp, target)
+                    return True
+                except FileExistsError:
+                    try:
+                        if not self._expired(target):
+                            return False
+                        target.unlink()
+                    except FileNotFoundError:
+                        pass
+            return False
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+
+    def set(self, key: str, value: bytes):
+        self._write(key, value, exclusive=False)
+
+    def add(self, key: str, value: bytes) -> bool:
+        """Store `value` only if the key has no live entry"""
+        return self._write(key, value, exclusive=True)
+
+
+class RedisCacheBackend:
+    """Shared cache in Redis; entries expire after `ttl` seconds"""
+
+    def __init__(self, url: str, ttl: float):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes):
+        self.client.set(key, value, ex=max(int(self.ttl), 1))
+
+    def add(self, key: str, value: bytes) -> bool:
+        """Store `value` only if the key has no live entry"""
+        return bool(self.client.set(key, value, ex=max(int(self.ttl), 1), nx=True))
+
+
+def create_shared_backend():
+    """Shared tier selected by `RECORD_CACHE_BACKEND` (None for `memory`)"""
+    backend = settings.RECORD_CACHE_BACKEND
+    if backend == "file":
+        return FileCacheBackend(settings.RECORD_CACHE_PATH, settings.RECORD_CACHE_SHARED_TTL_SECONDS)
+    if backend == "redis":
+        if redis is None:
+            log.warning("record_cache_backend_unavailable", backend=backend, reason="redis package not installed")
+            return None
+        return RedisCacheBackend(settings.RECORD_CACHE_REDIS_URL, settings.RECORD_CACHE_SHARED_TTL_SECONDS)
+    return None
+
+
+class RecordCache:
+    """
+    Write-through cache of serialized records (response bytes by id).
+
+    A bounded LRU in each process, optionally in front of a shared backend
+    (Redis, or a directory as local stand-in) so workers reuse each other's
+    entries. Create handlers `put()` the new record and delete/update handlers
+    `delete()` it, so reads only reach the database for records that were
+    never cached or were evicted.
+
+    Deleting in one process cannot reach the LRU of the others: their copies
+    live at most `RECORD_CACHE_LOCAL_TTL_SECONDS`. In the shared tier,
+    `delete()` leaves a tombstone for `RECORD_CACHE_SHARED_TTL_SECONDS`, and
+    readers only `add()` what they loaded (never overwriting a key), so a
+    load that started before a delete in another worker cannot bring the old
+    record back. Shared backend failures are logged and treated as misses.
+
+    Shared writes run in order on one background thread per cache, off the
+    event loop; `put()`/`delete()` only update the local LRU inline.
+    """
+
+    def __init__(self, name: str, maxsize: int, local_ttl: float, shared=None):
+        """
+        Args:
+            name: Record type, used in shared keys and metric labels
+            maxsize: Maximum number of records in the local LRU
+            local_ttl: Seconds a record stays in the local LRU
+            shared: Optional shared backend with get/set/add
+        """
+        self.name = name
+        self.local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self.shared = shared
+        # Un solo hilo: las escrituras compartidas se aplican en el orden en que se piden
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"record-cache-{name}") if shared is not None else None
+        # Cambia con cada escritura: una lectura iniciada antes no repuebla la caché
+        self._generation = 0
+        self._hits = 0
+        self._lookups = 0
+
+    def _key(self, record_id: int) -> str:
+        return f"record:{self.name}:{record_id}"
+
+    def _shared_call(self, operation: str, *args):
+        try:
+            return getattr(self.shared, operation)(*args)
+        except Exception as e:
+            log.warning("record_cache_shared_failed", cache=self.name, operation=operation, error=str(e))
+            return None
+
+    def _shared_write(self, operation: str, record_id: int, body: bytes):
+        if self._writer is not None:
+            self._writer.submit(self._shared_call, operation, self._key(record_id), body)
+
+    def _count(self, result: str):
+        record_cache_requests_total.labels(self.name, result).inc()
+        self._lookups += 1
+        if result != "miss":
+            self._hits += 1
+        record_cache_hit_ratio.labels(self.name).set(self._hits / self._lookups)
+
+    async def get(self, record_id: int) -> Optional[bytes]:
+        body = self.local.get(record_id)
+        if body is not None:
+            self._count("local")
+            return body
+        if self.shared is not None:
+            body = await asyncio.to_thread(self._shared_call, "get", self._key(record_id))
+            if body is not None and body != TOMBSTONE:
+                self.local.set(record_id, body)
+                self._count("shared")
+                return body
+        self._count("miss")
+        return None
+
+    async def get_or_load(self, record_id: int, load: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Cached record, or `load()` it and cache it unless a write happened meanwhile"""
+        body = await self.get(record_id)
+        if body is not None:
+            return body
+        generation = self._generation
+        body = await load()
+        if generation == self._generation:
+            self.local.set(record_id, body)
+            # add(): si otro worker lo borró mientras tanto, su lápida gana
+            self._shared_write("add", record_id, body)
+        return body
+
+    def put(self, record_id: int, body: bytes):
+        """Store the current representation of a record (after a create or update)"""
+        self._generation += 1
+        self.local.set(record_id, body)
+        self._shared_write("set", record_id, body)
+
+    def delete(self, record_id: int):
+        """Forget a deleted or modified record"""
+        self._generation += 1
+        self.local.delete(record_id)
+        self._shared_write("set", record_id, TOMBSTONE)
+
+
+def _create_cache(name: str) -> RecordCache:
+    return RecordCache(
+        name,
+        maxsize=settings.RECORD_CACHE_SIZE,
+        local_ttl=settings.RECORD_CACHE_LOCAL_TTL_SECONDS,
+        shared=create_shared_backend()
+    )
+
+
+# Instancias globales por tipo de registro
+incident_report_records = _create_cache("incident_report")
+fall_detection_records = _create_cache("fall_detection")
@@ -0,0 +1,24 @@
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson (the app's default response class).
+
+    For the JSON-compatible data produced by `response_model` serialization the
+    output is byte-for-byte what `JSONResponse` renders (compact separators,
+    UTF-8 without escaping). Handlers returning a response directly may also
+    pass datetimes, dates, UUIDs, enums and dataclasses, which orjson encodes
+    natively.
+    """
+
+    def render(self, content: Any) -> bytes:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Types orjson does not support (e.g. integers beyond 64 bits)
+            return super().render(jsonable_encoder(content))
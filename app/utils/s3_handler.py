@@ -1,20 +1,26 @@
-import boto3
 import uuid
 from datetime import datetime
-from botocore.exceptions import ClientError
 from app.config import settings
+from app.utils.clients import get_s3_client, object_url, object_key_from_url
+from app.utils.metrics import track_external_call
 from typing import BinaryIO
 
 class S3Handler:
     def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
-        )
+        # El cliente de boto3 se crea en el primer uso (ver app.utils.clients)
+        self._s3_client = None
         self.bucket_name = settings.AWS_S3_BUCKET
     
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            self._s3_client = get_s3_client()
+        return self._s3_client
+    
+    @s3_client.setter
+    def s3_client(self, client):
+        self._s3_client = client
+    
     def upload_image(self, file: BinaryIO, filename: str) -> str:
         """
         Sube una imagen a S3 y retorna la URL pública
@@ -29,6 +35,8 @@ class S3Handler:
         Raises:
             Exception: Si hay error al subir la imagen
         """
+        from botocore.exceptions import ClientError
+        
         try:
             # Generar nombre único para el archivo
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -37,24 +45,84 @@ class S3Handler:
             s3_key = f"fall-detections/{timestamp}_{unique_id}.{file_extension}"
             
             # Subir archivo a S3
-            self.s3_client.upload_fileobj(
-                file,
-                self.bucket_name,
-                s3_key,
-                ExtraArgs={
-                    'ContentType': f'image/{file_extension}',
-                    'ACL': 'public-read'  # Hacer la imagen pública
-                }
-            )
+            with track_external_call("s3", "upload_image"):
+                self.s3_client.upload_fileobj(
+                    file,
+                    self.bucket_name,
+                    s3_key,
+                    ExtraArgs={
+                        'ContentType': f'image/{file_extension}',
+                        'ACL': 'public-read'  # Hacer la imagen pública
+                    }
+                )
             
             # Generar URL pública
-            image_url = f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{s3_key}"
+            image_url = object_url(s3_key)
             
             return image_url
             
         except ClientError as e:
             raise Exception(f"Error al subir imagen a S3: {str(e)}")
     
+    def upload_derivative(self, image_url: str, name: str, body: bytes) -> str:
+        """
+        Sube una versión derivada (miniatura, vista previa) de una imagen ya subida
+        
+        Args:
+            image_url: URL de la imagen original
+            name: Nombre de la derivada (se añade al nombre del original)
+            body: Imagen WebP codificada
+        
+        Returns:
+            URL pública de la derivada
+        """
+        from botocore.exceptions import ClientError
+        
+        original_key = object_key_from_url(image_url)
+        if original_key is None:
+            raise Exception(f"La URL no pertenece al bucket: {image_url}")
+        stem = original_key.rsplit('.', 1)[0].split('/')[-1]
+        s3_key = f"fall-detections/derived/{stem}_{name}.webp"
+        
+        try:
+            with track_external_call("s3", "upload_derivative"):
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Body=body,
+                    ContentType='image/webp',
+                    ACL='public-read',
+                    CacheControl='public, max-age=31536000, immutable'
+                )
+            return object_url(s3_key)
+        except ClientError as e:
+            raise Exception(f"Error al subir imagen a S3: {str(e)}")
+    
+    def download_image(self, image_url: str) -> bytes:
+        """
+        Descarga una imagen del bucket (para procesar las subidas directas)
+        
+        Args:
+            image_url: URL completa de la imagen en S3
+        
+        Returns:
+            Contenido de la imagen
+        """
+        from botocore.exceptions import ClientError
+        
+        s3_key = object_key_from_url(image_url)
+        if s3_key is None:
+            raise Exception(f"La URL no pertenece al bucket: {image_url}")
+        try:
+            with track_external_call("s3", "download_image"):
+                body = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)["Body"]
+                try:
+                    return body.read()
+                finally:
+                    body.close()
+        except ClientError as e:
+            raise Exception(f"Error al descargar imagen de S3: {str(e)}")
+    
     def delete_image(self, image_url: str) -> bool:
         """
         Elimina una imagen de S3 dado su URL
@@ -65,14 +133,19 @@ class S3Handler:
         Returns:
             True si se eliminó exitosamente
         """
+        from botocore.exceptions import ClientError
+        
         try:
             # Extraer key del URL
-            s3_key = image_url.split(f"{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/")[1]
+            s3_key = object_key_from_url(image_url)
+            if s3_key is None:
+                raise Exception(f"La URL no pertenece al bucket: {image_url}")
             
-            self.s3_client.delete_object(
-                Bucket=self.bucket_name,
-                Key=s3_key
-            )
+            with track_external_call("s3", "delete_image"):
+                self.s3_client.delete_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key
+                )
             return True
             
         except ClientError as e:
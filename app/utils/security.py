@@ -1,6 +1,27 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from passlib.context import CryptContext
+from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_max_pending = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+_pending = 0
+_pending_lock = threading.Lock()
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool and its queue are full"""
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
@@ -9,3 +30,39 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
+
+async def _run_in_hash_pool(func, *args):
+    """
+    Run a bcrypt operation in the bounded worker pool.
+
+    Raises:
+        PasswordHasherBusy: If `PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE`
+            operations are already running or waiting
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= _max_pending:
+            raise PasswordHasherBusy()
+        _pending += 1
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password using bcrypt without blocking the event loop"""
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password without blocking the event loop
+
+    Returns:
+        Tuple (valid, new_hash). `new_hash` is set when the stored hash uses
+        outdated parameters (e.g. a different `BCRYPT_ROUNDS`) and should be
+        replaced; otherwise it is None.
+    """
+    return await _run_in_hash_pool(pwd_context.verify_and_update, plain_password, hashed_password)
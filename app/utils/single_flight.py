@@ -0,0 +1,95 @@
+import asyncio
+from functools import partial
+from typing import Callable, Dict, Hashable, Optional
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import registry
+
+read_coalescing_total = registry.counter(
+    "read_coalescing_total", "Coalesced read lookups, by outcome (query, coalesced, cached)", ("group", "result")
+)
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical reads into a single query.
+
+    The first caller for a key runs the loader in a thread; callers arriving
+    while it runs await the same task and get the same serialized result (or
+    the same exception). A dashboard fleet refreshing at once costs one query
+    per distinct key instead of one per client.
+
+    With `ttl` > 0, results are also kept that many seconds in a small LRU
+    (errors are never cached). Writes call `invalidate()`, which drops cached
+    results and detaches in-flight queries started before the write, so later
+    readers of this process never see data older than their own write. Other
+    processes may serve a cached result for up to `ttl` seconds.
+    """
+
+    def __init__(self, group: str, ttl: float = 0, maxsize: int = 256):
+        """
+        Args:
+            group: Label for the metrics (e.g. "incident_reports.list")
+            ttl: Seconds a result is reused after the query finishes (0 = coalescing only)
+            maxsize: Maximum number of cached results
+        """
+        self.group = group
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+
+    async def do(self, key: Hashable, loader: Callable[[], bytes]) -> bytes:
+        """
+        Result of `loader()` for `key`, sharing any identical query in flight.
+
+        Args:
+            key: Route and normalized parameters identifying the read
+            loader: Blocking function (own session) returning the serialized result
+        """
+        if self._cache is not None:
+            value = self._cache.get(key, _MISSING)
+            if value is not _MISSING:
+                read_coalescing_total.labels(self.group, "cached").inc()
+                return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            read_coalescing_total.labels(self.group, "query").inc()
+            # Tarea independiente: si el cliente que la inició se desconecta,
+            # los demás siguen esperando el mismo resultado
+            task = asyncio.ensure_future(asyncio.to_thread(loader))
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._finished, key, self._generation))
+        else:
+            read_coalescing_total.labels(self.group, "coalesced").inc()
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, generation: int, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # exception() también marca el error como recuperado
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self._cache is not None and generation == self._generation:
+            self._cache.set(key, task.result())
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Forget cached and in-flight results (of `key` only, if given) after a write"""
+        # Las consultas ya en marcha terminan, pero su resultado no se cachea
+        self._generation += 1
+        if key is None:
+            self._inflight.clear()
+            if self._cache is not None:
+                self._cache.clear()
+            return
+        self._inflight.pop(key, None)
+        if self._cache is not None:
+            self._cache.delete(key)
+
+
+# Instancias globales: las rutas de consulta las usan y las de escritura las invalidan
+incident_report_reads = SingleFlight("incident_reports", ttl=settings.READ_CACHE_TTL_SECONDS)
+fall_detection_reads = SingleFlight("fall_detections", ttl=settings.READ_CACHE_TTL_SECONDS)
@@ -0,0 +1,63 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Optional, Tuple
+from app.utils.metro_simulator import STATIONS_LINE1, STATIONS_LINE2
+
+# Estaciones conocidas por línea (mismas claves que las rutas /metro/lineN)
+LINE_STATIONS = {
+    "line1": STATIONS_LINE1,
+    "line2": STATIONS_LINE2
+}
+
+UNKNOWN_LINE = "unknown"
+
+_LINE_PATTERN = re.compile(r"linea\s*(\d+)")
+
+def _normalize(text: str) -> str:
+    """Minúsculas, sin acentos y con espacios colapsados"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+@lru_cache(maxsize=4096)
+def match_station(name: str) -> Optional[Tuple[str, str]]:
+    """
+    Relaciona el texto libre de una estación (ej: "Observatorio, Línea 1")
+    con una estación del simulador
+    
+    Args:
+        name: Nombre de la estación tal como se guardó en el reporte
+    
+    Returns:
+        Tupla (line, station_id) o None si no coincide con ninguna estación
+    """
+    if not name:
+        return None
+    
+    normalized = _normalize(name)
+    
+    # Si el texto menciona la línea, buscar primero en esa línea
+    lines = list(LINE_STATIONS)
+    line_match = _LINE_PATTERN.search(normalized)
+    if line_match and f"line{line_match.group(1)}" in LINE_STATIONS:
+        preferred = f"line{line_match.group(1)}"
+        lines.remove(preferred)
+        lines.insert(0, preferred)
+    
+    for line in lines:
+        # Preferir la coincidencia más larga ("Pino Suárez" antes que "Normal")
+        candidates = [
+            station for station in LINE_STATIONS[line]
+            if _normalize(station["name"]) in normalized
+        ]
+        if candidates:
+            best = max(candidates, key=lambda station: len(station["name"]))
+            return line, best["id"]
+    
+    return None
+
+def resolve_line(name: str) -> str:
+    """Línea del metro ("line1", "line2") para una estación, o "unknown" """
+    match = match_station(name)
+    return match[0] if match else UNKNOWN_LINE
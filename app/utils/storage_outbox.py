@@ -0,0 +1,280 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models.fall_detection import FallDetection
+from app.models.incident_report import IncidentReport
+from app.models.storage_outbox import StorageOutbox
+from app.utils.audio_handler import audio_handler
+from app.utils.clients import get_s3_client, object_key_from_url, object_url
+from app.utils.logger import get_logger
+from app.utils.media import resolve_media_path
+from app.utils.metrics import registry, track_external_call
+from app.utils.partitioning import partitioning_enabled, retained_media_urls, retention_cutoff
+
+log = get_logger(__name__)
+
+storage_outbox_operations_total = registry.counter(
+    "storage_outbox_operations_total", "Storage operations run by the outbox reconciler", ("operation", "result")
+)
+
+# Prefijos del bucket que escribe la app (el barrido no toca nada más)
+SWEEP_PREFIXES = ("fall-detections/", "incidents/")
+
+# Clave del advisory lock que deja un solo barrido en curso entre procesos
+_SWEEP_LOCK_KEY = 0x73776570
+
+
+def enqueue_delete(db: Session, urls: Iterable[Optional[str]], reason: str) -> int:
+    """
+    Record the deletion of stored files in the caller's transaction.
+
+    Nothing is deleted until the transaction commits and the reconciler picks
+    the rows up, so a rollback also cancels the deletion.
+
+    Returns:
+        Number of deletions queued (empty URLs are skipped)
+    """
+    count = 0
+    for url in urls:
+        if url:
+            db.add(StorageOutbox(operation="delete", object_url=url, reason=reason, next_attempt_at=datetime.utcnow()))
+            count += 1
+    return count
+
+
+def delete_stored_object(url: str):
+    """
+    Delete a stored file given its URL (bucket object or local audio).
+
+    Deleting a file that no longer exists succeeds, so retries are safe.
+
+    Raises:
+        Exception: If the storage call fails (the reconciler retries it)
+    """
+    key = object_key_from_url(url)
+    if key is not None:
+        with track_external_call("s3", "outbox_delete"):
+            get_s3_client().delete_object(Bucket=settings.AWS_S3_BUCKET, Key=key)
+        return
+    path = resolve_media_path(audio_handler.storage_path, url.rsplit("/", 1)[-1])
+    if path is not None:
+        with track_external_call("local_storage", "outbox_delete"):
+            path.unlink(missing_ok=True)
+
+
+@contextmanager
+def _sweep_lock():
+    """
+    Yield whether this process may sweep: on PostgreSQL, only the holder of a
+    session-level advisory lock (the sweep commits page by page, so a
+    transaction-level lock would not cover it). Other databases always sweep.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _SWEEP_LOCK_KEY}).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                # Sin esto el lock seguiría en la conexión devuelta al pool
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _SWEEP_LOCK_KEY})
+                conn.commit()
+
+
+class StorageReconciler:
+    """
+    Background worker keeping stored files consistent with the database.
+
+    - Runs the deletions queued in `storage_outbox`, retrying failures with
+      exponential backoff (capped at `OUTBOX_MAX_BACKOFF_SECONDS`)
+    - Every `STORAGE_SWEEP_INTERVAL_SECONDS`, lists the bucket and the local
+      audio directory and queues the deletion of files older than
+      `STORAGE_SWEEP_GRACE_SECONDS` that no row references, catching orphans
+      left by crashes between an upload and its database write. Disabled by
+      default: it assumes the bucket prefixes belong to this deployment alone
+    """
+
+    def __init__(self):
+        self._running = False
+        self._wake: Optional[asyncio.Event] = None
+        self._last_sweep = 0.0
+
+    def wake(self):
+        """Process the outbox now instead of at the next poll"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def _due_batch(self) -> List[StorageOutbox]:
+        db = SessionLocal()
+        try:
+            return db.query(StorageOutbox)\
+                .filter(StorageOutbox.next_attempt_at <= datetime.utcnow())\
+                .order_by(StorageOutbox.next_attempt_at)\
+                .limit(settings.OUTBOX_BATCH_SIZE)\
+                .all()
+        finally:
+            db.close()
+
+    def _finish(self, entry_id: int, error: Optional[str]):
+        db = SessionLocal()
+        try:
+            entry = db.query(StorageOutbox).filter(StorageOutbox.id == entry_id).first()
+            if entry is None:
+                return
+            if error is None:
+                db.delete(entry)
+            else:
+                entry.attempts += 1
+                backoff = min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (entry.attempts - 1), settings.OUTBOX_MAX_BACKOFF_SECONDS)
+                entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
+                entry.last_error = error[:500]
+            db.commit()
+        finally:
+            db.close()
+
+    def process_batch(self) -> int:
+        """Run the due outbox entries (blocking); returns how many were attempted"""
+        batch = self._due_batch()
+        for entry in batch:
+            error = None
+            try:
+                delete_stored_object(entry.object_url)
+                storage_outbox_operations_total.labels(entry.operation, "ok").inc()
+                log.info("storage_outbox_deleted", object_url=entry.object_url, reason=entry.reason, attempts=entry.attempts + 1)
+            except Exception as e:
+                error = str(e)
+                storage_outbox_operations_total.labels(entry.operation, "error").inc()
+                log.warning(
+                    "storage_outbox_delete_failed",
+                    object_url=entry.object_url,
+                    reason=entry.reason,
+                    attempts=entry.attempts + 1,
+                    error=error
+                )
+            self._finish(entry.id, error)
+        return len(batch)
+
+    # ==================== SWEEP ====================
+
+    def _stored_objects(self):
+        """(url, last_modified) of every file the app may have written: bucket prefixes and local audio"""
+        try:
+            client = get_s3_client()
+            for prefix in SWEEP_PREFIXES:
+                kwargs = {"Bucket": settings.AWS_S3_BUCKET, "Prefix": prefix}
+                while True:
+                    with track_external_call("s3", "list_objects"):
+                        page = client.list_objects_v2(**kwargs)
+                    for item in page.get("Contents", []):
+                        yield object_url(item["Key"]), item["LastModified"]
+                    if not page.get("IsTruncated"):
+                        break
+                    kwargs["ContinuationToken"] = page["NextContinuationToken"]
+        except Exception as e:
+            log.warning("storage_sweep_bucket_failed", error=str(e))
+
+        # Misma URL que construye AudioHandler.save_audio para el almacenamiento local
+        base_url = f"http://localhost:8000/storage/{audio_handler.storage_path.split('/')[-1]}"
+        for path in Path(audio_handler.storage_path).rglob("*"):
+            if path.is_file():
+                yield f"{base_url}/{path.name}", datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+
+    @staticmethod
+    def _unreferenced(db: Session, urls: List[str]) -> List[str]:
+        referenced = set()
+        columns = (FallDetection.image_url, FallDetection.thumbnail_url, FallDetection.preview_url, IncidentReport.audio_url)
+        for column in columns:
+            referenced.update(row[0] for row in db.query(column).filter(column.in_(urls)))
+        # Filas que la retención separó de las tablas (particiones desconectadas)
+        referenced.update(retained_media_urls(db, columns, urls))
+        referenced.update(row[0] for row in db.query(StorageOutbox.object_url).filter(StorageOutbox.object_url.in_(urls)))
+        return [url for url in urls if url not in referenced]
+
+    def sweep(self) -> int:
+        """
+        Queue the deletion of old unreferenced files (blocking).
+
+        Skipped while another process holds the sweep lock.
+
+        Returns:
+            Number of orphaned files queued
+        """
+        with _sweep_lock() as acquired:
+            if not acquired:
+                log.info("storage_sweep_skipped", reason="locked")
+                return 0
+            return self._sweep()
+
+    def _sweep(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.STORAGE_SWEEP_GRACE_SECONDS)
+        # Los archivos anteriores a la retención pueden ser de filas archivadas
+        # (ya sin tabla que los referencie): se conservan salvo PARTITION_RETENTION_MEDIA=delete
+        retained_before = retention_cutoff() if partitioning_enabled(engine) and settings.PARTITION_RETENTION_MEDIA == "keep" else None
+        queued = 0
+        scanned = 0
+        db = SessionLocal()
+        try:
+            page: List[str] = []
+            for url, last_modified in self._stored_objects():
+                scanned += 1
+                if last_modified.tzinfo is None:
+                    last_modified = last_modified.replace(tzinfo=timezone.utc)
+                # Los archivos recientes pueden ser subidas aún no confirmadas
+                if last_modified < cutoff and (retained_before is None or last_modified >= retained_before):
+                    page.append(url)
+                if len(page) >= 500:
+                    queued += enqueue_delete(db, self._unreferenced(db, page), reason="sweep")
+                    db.commit()
+                    page = []
+            if page:
+                queued += enqueue_delete(db, self._unreferenced(db, page), reason="sweep")
+                db.commit()
+        finally:
+            db.close()
+        log.info("storage_sweep_completed", scanned=scanned, orphans_queued=queued)
+        return queued
+
+    # ==================== LOOP ====================
+
+    async def run(self):
+        """Process the outbox every `OUTBOX_POLL_SECONDS` (or on `wake()`) and sweep periodically"""
+        self._running = True
+        self._wake = asyncio.Event()
+        self._last_sweep = time.monotonic()
+        while self._running:
+            try:
+                while await asyncio.to_thread(self.process_batch) >= settings.OUTBOX_BATCH_SIZE:
+                    pass
+                interval = settings.STORAGE_SWEEP_INTERVAL_SECONDS
+                if interval > 0 and time.monotonic() - self._last_sweep >= interval:
+                    self._last_sweep = time.monotonic()
+                    if await asyncio.to_thread(self.sweep):
+                        continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("storage_reconciler_failed", error=str(e))
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self._running = False
+        self.wake()
+
+
+# Instancia global del reconciliador
+storage_reconciler = StorageReconciler()
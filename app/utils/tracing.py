@@ -0,0 +1,263 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+SERVICE_NAME = "aihack-backend"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation within a trace (OTLP-compatible fields)"""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "start_time_ns", "end_time_ns", "attributes", "status_code", "status_message")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status_code = "OK"
+        self.status_message: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        """Tag the span as failed with the exception type and message"""
+        self.status_code = "ERROR"
+        self.status_message = str(error)
+        self.attributes["error"] = True
+        self.attributes["error.type"] = type(error).__name__
+        status_code = getattr(error, "status_code", None)
+        if status_code is not None:
+            self.attributes["http.status_code"] = status_code
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time_ns or time.time_ns()
+        return (end - self.start_time_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_time_ns,
+            "endTimeUnixNano": self.end_time_ns,
+            "durationMs": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status_code, "message": self.status_message}
+        }
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled so call sites need no branching"""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+# ==================== EXPORTERS ====================
+
+class FileSpanExporter:
+    """Appends finished spans as JSON lines to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """Posts spans to an OTLP/HTTP JSON endpoint (e.g. http://collector:4318/v1/traces)"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        return {"key": key, "value": typed}
+
+    def _otlp_span(self, span: Span) -> Dict[str, Any]:
+        return {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_span_id or "",
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.end_time_ns),
+            "attributes": [self._attribute(k, v) for k, v in span.attributes.items()],
+            "status": {"code": 2 if span.status_code == "ERROR" else 1, "message": span.status_message or ""}
+        }
+
+    def export(self, spans: List[Span]):
+        import httpx
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.utils.tracing"},
+                    "spans": [self._otlp_span(span) for span in spans]
+                }]
+            }]
+        }
+        httpx.post(self.endpoint, json=payload, timeout=5.0)
+
+
+# ==================== TRACER ====================
+
+class Tracer:
+    """
+    Minimal span-based tracer.
+
+    Finished spans are queued and exported in batches by a background thread,
+    so exporting never runs on the request path. When the queue is full, spans
+    are dropped (and counted) instead of blocking.
+    """
+
+    def __init__(self, exporter=None, max_queue_size: int = 10000, batch_size: int = 256, flush_interval: float = 1.0):
+        self.exporter = exporter
+        self.enabled = exporter is not None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped_spans = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Time a block as a child of the current span (or start a new trace)
+
+        Usage:
+            with tracer.span("incident_report.save_audio", audio_bytes=size) as span:
+                ...
+                span.set_attribute("audio_url", url)
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            parent_span_id=parent.span_id if parent else None,
+            attributes=attributes
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            span.end_time_ns = time.time_ns()
+            _current_span.reset(token)
+            self._enqueue(span)
+
+    def current_span(self):
+        return _current_span.get() or _NOOP_SPAN
+
+    def _enqueue(self, span: Span):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped_spans += 1
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                span = None
+            else:
+                if span is None:
+                    # Shutdown sentinel
+                    self._export(batch)
+                    return
+                batch.append(span)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._export(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _export(self, batch: List[Span]):
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception:
+            # Tracing must never break the application
+            self.dropped_spans += len(batch)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Flush pending spans and stop the exporter thread"""
+        if self._worker is None or not self._worker.is_alive():
+            return
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+
+def _build_exporter():
+    exporter = settings.TRACING_EXPORTER.lower()
+    if exporter == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    if exporter == "otlp":
+        return OTLPHttpSpanExporter(settings.TRACING_OTLP_ENDPOINT)
+    return None
+
+
+# Global tracer (disabled unless TRACING_EXPORTER is "file" or "otlp")
+tracer = Tracer(exporter=_build_exporter())
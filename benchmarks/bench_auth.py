@@ -0,0 +1,60 @@
+"""
+Benchmark of the authenticated request path (`GET /auth/me`).
+
+Compares repeated requests with the same bearer token when the token/user
+caches are cold on every call (original behaviour: JWT decode + SELECT per
+request) against warm caches (no DB round trip).
+
+    python -m benchmarks.bench_auth [iterations]
+"""
+import sys
+
+from benchmarks.common import QueryCounter, percentile, timed
+
+from fastapi.testclient import TestClient
+
+import main
+from app.database import engine
+from app.routes.auth import user_cache
+from app.utils.jwt import token_cache
+
+
+def run(iterations: int = 500):
+    with TestClient(main.app) as client:
+        response = client.post("/auth/register", json={
+            "email": "bench@example.com",
+            "username": "bench_user",
+            "password": "benchmark"
+        })
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def cold():
+            token_cache.clear()
+            user_cache.clear()
+            client.get("/auth/me", headers=headers)
+
+        def warm():
+            client.get("/auth/me", headers=headers)
+
+        results = {}
+        for name, fn in (("cold", cold), ("warm", warm)):
+            fn()  # warm-up
+            with QueryCounter(engine) as counter:
+                samples = timed(fn, iterations)
+            results[name] = {
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "queries_per_request": counter.count / iterations
+            }
+
+    for name, stats in results.items():
+        print(
+            f"{name:>5}: p50={stats['p50_ms']:.3f} ms  p99={stats['p99_ms']:.3f} ms  "
+            f"queries/request={stats['queries_per_request']:.2f}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
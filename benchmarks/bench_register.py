@@ -0,0 +1,166 @@
+"""
+Concurrent registration load test for `POST /auth/register`.
+
+Fires `concurrency` simultaneous signups where every email/username is
+requested `duplicates` times, then checks that exactly one registration
+per identity succeeded, that every loser got the 400 message, and that
+no duplicate row reached the database. Reports latency percentiles and
+SQL statements per request.
+
+The same workload is first run against the previous check-then-insert
+handler (SELECT by email, SELECT by username, ORM add + commit + refresh)
+so both numbers come out of the same harness. That path is not race-safe:
+losers that get past the checks hit the unique constraint and fail with
+500, which is reported rather than asserted.
+
+In-flight requests are capped at `concurrency` (default 10), below the
+default connection pool (5 + 10 overflow): the legacy handler holds its
+session across the password hash, and with more requests in flight the
+sync pool checkout blocks the event loop until it times out.
+
+    python -m benchmarks.bench_register [identities] [duplicates] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+# Cheap hashes and an unbounded hashing queue so the test exercises the DB path
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_QUEUE_SIZE", "100000")
+
+from benchmarks.common import QueryCounter, percentile
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import main
+from app.config import settings
+from app.database import Base, SessionLocal, engine, get_db
+from app.models.user import User
+from app.routes.auth import password_hasher_busy_exception
+from app.schemas.user import LoginResponse, UserCreate, UserResponse
+from app.utils.jwt import create_access_token
+from app.utils.security import PasswordHasherBusy, hash_password_async
+
+legacy_router = APIRouter(prefix="/auth")
+
+
+@legacy_router.post("/register", response_model=LoginResponse, status_code=status.HTTP_201_CREATED)
+async def legacy_register(user_data: UserCreate, db: Session = Depends(get_db)):
+    """Check-then-insert registration as it was before the single INSERT ... RETURNING"""
+    if db.query(User).filter(User.email == user_data.email).first():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    if db.query(User).filter(User.username == user_data.username).first():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
+
+    try:
+        hashed_pwd = await hash_password_async(user_data.password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy_exception()
+    new_user = User(email=user_data.email, username=user_data.username, hashed_password=hashed_pwd)
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+
+    access_token = create_access_token(
+        data={"sub": new_user.email},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    return LoginResponse(user=UserResponse.from_orm(new_user), access_token=access_token, token_type="bearer")
+
+
+@contextmanager
+def legacy_register_route():
+    """Temporarily serve POST /auth/register from `legacy_register` (same middleware stack)"""
+    routes = main.app.router.routes
+    index = next(
+        i for i, route in enumerate(routes)
+        if getattr(route, "path", None) == "/auth/register" and "POST" in getattr(route, "methods", ())
+    )
+    original = routes[index]
+    routes[index] = legacy_router.routes[0]
+    try:
+        yield
+    finally:
+        routes[index] = original
+
+
+async def _register(client, payload, samples, limit):
+    async with limit:
+        start = time.perf_counter()
+        response = await client.post("/auth/register", json=payload)
+        samples.append(time.perf_counter() - start)
+    return payload["email"], response
+
+
+async def _run_path(label: str, payloads, identities: int, duplicates: int, concurrency: int, strict: bool):
+    db = SessionLocal()
+    try:
+        db.query(User).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    samples = []
+    limit = asyncio.Semaphore(concurrency)
+    # raise_app_exceptions=False: the legacy path answers 500 when the race hits the constraint
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with QueryCounter(engine) as counter:
+            results = await asyncio.gather(*[_register(client, p, samples, limit) for p in payloads])
+
+    created = {}
+    rejected = errors = 0
+    for email, response in results:
+        if response.status_code == 201:
+            created[email] = created.get(email, 0) + 1
+        elif response.status_code == 400 and response.json()["detail"] in (
+            "Email already registered", "Username already taken"
+        ):
+            rejected += 1
+        elif response.status_code == 500 and not strict:
+            errors += 1
+        else:
+            raise AssertionError(f"Unexpected response {response.status_code}: {response.text}")
+
+    db = SessionLocal()
+    try:
+        rows = db.query(func.count(User.id)).scalar()
+        distinct_emails = db.query(func.count(func.distinct(User.email))).scalar()
+    finally:
+        db.close()
+
+    assert all(count == 1 for count in created.values()), "duplicate registration succeeded"
+    assert rows == len(created) == distinct_emails, "duplicate row in DB"
+    if strict:
+        assert len(created) == identities, "identity without a successful registration"
+        assert rejected == identities * (duplicates - 1)
+
+    print(f"[{label}] requests={len(payloads)} created={len(created)} rejected={rejected} errors={errors} rows={rows}")
+    print(
+        f"[{label}] p50={percentile(samples, 50) * 1000:.2f} ms  p95={percentile(samples, 95) * 1000:.2f} ms  "
+        f"p99={percentile(samples, 99) * 1000:.2f} ms  queries/request={counter.count / len(payloads):.2f}"
+    )
+
+
+async def run_async(identities: int = 50, duplicates: int = 4, concurrency: int = 10):
+    Base.metadata.create_all(bind=engine)
+    payloads = [
+        {"email": f"user{i}@example.com", "username": f"user_{i}", "password": "benchmark"}
+        for i in range(identities)
+        for _ in range(duplicates)
+    ]
+
+    with legacy_register_route():
+        await _run_path("check-then-insert", payloads, identities, duplicates, concurrency, strict=False)
+    await _run_path("insert-returning", payloads, identities, duplicates, concurrency, strict=True)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    asyncio.run(run_async(*args))
@@ -0,0 +1,157 @@
+"""
+JSON response rendering benchmark: stdlib `JSONResponse` vs `ORJSONResponse`.
+
+Uses the payloads the dashboards actually fetch (default page sizes of the
+listing endpoints and the metro status/stations of both lines) and runs them
+through each route's own `response_model` serialization, then renders the
+result with both response classes. Reports payload size, render time and the
+end-to-end (validate + serialize + render) time, and fails if the two
+renderers ever produce different bytes.
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --items 100,500,1000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import benchmarks.common  # noqa: F401  (settings defaults, must come before app imports)
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+import main
+from app.models.fall_detection import FallDetection
+from app.schemas.fall_detection import FallDetectionResponse
+from app.schemas.incident_report import IncidentReportResponse
+from app.utils.metro_simulator import metro_simulator, metro_simulator_line2, STATIONS_LINE1
+from app.utils.responses import ORJSONResponse
+
+TYPES = ["acoso", "robo", "emergencia_medica", "falla_tecnica", "objeto_perdido", "otro"]
+LEVELS = ["bajo", "medio", "alto", "critico"]
+
+
+def _route(path: str, method: str = "GET") -> APIRoute:
+    for route in main.app.routes:
+        if isinstance(route, APIRoute) and route.path == path and method in route.methods:
+            return route
+    raise LookupError(path)
+
+
+def _incident_reports(count: int):
+    now = datetime.now(timezone.utc)
+    return [
+        IncidentReportResponse(
+            audio_url=f"https://bucket.s3.us-east-1.amazonaws.com/incidents/{i:06d}.m4a",
+            station=STATIONS_LINE1[i % len(STATIONS_LINE1)]["name"],
+            type=random.choice(TYPES),
+            level=random.choice(LEVELS),
+            description="Persona reporta una situación en el andén dirección Pantitlán, se solicita apoyo del personal de la estación.",
+            incident_datetime=now - timedelta(minutes=7 * i),
+            message=None
+        )
+        for i in range(count)
+    ]
+
+
+def _fall_detections(count: int):
+    now = datetime.now(timezone.utc)
+    return [
+        FallDetectionResponse.model_validate(FallDetection(
+            id=i + 1,
+            image_url=f"https://bucket.s3.us-east-1.amazonaws.com/fall-detections/{i:06d}.jpg",
+            station=STATIONS_LINE1[i % len(STATIONS_LINE1)]["name"],
+            detected_object="persona",
+            incident_datetime=now - timedelta(minutes=5 * i),
+            created_at=now - timedelta(minutes=5 * i - 1),
+            duplicate_count=0
+        ))
+        for i in range(count)
+    ]
+
+
+def _payloads(items_list):
+    payloads = []
+    for items in items_list:
+        payloads.append((f"GET /reports/incident (limit={items})", _route("/reports/incident"), _incident_reports(items)))
+        payloads.append((f"GET /falldetection (limit={items})", _route("/falldetection"), _fall_detections(items)))
+    payloads += [
+        ("GET /metro/line1/status", _route("/metro/line1/status"), metro_simulator.get_line_status()),
+        ("GET /metro/line1/stations", _route("/metro/line1/stations"), metro_simulator.get_stations()),
+        ("GET /metro/line2/status", _route("/metro/line2/status"), metro_simulator_line2.get_line_status()),
+        ("GET /metro/line2/stations", _route("/metro/line2/stations"), metro_simulator_line2.get_stations()),
+    ]
+    return payloads
+
+
+def _time_us(fn, min_time: float, repeats: int) -> float:
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        if time.perf_counter() - start >= min_time or iterations >= 1 << 18:
+            break
+        iterations *= 2
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - start) / iterations * 1e6)
+    return statistics.median(samples)
+
+
+async def _serialize(route: APIRoute, content):
+    return await serialize_response(field=route.response_field, response_content=content, is_coroutine=True)
+
+
+def run(items_list, min_time: float, repeats: int) -> int:
+    random.seed(0)
+    loop = asyncio.new_event_loop()
+    mismatches = 0
+    print(f"{'payload':36} {'bytes':>9} {'json µs':>10} {'orjson µs':>10} {'speedup':>8} {'e2e json':>10} {'e2e orjson':>11}")
+    for name, route, content in _payloads(items_list):
+        serialized = loop.run_until_complete(_serialize(route, content))
+        stdlib_bytes = JSONResponse(serialized).body
+        orjson_bytes = ORJSONResponse(serialized).body
+        if stdlib_bytes != orjson_bytes:
+            mismatches += 1
+            print(f"  MISMATCH in {name}")
+
+        render_json = _time_us(lambda: JSONResponse(serialized), min_time, repeats)
+        render_orjson = _time_us(lambda: ORJSONResponse(serialized), min_time, repeats)
+        e2e_json = _time_us(lambda: JSONResponse(loop.run_until_complete(_serialize(route, content))), min_time, repeats)
+        e2e_orjson = _time_us(lambda: ORJSONResponse(loop.run_until_complete(_serialize(route, content))), min_time, repeats)
+        print(
+            f"{name:36} {len(orjson_bytes):>9,} {render_json:>10,.1f} {render_orjson:>10,.1f} "
+            f"{render_json / render_orjson:>7.1f}x {e2e_json:>10,.1f} {e2e_orjson:>11,.1f}"
+        )
+    loop.close()
+
+    if mismatches:
+        print(f"\n{mismatches} payload(s) rendered differently")
+        return 1
+    print("\nBoth renderers produced identical bytes for every payload")
+    return 0
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=_int_list, default=[100, 500], help="Page sizes for the listing endpoints")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per timing repeat")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+    return run(args.items, args.min_time, args.repeats)
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
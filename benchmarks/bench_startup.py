@@ -0,0 +1,106 @@
+"""
+Cold-start benchmark: import time, lifespan startup and first-request latency.
+
+Each run happens in a fresh interpreter (so import caches of the parent do not
+help) and reports:
+
+- import_s: `import main`
+- startup_s: lifespan startup (schema sync, rollups, simulator tasks)
+- first_request_s: latency of the first request to each path
+- s3_client_s / openai_client_s: deferred cost of building each client on first use
+- whether boto3/openai were imported before the first request needing them
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --path /health --path /metro/line1/status
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_PATHS = ["/health", "/metro/line1/status", "/reports/incident"]
+
+
+def _child(paths):
+    start = time.perf_counter()
+    import benchmarks.common  # noqa: F401  (settings defaults, must come before app imports)
+    import main
+    import_s = time.perf_counter() - start
+    loaded_after_import = {name: name in sys.modules for name in ("boto3", "openai")}
+
+    import httpx
+    from app.utils.clients import get_openai_client, get_s3_client
+
+    result = {"import_s": import_s, "loaded_after_import": loaded_after_import, "first_request_s": {}}
+
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            result["startup_s"] = time.perf_counter() - start - import_s
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for path in paths:
+                    request_start = time.perf_counter()
+                    response = await client.get(path)
+                    result["first_request_s"][path] = time.perf_counter() - request_start
+                    response.raise_for_status()
+            result["loaded_after_requests"] = {name: name in sys.modules for name in ("boto3", "openai")}
+            for name, factory in (("s3_client_s", get_s3_client), ("openai_client_s", get_openai_client)):
+                client_start = time.perf_counter()
+                factory()
+                result[name] = time.perf_counter() - client_start
+
+    asyncio.run(run())
+    print("RESULT " + json.dumps(result))
+
+
+def _run_once(paths, env):
+    command = [sys.executable, "-m", "benchmarks.bench_startup", "--child"]
+    for path in paths:
+        command += ["--path", path]
+    completed = subprocess.run(command, capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    for line in completed.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"Child run failed:\n{completed.stderr[-2000:]}")
+
+
+def _ms(values):
+    return f"{statistics.median(values) * 1000:9.1f} ms (min {min(values) * 1000:.1f})"
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", action="append", dest="paths", help="Path requested after startup (repeatable)")
+    parser.add_argument("--warm-up", action="store_true", help="Run with WARM_UP_CLIENTS=true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    paths = args.paths or DEFAULT_PATHS
+
+    if args.child:
+        _child(paths)
+        return 0
+
+    env = dict(os.environ, LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"))
+    if args.warm_up:
+        env["WARM_UP_CLIENTS"] = "true"
+    results = [_run_once(paths, env) for _ in range(args.runs)]
+
+    print(f"{args.runs} cold starts (median):")
+    print(f"  {'import main':32} {_ms([r['import_s'] for r in results])}")
+    print(f"  {'lifespan startup':32} {_ms([r['startup_s'] for r in results])}")
+    for path in paths:
+        print(f"  {'first GET ' + path:32} {_ms([r['first_request_s'][path] for r in results])}")
+    print(f"  {'S3 client on first use':32} {_ms([r['s3_client_s'] for r in results])}")
+    print(f"  {'OpenAI client on first use':32} {_ms([r['openai_client_s'] for r in results])}")
+    print(f"  imported after `import main`: {results[0]['loaded_after_import']}")
+    print(f"  imported after first requests: {results[0]['loaded_after_requests']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,78 @@
+"""
+Shared setup for the in-process benchmarks.
+
+Import this module BEFORE anything from `app` or `main`: it fills in the
+settings required by `app.config.Settings` (SQLite database, dummy AWS and
+OpenAI credentials) and moves into a scratch directory so the `storage/`
+mount and the database file do not touch the working tree.
+
+Run benchmarks from the repository root, e.g.:
+
+    python -m benchmarks.bench_auth
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WORK_DIR = Path(tempfile.mkdtemp(prefix="aihack_bench_"))
+# Directorio desde el que se lanzó el benchmark (antes del chdir a WORK_DIR)
+INVOCATION_DIR = Path.cwd()
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR / 'bench.db'}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+os.environ.setdefault("AWS_S3_BUCKET", "benchmark-bucket")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+(WORK_DIR / "storage").mkdir(exist_ok=True)
+os.chdir(WORK_DIR)
+
+
+def user_path(path: str) -> Path:
+    """Command-line path, resolved against the directory the benchmark was launched from"""
+    return INVOCATION_DIR / Path(path).expanduser()
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def timed(fn, iterations: int):
+    """Run `fn` `iterations` times and return the per-call latencies in seconds"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
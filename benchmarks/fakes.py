@@ -0,0 +1,117 @@
+"""
+In-memory stand-ins for the external services used by the app.
+
+`install_fakes()` swaps the boto3 and OpenAI clients held by the global
+`s3_handler`, `audio_handler` and `openai_service` instances, so benchmarks
+exercise the real request handlers without network access or credentials.
+An optional artificial latency reproduces the cost of the real (blocking)
+calls.
+"""
+import io
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+
+class FakeS3Client:
+    """Subset of the boto3 S3 client API used by S3Handler/AudioHandler"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._wait()
+        with self._lock:
+            self.objects[(Bucket, Key)] = bytes(Body)
+        return {"ETag": '"fake"'}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None):
+        self._wait()
+        with self._lock:
+            self.objects[(Bucket, Key)] = Fileobj.read()
+
+    def delete_object(self, Bucket, Key):
+        self._wait()
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def get_object(self, Bucket, Key):
+        self._wait()
+        with self._lock:
+            body = self.objects.get((Bucket, Key))
+        if body is None:
+            from botocore.exceptions import ClientError
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "GetObject")
+        return {"ContentLength": len(body), "Body": io.BytesIO(body)}
+
+    def list_objects_v2(self, Bucket, Prefix="", **kwargs):
+        self._wait()
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            contents = [
+                {"Key": key, "Size": len(body), "LastModified": now}
+                for (bucket, key), body in sorted(self.objects.items())
+                if bucket == Bucket and key.startswith(Prefix)
+            ]
+        return {"Contents": contents, "KeyCount": len(contents), "IsTruncated": False}
+
+    def head_object(self, Bucket, Key):
+        self._wait()
+        with self._lock:
+            body = self.objects.get((Bucket, Key))
+        if body is None:
+            from botocore.exceptions import ClientError
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ContentLength": len(body)}
+
+
+class FakeOpenAI:
+    """Subset of the OpenAI client API used by OpenAIService"""
+
+    TRANSCRIPTION = "Hay un retraso de diez minutos en la estación Balderas de la Línea 1 por mucha gente"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcribe))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    def _transcribe(self, model, file, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(text=self.TRANSCRIPTION)
+
+    def _complete(self, model, messages, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        content = json.dumps({
+            "station": "Balderas, Línea 1",
+            "type": "delay",
+            "level": "medium",
+            "description": "Retraso de diez minutos por aglomeración",
+            "incident_datetime": datetime.now(timezone.utc).isoformat()
+        })
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def install_fakes(s3_latency: float = 0.0, openai_latency: float = 0.0):
+    """Replace the external clients of the global service instances"""
+    from app.utils.s3_handler import s3_handler
+    from app.utils.audio_handler import audio_handler
+    from app.utils.openai_service import openai_service
+
+    s3_client = FakeS3Client(latency=s3_latency)
+    s3_handler.s3_client = s3_client
+    audio_handler.s3_client = s3_client
+    audio_handler.use_s3 = True
+    audio_handler.bucket_name = s3_handler.bucket_name
+    openai_service.client = FakeOpenAI(latency=openai_latency)
+    return s3_client
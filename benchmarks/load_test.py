@@ -0,0 +1,321 @@
+"""
+HTTP load test for every endpoint, run in-process.
+
+The app (including its lifespan: table creation and metro simulators) runs
+inside this process behind an httpx ASGI transport. The database is SQLite in
+a scratch directory unless DATABASE_URL points at a local Postgres. S3 and
+OpenAI are replaced by in-memory fakes (benchmarks/fakes.py) with optional
+artificial latency.
+
+Examples:
+
+    python -m benchmarks.load_test --mix mixed --concurrency 32 --duration 20
+    python -m benchmarks.load_test --mix metro --requests 5000
+    python -m benchmarks.load_test --compare benchmarks/results/<previous>.json
+
+Results are written as JSON to benchmarks/results/ (or --output) so runs from
+different commits can be compared with --compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from benchmarks.common import REPO_ROOT, percentile, user_path
+from benchmarks.fakes import install_fakes
+
+import httpx
+
+import main
+from app.config import settings
+
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+AUDIO_PAYLOAD = b"RIFF" + os.urandom(32 * 1024)
+IMAGE_PAYLOAD = b"\xff\xd8\xff\xe0" + os.urandom(128 * 1024)
+
+STATIONS = ["Balderas", "Pino Suárez", "Tacubaya, Línea 1", "Zócalo", "Hidalgo", "Pantitlán"]
+
+# ==================== SCENARIOS ====================
+
+async def metro_status(ctx):
+    return await ctx.client.get(f"/metro/line{ctx.rng.choice((1, 2))}/status")
+
+async def metro_stations(ctx):
+    return await ctx.client.get(f"/metro/line{ctx.rng.choice((1, 2))}/stations")
+
+async def auth_login(ctx):
+    email, password = ctx.rng.choice(ctx.users)
+    return await ctx.client.post("/auth/login", json={"email": email, "password": password})
+
+async def auth_me(ctx):
+    token = ctx.rng.choice(ctx.tokens)
+    return await ctx.client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+async def upload_fall_detection(ctx):
+    response = await ctx.client.post(
+        "/falldetection",
+        files={"image": ("frame.jpg", IMAGE_PAYLOAD, "image/jpeg")},
+        data={
+            "station": ctx.rng.choice(STATIONS),
+            "detected_object": "persona",
+            "incident_datetime": datetime.now(timezone.utc).isoformat()
+        }
+    )
+    if response.status_code == 201:
+        ctx.fall_detection_ids.append(response.json()["fall_detection"]["id"])
+    return response
+
+async def upload_incident_manual(ctx):
+    return await ctx.client.post(
+        "/reports/incident",
+        files={"audio": ("report.wav", AUDIO_PAYLOAD, "audio/wav")},
+        data={
+            "station": ctx.rng.choice(STATIONS),
+            "type": ctx.rng.choice(("delay", "incident", "crowding")),
+            "level": ctx.rng.choice(("low", "medium", "high", "critical")),
+            "incident_datetime": datetime.now(timezone.utc).isoformat()
+        }
+    )
+
+async def upload_incident_ai(ctx):
+    return await ctx.client.post(
+        "/reports/incident",
+        files={"audio": ("report.wav", AUDIO_PAYLOAD, "audio/wav")}
+    )
+
+async def list_incidents(ctx):
+    return await ctx.client.get("/reports/incident", params={"limit": 100})
+
+async def get_incident(ctx):
+    return await ctx.client.get(f"/reports/incident/{ctx.rng.randint(1, ctx.seeded_incidents)}")
+
+async def list_fall_detections(ctx):
+    return await ctx.client.get("/falldetection", params={"limit": 100})
+
+async def get_fall_detection(ctx):
+    return await ctx.client.get(f"/falldetection/{ctx.rng.choice(ctx.fall_detection_ids)}")
+
+async def incident_stats(ctx):
+    return await ctx.client.get("/reports/stats", params={"hours": 24})
+
+SCENARIOS = {
+    "metro_status": metro_status,
+    "metro_stations": metro_stations,
+    "auth_login": auth_login,
+    "auth_me": auth_me,
+    "upload_fall_detection": upload_fall_detection,
+    "upload_incident_manual": upload_incident_manual,
+    "upload_incident_ai": upload_incident_ai,
+    "list_incidents": list_incidents,
+    "get_incident": get_incident,
+    "list_fall_detections": list_fall_detections,
+    "get_fall_detection": get_fall_detection,
+    "incident_stats": incident_stats,
+}
+
+# Relative weights per workload; "mixed" approximates production traffic
+# (dashboards and the mobile app poll the metro endpoints far more than anything else)
+MIXES = {
+    "mixed": {
+        "metro_status": 30, "metro_stations": 30, "auth_me": 10, "auth_login": 1,
+        "list_incidents": 6, "get_incident": 4, "list_fall_detections": 6, "get_fall_detection": 4,
+        "incident_stats": 3, "upload_fall_detection": 3, "upload_incident_manual": 2, "upload_incident_ai": 1,
+    },
+    "metro": {"metro_status": 1, "metro_stations": 1},
+    "auth": {"auth_me": 10, "auth_login": 1},
+    "uploads": {"upload_fall_detection": 2, "upload_incident_manual": 2, "upload_incident_ai": 1},
+    "listings": {
+        "list_incidents": 3, "get_incident": 2, "list_fall_detections": 3, "get_fall_detection": 2, "incident_stats": 1,
+    },
+}
+
+# ==================== RUNNER ====================
+
+class Context:
+    def __init__(self, client, seed: int):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.users = []
+        self.tokens = []
+        self.fall_detection_ids = []
+        self.seeded_incidents = 0
+
+
+async def _seed(ctx, users: int, records: int):
+    """Create users and some reports so reads have data to return"""
+    for i in range(users):
+        email, password = f"load{i}@example.com", "load-test-password"
+        response = await ctx.client.post("/auth/register", json={"email": email, "username": f"load_user_{i}", "password": password})
+        if response.status_code != 201:
+            response = await ctx.client.post("/auth/login", json={"email": email, "password": password})
+        ctx.users.append((email, password))
+        ctx.tokens.append(response.json()["access_token"])
+
+    for _ in range(records):
+        await upload_incident_manual(ctx)
+        await upload_fall_detection(ctx)
+    ctx.seeded_incidents = records
+
+
+async def _worker(ctx, names, weights, samples, statuses, stop):
+    while not stop():
+        name = ctx.rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            response = await SCENARIOS[name](ctx)
+            status_code = response.status_code
+        except Exception as e:
+            status_code = type(e).__name__
+        samples[name].append(time.perf_counter() - start)
+        statuses[name][status_code] += 1
+
+
+def _summarize(samples, statuses, elapsed):
+    scenarios = {}
+    for name, values in sorted(samples.items()):
+        errors = sum(count for code, count in statuses[name].items() if not (isinstance(code, int) and code < 400))
+        scenarios[name] = {
+            "count": len(values),
+            "errors": errors,
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "max_ms": round(max(values) * 1000, 3),
+            "status_codes": {str(code): count for code, count in statuses[name].items()},
+        }
+
+    all_values = [value for values in samples.values() for value in values]
+    overall = {
+        "count": len(all_values),
+        "errors": sum(s["errors"] for s in scenarios.values()),
+        "throughput_rps": round(len(all_values) / elapsed, 2),
+        "p50_ms": round(percentile(all_values, 50) * 1000, 3),
+        "p95_ms": round(percentile(all_values, 95) * 1000, 3),
+        "p99_ms": round(percentile(all_values, 99) * 1000, 3),
+    }
+    return overall, scenarios
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def run(args):
+    install_fakes(s3_latency=args.s3_latency_ms / 1000, openai_latency=args.openai_latency_ms / 1000)
+    mix = MIXES[args.mix]
+    names, weights = list(mix), list(mix.values())
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            seed_ctx = Context(client, args.seed)
+            await _seed(seed_ctx, args.users, args.records)
+
+            samples = defaultdict(list)
+            statuses = defaultdict(Counter)
+            started = time.perf_counter()
+            if args.requests:
+                stop = lambda: sum(len(v) for v in samples.values()) >= args.requests
+            else:
+                stop = lambda: time.perf_counter() - started >= args.duration
+
+            contexts = []
+            for i in range(args.concurrency):
+                ctx = Context(client, args.seed + i + 1)
+                ctx.users, ctx.tokens = seed_ctx.users, seed_ctx.tokens
+                ctx.fall_detection_ids = seed_ctx.fall_detection_ids
+                ctx.seeded_incidents = seed_ctx.seeded_incidents
+                contexts.append(ctx)
+
+            await asyncio.gather(*[_worker(ctx, names, weights, samples, statuses, stop) for ctx in contexts])
+            elapsed = time.perf_counter() - started
+
+    overall, scenarios = _summarize(samples, statuses, elapsed)
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": settings.DATABASE_URL.split(":", 1)[0],
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "elapsed_s": round(elapsed, 3),
+            "s3_latency_ms": args.s3_latency_ms,
+            "openai_latency_ms": args.openai_latency_ms,
+        },
+        "overall": overall,
+        "scenarios": scenarios,
+    }
+
+
+def print_report(result, baseline=None):
+    meta, overall = result["meta"], result["overall"]
+    print(
+        f"mix={meta['mix']} concurrency={meta['concurrency']} db={meta['database']} "
+        f"commit={meta['git_commit']} elapsed={meta['elapsed_s']}s"
+    )
+    header = f"{'scenario':24} {'count':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if baseline:
+        header += f" {'Δp50':>8} {'Δp99':>8}"
+    print(header)
+
+    rows = list(result["scenarios"].items()) + [("TOTAL", overall)]
+    for name, stats in rows:
+        line = (
+            f"{name:24} {stats['count']:>7} {stats['errors']:>5} {stats['throughput_rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+        previous = (baseline["overall"] if name == "TOTAL" else baseline["scenarios"].get(name)) if baseline else None
+        if previous:
+            for key in ("p50_ms", "p99_ms"):
+                delta = (stats[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+                line += f" {delta:>+7.1f}%"
+        print(line)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (ignored with --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests")
+    parser.add_argument("--users", type=int, default=5, help="Users registered before the run")
+    parser.add_argument("--records", type=int, default=50, help="Incident reports and fall detections seeded before the run")
+    parser.add_argument("--s3-latency-ms", type=float, default=0.0, help="Artificial latency of fake S3 calls")
+    parser.add_argument("--openai-latency-ms", type=float, default=0.0, help="Artificial latency of fake OpenAI calls")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", type=user_path, help="Result JSON path (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", type=user_path, help="Previous result JSON to compare against")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{result['meta']['git_commit']}_{args.mix}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(result, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
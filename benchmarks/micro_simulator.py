@@ -0,0 +1,223 @@
+"""
+Microbenchmarks for the metro simulator tick and serialization hot paths.
+
+Measures, for every combination of stations x trains x lines:
+
+- MetroSimulator._update_trains / _update_stations_data (one tick)
+- MetroSimulator.get_line_status / get_stations
+- JSON serialization of LineStatus and List[Station]
+
+and reports ns/op (median of several repeats) plus bytes and blocks
+allocated per op (tracemalloc). Results can be saved as a baseline and later
+runs fail (exit code 1) when any case is slower than the baseline by more
+than --max-regression.
+
+    python -m benchmarks.micro_simulator
+    python -m benchmarks.micro_simulator --stations 20,200 --trains 7,100 --lines 1,4
+    python -m benchmarks.micro_simulator --save-baseline benchmarks/results/micro_baseline.json
+    python -m benchmarks.micro_simulator --baseline benchmarks/results/micro_baseline.json --max-regression 0.2
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+from benchmarks.common import user_path  # settings defaults, must come before app imports
+
+from pydantic import TypeAdapter
+
+from app.schemas.metro import Station
+from app.utils.metro_simulator import MetroSimulator, STATIONS_LINE1
+
+_stations_adapter = TypeAdapter(List[Station])
+
+
+def _stations_config(count: int):
+    """Synthetic line with `count` stations (reuses real coordinates)"""
+    return [
+        {
+            "id": f"s{i}",
+            "name": f"{STATIONS_LINE1[i % len(STATIONS_LINE1)]['name']} {i}",
+            "lat": STATIONS_LINE1[i % len(STATIONS_LINE1)]["lat"],
+            "lng": STATIONS_LINE1[i % len(STATIONS_LINE1)]["lng"],
+        }
+        for i in range(count)
+    ]
+
+
+def _build(stations: int, trains: int, lines: int):
+    config = _stations_config(stations)
+    return [
+        MetroSimulator(line_number=n + 1, stations_config=config, line_name=f"Línea {n + 1}", num_trains=trains)
+        for n in range(lines)
+    ]
+
+
+def _cases(simulators):
+    status = [sim.get_line_status() for sim in simulators]
+    stations = [sim.get_stations() for sim in simulators]
+
+    def update_trains():
+        for sim in simulators:
+            sim._update_trains()
+
+    def update_stations_data():
+        for sim in simulators:
+            sim._update_stations_data()
+
+    def tick():
+        for sim in simulators:
+            sim._update_trains()
+            sim._update_stations_data()
+
+    def get_line_status():
+        for sim in simulators:
+            sim.get_line_status()
+
+    def get_stations():
+        for sim in simulators:
+            sim.get_stations()
+
+    def serialize_line_status():
+        for value in status:
+            value.model_dump_json()
+
+    def serialize_stations():
+        for value in stations:
+            _stations_adapter.dump_json(value)
+
+    return {
+        "update_trains": update_trains,
+        "update_stations_data": update_stations_data,
+        "tick": tick,
+        "get_line_status": get_line_status,
+        "get_stations": get_stations,
+        "serialize_line_status": serialize_line_status,
+        "serialize_stations": serialize_stations,
+    }
+
+
+def _time_ns_per_op(fn, min_time: float, repeats: int) -> float:
+    # Calibrate the number of iterations so each repeat takes ~min_time
+    iterations = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9 or iterations >= 1 << 20:
+            break
+        iterations *= 2
+
+    results = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        results.append((time.perf_counter_ns() - start) / iterations)
+    return statistics.median(results)
+
+
+def _allocations_per_op(fn, iterations: int = 20):
+    fn()  # warm-up (lazy caches, interned strings)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base_current, _ = tracemalloc.get_traced_memory()
+        peak_total = 0
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - current
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return {
+        "peak_bytes_per_op": int(peak_total / iterations),
+        "retained_blocks_per_op": round(blocks / iterations, 2),
+    }
+
+
+def run(stations_list, trains_list, lines_list, min_time: float, repeats: int, only=None):
+    results = {}
+    for stations in stations_list:
+        for trains in trains_list:
+            for lines in lines_list:
+                random.seed(0)
+                simulators = _build(stations, trains, lines)
+                for name, fn in _cases(simulators).items():
+                    if only and name not in only:
+                        continue
+                    key = f"{name}[stations={stations},trains={trains},lines={lines}]"
+                    results[key] = {
+                        "ns_per_op": round(_time_ns_per_op(fn, min_time, repeats), 1),
+                        **_allocations_per_op(fn),
+                    }
+                    print(
+                        f"{key:70} {results[key]['ns_per_op']:>14,.0f} ns/op "
+                        f"{results[key]['peak_bytes_per_op']:>10,} B/op "
+                        f"{results[key]['retained_blocks_per_op']:>8} blocks/op"
+                    )
+    return results
+
+
+def check_regressions(results, baseline, max_regression: float):
+    failures = []
+    for key, stats in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        ratio = stats["ns_per_op"] / previous["ns_per_op"] - 1
+        if ratio > max_regression:
+            failures.append(f"{key}: {previous['ns_per_op']:,.0f} -> {stats['ns_per_op']:,.0f} ns/op ({ratio:+.1%})")
+    return failures
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=_int_list, default=[20, 100])
+    parser.add_argument("--trains", type=_int_list, default=[7, 50])
+    parser.add_argument("--lines", type=_int_list, default=[1, 2])
+    parser.add_argument("--only", help="Comma-separated case names to run")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per timing repeat")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=user_path, help="Write results JSON here")
+    parser.add_argument("--save-baseline", type=user_path, help="Write results JSON as the new baseline")
+    parser.add_argument("--baseline", type=user_path, help="Baseline JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    only = set(args.only.split(",")) if args.only else None
+    results = run(args.stations, args.trains, args.lines, args.min_time, args.repeats, only)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        failures = check_regressions(results, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        if failures:
+            print(f"\n{len(failures)} case(s) regressed more than {args.max_regression:.0%}:")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print(f"\nNo regressions above {args.max_regression:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
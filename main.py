@@ -1,18 +1,52 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import asyncio
 from pathlib import Path
-from app.database import engine, Base
-from app.routes import auth_router, metro_router, fall_detection_router, incident_reports_router
+from app.database import engine, Base, SessionLocal, add_missing_columns, add_missing_indexes
+from app.routes import auth_router, metro_router, fall_detection_router, incident_reports_router, incident_stats_router, profiling_router, uploads_router, media_router
+from app.utils.incident_rollups import ensure_rollups
+from app.utils.incident_index import active_incidents
+from app.utils.profiling import loop_lag_monitor, loop_watchdog
+from app.utils.image_derivatives import derivative_pipeline
+from app.utils.near_duplicates import near_duplicates
+from app.utils.storage_outbox import storage_reconciler
+from app.utils.partitioning import create_partitioned_tables, partition_maintainer, partitioning_enabled
+from app.config import settings
+from app.utils.metrics import MetricsMiddleware, registry as metrics_registry
+from app.utils.tracing import tracer
+from app.utils.clients import warm_up as warm_up_clients
+from app.utils.responses import ORJSONResponse
+from app.utils.compression import CompressionMiddleware
+from app.utils.idempotency import IdempotencyMiddleware
 from app.utils.metro_simulator import metro_simulator, metro_simulator_line2
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Maneja el ciclo de vida de la aplicación"""
-    # Startup: Crear tablas y iniciar simulación
-    Base.metadata.create_all(bind=engine)
+    # Startup: Crear tablas (desactivable si el esquema se gestiona aparte) e iniciar simulación
+    if settings.SCHEMA_SYNC_ON_STARTUP:
+        if partitioning_enabled(engine):
+            # Antes de create_all: las tablas de incidentes se crean particionadas por mes
+            await asyncio.to_thread(create_partitioned_tables, engine)
+        Base.metadata.create_all(bind=engine)
+        add_missing_columns()
+        add_missing_indexes()
+    
+    # Poblar rollups de estadísticas si la base ya tenía registros
+    # y cargar los incidentes activos por estación para el simulador
+    db = SessionLocal()
+    try:
+        ensure_rollups(db)
+        active_incidents.load(db)
+        near_duplicates.load(db)
+    finally:
+        db.close()
+    
+    metro_simulator.incident_index = active_incidents
+    metro_simulator_line2.incident_index = active_incidents
     
     # Crear directorio de storage para audios
     Path("storage/incidents").mkdir(parents=True, exist_ok=True)
@@ -21,6 +55,21 @@ async def lifespan(app: FastAPI):
     simulation_task_line1 = asyncio.create_task(metro_simulator.update_loop())
     simulation_task_line2 = asyncio.create_task(metro_simulator_line2.update_loop())
     
+    # Crear los clientes de S3/OpenAI en segundo plano en vez de en la primera petición
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up_clients)) if settings.WARM_UP_CLIENTS else None
+    
+    # Borrados diferidos/reintentados de archivos y barrido de huérfanos
+    reconciler_task = asyncio.create_task(storage_reconciler.run())
+    
+    # Particiones mensuales por adelantado y retención (solo PostgreSQL)
+    partition_task = asyncio.create_task(partition_maintainer.run()) if partitioning_enabled(engine) else None
+    
+    # Medir el retraso del event loop (expuesto en /admin/profiling/loop-lag)
+    loop_lag_task = asyncio.create_task(loop_lag_monitor.run())
+    
+    # Detector de bloqueos del loop (opt-in, para desarrollo/staging)
+    watchdog_task = asyncio.create_task(loop_watchdog.run()) if settings.LOOP_WATCHDOG_ENABLED else None
+    
     yield
     
     # Shutdown: Detener simulaciones de ambas líneas
@@ -36,14 +85,52 @@ async def lifespan(app: FastAPI):
         await simulation_task_line2
     except asyncio.CancelledError:
         pass
+    await derivative_pipeline.shutdown()
+    storage_reconciler.stop()
+    reconciler_task.cancel()
+    try:
+        await reconciler_task
+    except asyncio.CancelledError:
+        pass
+    if partition_task is not None:
+        partition_maintainer.stop()
+        partition_task.cancel()
+        try:
+            await partition_task
+        except asyncio.CancelledError:
+            pass
+    loop_lag_monitor.stop()
+    loop_lag_task.cancel()
+    try:
+        await loop_lag_task
+    except asyncio.CancelledError:
+        pass
+    if watchdog_task is not None:
+        loop_watchdog.stop()
+        watchdog_task.cancel()
+        try:
+            await watchdog_task
+        except asyncio.CancelledError:
+            pass
+    
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    
+    # Exportar las trazas pendientes
+    tracer.shutdown()
 
 app = FastAPI(
     title="AIHack Backend API",
     description="Backend API with JWT authentication, real-time metro simulation, and fall detection for Flutter app",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Idempotency-Key on upload endpoints (innermost, so replays get CORS headers
+# and are stored uncompressed)
+app.add_middleware(IdempotencyMiddleware)
+
 # Configure CORS for Flutter app and Next.js frontend
 # Permitir todos los orígenes de Vercel y localhost
 app.add_middleware(
@@ -62,13 +149,24 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# gzip/brotli compression of JSON responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency, status and in-flight metrics (exposed at /metrics)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(metro_router)
 app.include_router(fall_detection_router)
 app.include_router(incident_reports_router)
+app.include_router(incident_stats_router)
+app.include_router(profiling_router)
+app.include_router(uploads_router)
+app.include_router(media_router)
 
-# Mount static files for audio storage
+# Mount static files for audio storage (the audio of incident reports is
+# served by media_router above, with Range and cache headers)
 app.mount("/storage", StaticFiles(directory="storage"), name="storage")
 
 @app.get("/")
@@ -83,6 +181,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,37 @@
+"""
+Local stand-in for the S3 bucket, for trying direct (pre-signed) uploads
+without AWS credentials.
+
+Run the app with OBJECT_STORE_BACKEND=local and start the store next to it
+(LOCAL_OBJECT_STORE_URL must point at it, http://localhost:9000 by default):
+
+    python scripts/local_object_store.py --port 9000
+
+Objects are written under LOCAL_OBJECT_STORE_PATH, shared with the app.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings  # noqa: E402
+from app.utils.local_object_store import create_app  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--root", default=settings.LOCAL_OBJECT_STORE_PATH, help="Directory holding the objects")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    max_bytes = max(settings.MAX_IMAGE_UPLOAD_BYTES, settings.MAX_AUDIO_UPLOAD_BYTES)
+    uvicorn.run(create_app(args.root, max_bytes=max_bytes), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Convert existing incident_reports / fall_detections tables (PostgreSQL) into
+tables partitioned by month on incident_datetime.
+
+New databases are created partitioned at startup; this is only needed for
+databases created before partitioning. Each table is renamed to
+<table>_unpartitioned, recreated partitioned with one partition per month of
+its data (plus the upcoming ones), and its rows are copied over, in a single
+transaction that locks the table: run it in a maintenance window.
+
+    python scripts/partition_tables.py --dry-run
+    python scripts/partition_tables.py
+    python scripts/partition_tables.py --keep-old   # keep <table>_unpartitioned
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.utils.partitioning import (  # noqa: E402
+    PARTITION_KEY,
+    PARTITIONED_MODELS,
+    add_months,
+    create_month_partition,
+    create_partitioned,
+    is_partitioned,
+    month_start,
+)
+
+
+def convert(conn, table, keep_old: bool) -> int:
+    name = table.name
+    old = f"{name}_unpartitioned"
+    conn.execute(text(f'LOCK TABLE "{name}" IN ACCESS EXCLUSIVE MODE'))
+    conn.execute(text(f'ALTER TABLE "{name}" RENAME TO "{old}"'))
+    # Los nombres de índice son globales al esquema: liberar los del modelo
+    for (index,) in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": old}).all():
+        conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{(index + "_unpartitioned")[:63]}"'))
+
+    create_partitioned(conn, table)
+    first, last = conn.execute(text(f'SELECT min({PARTITION_KEY}), max({PARTITION_KEY}) FROM "{old}"')).one()
+    current = month_start(datetime.now(timezone.utc))
+    month = min(month_start(first), current) if first else current
+    last = max(month_start(last), add_months(current, settings.PARTITION_PREMAKE_MONTHS)) if last else add_months(current, settings.PARTITION_PREMAKE_MONTHS)
+    while month <= last:
+        create_month_partition(conn, name, month)
+        month = add_months(month, 1)
+
+    columns = ", ".join(f'"{column.name}"' for column in table.columns)
+    copied = conn.execute(text(f'INSERT INTO "{name}" ({columns}) SELECT {columns} FROM "{old}"')).rowcount
+    conn.execute(text(f"SELECT setval(pg_get_serial_sequence(:t, 'id'), (SELECT coalesce(max(id), 0) + 1 FROM \"{name}\"), false)"), {"t": name})
+    if not keep_old:
+        conn.execute(text(f'DROP TABLE "{old}"'))
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only print which tables would be converted")
+    parser.add_argument("--keep-old", action="store_true", help="Keep the original table as <table>_unpartitioned")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print(f"Partitioning needs PostgreSQL (DATABASE_URL uses {engine.dialect.name})", file=sys.stderr)
+        return 1
+
+    inspector = inspect(engine)
+    for model in PARTITIONED_MODELS:
+        table = model.__table__
+        if not inspector.has_table(table.name):
+            print(f"{table.name}: missing (created partitioned at startup)")
+            continue
+        with engine.begin() as conn:
+            if is_partitioned(conn, table.name):
+                print(f"{table.name}: already partitioned")
+                continue
+            if args.dry_run:
+                rows = conn.execute(text(f'SELECT count(*) FROM "{table.name}"')).scalar()
+                print(f"{table.name}: would convert {rows} rows")
+                continue
+            copied = convert(conn, table, args.keep_old)
+        print(f"{table.name}: converted, {copied} rows copied")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Grant or revoke the admin flag used by the /admin/profiling endpoints.
+
+    python scripts/set_admin.py user@example.com
+    python scripts/set_admin.py user@example.com --revoke
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, add_missing_columns  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("email", help="Email of an existing user")
+    parser.add_argument("--revoke", action="store_true", help="Remove the admin flag instead of granting it")
+    args = parser.parse_args()
+
+    add_missing_columns()
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == args.email).first()
+        if user is None:
+            print(f"User not found: {args.email}", file=sys.stderr)
+            return 1
+        user.is_admin = not args.revoke
+        db.commit()
+        print(f"{user.email}: is_admin={user.is_admin}")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
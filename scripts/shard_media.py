@@ -0,0 +1,43 @@
+"""
+Move locally stored incident audio from the flat layout
+(storage/incidents/<file>) into the sharded one (storage/incidents/ab/cd/<file>).
+
+URLs do not change and both layouts are served, so this can run at any time
+(and again, it is idempotent):
+
+    python scripts/shard_media.py
+    python scripts/shard_media.py --root storage/incidents --dry-run
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.media import sharded_path  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default="storage/incidents", help="Directory of the flat layout")
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would be moved")
+    args = parser.parse_args()
+
+    moved = 0
+    with os.scandir(args.root) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            target = sharded_path(args.root, entry.name)
+            if args.dry_run:
+                print(f"{entry.path} -> {target}")
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(entry.path, target)
+            moved += 1
+    print(f"{'Would move' if args.dry_run else 'Moved'} {moved} files")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
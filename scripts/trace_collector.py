@@ -0,0 +1,125 @@
+"""
+Local stand-in for an OTLP/HTTP trace collector, plus a span summarizer.
+
+Receive spans (point the app at it with TRACING_EXPORTER=otlp and
+TRACING_OTLP_ENDPOINT=http://localhost:4318/v1/traces):
+
+    python scripts/trace_collector.py serve --port 4318 --output traces/collected.jsonl
+
+Summarize spans written by the collector or by TRACING_EXPORTER=file,
+showing which stage dominates latency:
+
+    python scripts/trace_collector.py summarize traces/spans.jsonl
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+def _otlp_value(value: dict):
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    return None
+
+
+def _flatten_otlp(payload: dict):
+    """Convert an OTLP ExportTraceServiceRequest into the file exporter's span format"""
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start = int(span["startTimeUnixNano"])
+                end = int(span["endTimeUnixNano"])
+                yield {
+                    "traceId": span["traceId"],
+                    "spanId": span["spanId"],
+                    "parentSpanId": span.get("parentSpanId") or None,
+                    "name": span["name"],
+                    "startTimeUnixNano": start,
+                    "endTimeUnixNano": end,
+                    "durationMs": round((end - start) / 1e6, 3),
+                    "attributes": {a["key"]: _otlp_value(a["value"]) for a in span.get("attributes", [])},
+                    "status": {
+                        "code": "ERROR" if span.get("status", {}).get("code") == 2 else "OK",
+                        "message": span.get("status", {}).get("message") or None
+                    }
+                }
+
+
+def serve(port: int, output: str):
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            spans = list(_flatten_otlp(json.loads(body)))
+            with open(output, "a", encoding="utf-8") as f:
+                for span in spans:
+                    f.write(json.dumps(span) + "\n")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"Collecting spans on http://0.0.0.0:{port}/v1/traces -> {output}")
+    ThreadingHTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(path: str):
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            span = json.loads(line)
+            durations[span["name"]].append(span["durationMs"])
+            if span["status"]["code"] == "ERROR":
+                errors[span["name"]] += 1
+
+    print(f"{'span':45} {'count':>7} {'errors':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, values in sorted(durations.items(), key=lambda item: -_percentile(item[1], 99)):
+        print(
+            f"{name:45} {len(values):>7} {errors[name]:>7} "
+            f"{_percentile(values, 50):>10.2f} {_percentile(values, 95):>10.2f} {_percentile(values, 99):>10.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the OTLP/HTTP collector stand-in")
+    serve_parser.add_argument("--port", type=int, default=4318)
+    serve_parser.add_argument("--output", default="traces/collected.jsonl")
+
+    summarize_parser = commands.add_parser("summarize", help="Per-stage latency summary of a span file")
+    summarize_parser.add_argument("path")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args.port, args.output)
+    else:
+        summarize(args.path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())